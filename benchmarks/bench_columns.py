@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""Compares filtering places on numbers object by object and on columns.
+
+Usage: ./benchmarks/bench_columns.py [number of places]
+
+The given number of places (default 200000) get random prices and
+capacities; the same filter then runs as a loop over the objects, on the
+columns without NumPy and, when it is installed, on the columns with it.
+"""
+import random
+import sys
+import time
+
+from bench_reload import ROOT
+
+sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+from models.engine import columns  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+REPEAT = 5
+
+
+def best(function):
+    """Returns the result of function and its best time out of REPEAT."""
+    times = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def loop():
+    """Filters the places object by object."""
+    return [place.id for place in models.storage.all(Place).values()
+            if place.price_by_night < 100 and place.max_guest >= 4]
+
+
+def filtered():
+    """Filters the places on the columns."""
+    return models.storage.filter(Place, price_by_night__lt=100,
+                                 max_guest__gte=4)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    FileStorage._FileStorage__objects = {}
+    random.seed(0)
+    for i in range(count):
+        place = Place(id=str(i), created_at="2024-01-01T00:00:00.000000",
+                      updated_at="2024-01-01T00:00:00.000000",
+                      price_by_night=random.randrange(20, 500),
+                      max_guest=random.randrange(1, 10),
+                      latitude=random.uniform(-90, 90),
+                      longitude=random.uniform(-180, 180))
+        models.storage.new(place)
+    start = time.perf_counter()
+    filtered()
+    print("{} places, columns built in {:.3f} s".format(
+        count, time.perf_counter() - start))
+    expected, reference = best(loop)
+    print("{:<16} {:>8.2f} ms".format("objects", reference * 1000))
+    runs = [("columns (array)", None)]
+    if columns.numpy is not None:
+        runs.append(("columns (numpy)", columns.numpy))
+    for label, numpy in runs:
+        saved, columns.numpy = columns.numpy, numpy
+        try:
+            found, elapsed = best(filtered)
+        finally:
+            columns.numpy = saved
+        assert sorted(found) == sorted(expected)
+        print("{:<16} {:>8.2f} ms  {:>5.1f}x".format(
+            label, elapsed * 1000, reference / elapsed))
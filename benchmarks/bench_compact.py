@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""Compares the memory the objects of a reload take, with and without
+HBNB_STORAGE_COMPACT.
+
+Usage: ./benchmarks/bench_compact.py [number of objects]
+
+A store of the given size (default 100000) is generated in a temporary
+directory, its objects spread over the model classes with every declared
+attribute set, and one in ten with an attribute of its own as well. Each
+reload runs in a fresh interpreter under tracemalloc, so that the memory
+still allocated once it is done belongs to the loaded objects; it is
+measured again once to_dict() has been called on every object, as save()
+does, since reading __dict__ gives each ordinary object a dict of its
+own. The to_dict() and str() output of every object must be the same in
+both modes.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_reload import CLASSES, ROOT
+
+sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+
+CHILD = """
+import hashlib, json, resource, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+import models
+from models.engine.file_storage import FileStorage
+FileStorage._FileStorage__file_path = {path!r}
+tracemalloc.start()
+start = time.perf_counter()
+models.storage.reload()
+elapsed = time.perf_counter() - start
+objs = models.storage.all()
+size = tracemalloc.get_traced_memory()[0]
+for obj in objs.values():
+    obj.to_dict()
+saved = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+digest = hashlib.sha256()
+for key in sorted(objs):
+    obj = objs[key]
+    digest.update(str(obj).encode())
+    digest.update(json.dumps(obj.to_dict()).encode())
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(len(objs), elapsed, size, saved, rss, digest.hexdigest())
+"""
+
+
+def generate(path, count):
+    """Writes a store of count objects spread over the model classes."""
+    stamp = "2023-10-17T02:15:38.026790"
+    values = {str: "value {}", int: 3, float: 1.5, list: []}
+    attributes = models.storage.attributes()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(count):
+            name = CLASSES[i % len(CLASSES)]
+            obj_id = "{:08x}-0000-4000-8000-{:012x}".format(i, i)
+            record = {"id": obj_id}
+            for attribute, kind in attributes[name].items():
+                value = values[kind]
+                record[attribute] = (value.format(i) if kind is str
+                                     else value)
+            if i % 10 == 0:
+                record["note"] = "note {}".format(i)
+            record.update({"__class__": name, "created_at": stamp,
+                           "updated_at": stamp})
+            f.write("{}{}: {}".format(", " if i else "",
+                                      json.dumps(name + "." + obj_id),
+                                      json.dumps(record)))
+        f.write("}")
+
+
+def measure(tmp_dir, path, compact):
+    """Runs one reload in a child process and returns its figures."""
+    code = CHILD.format(root=ROOT, path=path)
+    env = dict(os.environ, HBNB_STORAGE_COMPACT="1" if compact else "0")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_dir,
+                         env=env, check=True, capture_output=True,
+                         text=True).stdout
+    count, elapsed, size, saved, rss, digest = out.split()
+    return (int(count), float(elapsed), int(size), int(saved), int(rss),
+            digest)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "store.json")
+        generate(path, count)
+        size = os.path.getsize(path) / (1 << 20)
+        print("store: {} objects, {:.1f} MiB".format(count, size))
+        digests = set()
+        for compact in (False, True):
+            loaded, elapsed, used, saved, rss, digest = measure(
+                tmp_dir, path, compact)
+            digests.add(digest)
+            print("{:<8} {:>8} objects {:>7.2f} s  {:>5.0f} bytes/object  "
+                  "after to_dict() {:>5.0f}  peak RSS {:>7.1f} MiB".format(
+                      "compact" if compact else "dict", loaded, elapsed,
+                      used / loaded, saved / loaded, rss / 1024))
+        assert len(digests) == 1, "to_dict() or str() output differs"
+        print("to_dict() and str() output identical (sha256 {})".format(
+            digests.pop()[:16]))
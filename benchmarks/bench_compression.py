@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""Compares save/reload time and size on disk of the compressed stores.
+
+Usage: ./benchmarks/bench_compression.py [number of objects]
+
+A store of the given size (default 100000) is generated in a temporary
+directory, loaded once, then saved and reloaded in each format.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_reload import ROOT, generate
+
+sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+from models.engine.file_storage import SUFFIXES, FileStorage  # noqa: E402
+
+
+def run(path, compression):
+    """Saves and reloads the storage and returns the figures."""
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__compression = compression
+    FileStorage._FileStorage__fragments = {}
+    start = time.perf_counter()
+    models.storage.save()
+    saved = time.perf_counter() - start
+    # the store itself, not the lock file written next to it
+    size = os.path.getsize(path + SUFFIXES.get(compression, ""))
+    start = time.perf_counter()
+    models.storage.reload()
+    reloaded = time.perf_counter() - start
+    return saved, reloaded, size
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "store.json")
+        generate(source, count)
+        FileStorage._FileStorage__file_path = source
+        models.storage.reload()
+        print("store: {} objects".format(len(models.storage.all())))
+        for compression in ("", "gzip", "lzma"):
+            out_dir = os.path.join(tmp_dir, compression or "plain")
+            os.mkdir(out_dir)
+            saved, reloaded, size = run(
+                os.path.join(out_dir, "file.json"), compression)
+            print("{:<6} save {:>6.2f} s  reload {:>6.2f} s  {:>8.2f} MiB"
+                  .format(compression or "plain", saved, reloaded,
+                          size / (1 << 20)))
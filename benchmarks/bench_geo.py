@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""Compares storage.nearby() with a brute-force haversine scan.
+
+Usage: ./benchmarks/bench_geo.py [number of places ...]
+
+For each size (default 100000 and 1000000) the storage is filled with
+places spread over the land-ish latitudes, then the same radius searches
+run through the grid index and as a loop over every place.
+"""
+import random
+import sys
+import time
+
+from bench_reload import ROOT
+
+sys.path.insert(0, ROOT)
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.engine.geo import haversine  # noqa: E402
+from models.place import Place  # noqa: E402
+
+SEARCHES = 20
+RADIUS_KM = 25
+LIMIT = 10
+
+
+def brute_force(lat, lon):
+    """Returns the LIMIT nearest places within RADIUS_KM by scanning."""
+    found = []
+    for place in models.storage.all(Place).values():
+        distance = haversine(lat, lon, place.latitude, place.longitude)
+        if distance <= RADIUS_KM:
+            found.append((distance, place.id))
+    return [obj_id for distance, obj_id in sorted(found)[:LIMIT]]
+
+
+def indexed(lat, lon):
+    """Returns the LIMIT nearest places within RADIUS_KM from the index."""
+    return [place.id for place, distance in
+            models.storage.nearby(lat, lon, RADIUS_KM, LIMIT)]
+
+
+def run(count):
+    """Fills the storage with count places and times both searches."""
+    FileStorage._FileStorage__objects = {}
+    random.seed(count)
+    for i in range(count):
+        models.storage.new(Place(
+            id=str(i), created_at="2024-01-01T00:00:00.000000",
+            updated_at="2024-01-01T00:00:00.000000",
+            latitude=random.uniform(-60, 70),
+            longitude=random.uniform(-180, 180)))
+    start = time.perf_counter()
+    models.storage.nearby(0, 0, 1)
+    built = time.perf_counter() - start
+    points = [(random.uniform(-60, 70), random.uniform(-180, 180))
+              for i in range(SEARCHES)]
+    timings = []
+    for search in (brute_force, indexed):
+        start = time.perf_counter()
+        results = [search(lat, lon) for lat, lon in points]
+        timings.append(((time.perf_counter() - start) / SEARCHES, results))
+    (scan, expected), (grid, found) = timings
+    assert expected == found
+    print("{:>8} places  index built in {:.2f} s  scan {:>9.2f} ms  "
+          "nearby {:>7.3f} ms  {:>7.0f}x".format(
+              count, built, scan * 1000, grid * 1000, scan / grid))
+
+
+if __name__ == "__main__":
+    for count in [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]:
+        run(count)
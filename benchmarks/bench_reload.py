@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""Compares peak memory of FileStorage.reload() before and after streaming.
+
+Usage: ./benchmarks/bench_reload.py [number of objects]
+
+A store of the given size (default 1000000) is generated in a temporary
+directory. Each reload runs in a fresh interpreter so that the peak RSS
+reported by getrusage belongs to that reload alone.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLASSES = ["User", "State", "City", "Amenity", "Place", "Review"]
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import models
+from models.engine.file_storage import FileStorage
+start = time.perf_counter()
+if sys.argv[1] == "json.load":
+    with open({path!r}, "r", encoding="utf-8") as f:
+        obj_dict = json.load(f)
+    classes = models.storage.classes()
+    obj_dict = {{k: classes[v["__class__"]](**v) for k, v in obj_dict.items()}}
+    count = len(obj_dict)
+else:
+    FileStorage._FileStorage__file_path = {path!r}
+    models.storage.reload()
+    count = len(models.storage.all())
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(count, elapsed, rss)
+"""
+
+
+def generate(path, count):
+    """Writes a store of count objects spread over the model classes."""
+    stamp = "2023-10-17T02:15:38.026790"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(count):
+            name = CLASSES[i % len(CLASSES)]
+            obj_id = "{:08x}-0000-4000-8000-{:012x}".format(i, i)
+            record = {"id": obj_id, "name": "object {}".format(i),
+                      "__class__": name, "created_at": stamp,
+                      "updated_at": stamp}
+            f.write("{}{}: {}".format(", " if i else "",
+                                      json.dumps(name + "." + obj_id),
+                                      json.dumps(record)))
+        f.write("}")
+
+
+def measure(tmp_dir, path, mode):
+    """Runs one reload in a child process and returns its figures."""
+    code = CHILD.format(root=ROOT, path=path)
+    out = subprocess.run([sys.executable, "-c", code, mode], cwd=tmp_dir,
+                         check=True, capture_output=True, text=True).stdout
+    count, elapsed, rss = out.split()
+    return int(count), float(elapsed), int(rss)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "store.json")
+        generate(path, count)
+        size = os.path.getsize(path) / (1 << 20)
+        print("store: {} objects, {:.1f} MiB".format(count, size))
+        for mode in ("json.load", "streaming"):
+            loaded, elapsed, rss = measure(tmp_dir, path, mode)
+            print("{:<10} {:>8} objects {:>7.2f} s  peak RSS {:>8.1f} MiB"
+                  .format(mode, loaded, elapsed, rss / 1024))
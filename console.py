@@ -8,17 +8,24 @@ from models import storage
 
 class HBNBCommand(cmd.Cmd):
     prompt = "(hbnb) "
+    page_size = 100
 
     def do_EOF(self, line):
         """
         Exit the program when 'EOF' (Ctrl+D) is entered
         """
         print()
+        while storage.in_transaction():
+            storage.rollback()
+        storage.flush()
         return True
 
     def do_quit(self, line):
         """Quit command to exit the program
         """
+        while storage.in_transaction():
+            storage.rollback()
+        storage.flush()
         return True
 
     def validate_class_existence(self, class_name):
@@ -34,8 +41,7 @@ class HBNBCommand(cmd.Cmd):
         """
         Validate if an instance exists in the storage
         """
-        key = f"{class_name}.{instance_id}"
-        if key not in storage.all():
+        if storage.get(class_name, instance_id) is None:
             print("** no instance found **")
             return False
         return True
@@ -67,15 +73,19 @@ class HBNBCommand(cmd.Cmd):
         class_name, instance_id = args
         if (self.validate_class_existence(class_name) and
                 self.validate_instance_existence(class_name, instance_id)):
-            instance_dict = storage.all()[f"{class_name}.{instance_id}"]
-            print(instance_dict)
+            print(storage.get(class_name, instance_id))
 
     def do_destroy(self, line):
         """
-        Usage: destroy <class name> <id>
-        Function: Deletes the instance of the class
+        Usage: destroy <class name> <id> [--cascade]
+        Function: Deletes the instance of the class; with --cascade,
+        also the instances referring to it, and prints how many
+        instances were deleted
         """
         args = line.split()
+        cascade = args[2:] == ["--cascade"]
+        if cascade:
+            args = args[:2]
         if len(args) != 2:
             print("** class name missing **")
             return
@@ -83,31 +93,59 @@ class HBNBCommand(cmd.Cmd):
         class_name, instance_id = args
         if (self.validate_class_existence(class_name) and
                 self.validate_instance_existence(class_name, instance_id)):
-            del storage.all()[f"{class_name}.{instance_id}"]
+            obj = storage.get(class_name, instance_id)
+            if cascade:
+                print(storage.delete_cascade(obj))
+            else:
+                storage.delete(obj)
             storage.save()
 
     def do_all(self, line):
         """
-        Usage: all [class name]
-        Function: Prints the string representation of all instances
+        Usage: all [class name] [--limit N] [--after KEY]
+        Function: Prints the string representation of all instances,
+        sorted by key; --after resumes behind the key <class name>.<id>
         """
-        class_name = line.strip()
+        args = line.split()
+        class_name, limit, after = None, None, None
+        while args:
+            arg = args.pop(0)
+            if arg == "--limit" and args and args[0].isdigit():
+                limit = int(args.pop(0))
+            elif arg == "--after" and args:
+                after = args.pop(0)
+            elif class_name is None and not arg.startswith("--"):
+                class_name = arg
+            else:
+                print("Usage: all [class name] [--limit N] [--after KEY]")
+                return
         if class_name and not self.validate_class_existence(class_name):
             return
+        if after and "." not in after and class_name:
+            after = "{}.{}".format(class_name, after)
 
-        instance_list = [
-            str(value) for key,
-            value in storage.all().items()
-            if not class_name or key.startswith(class_name + ".")
-        ]
-        print(instance_list)
+        # printed as the list of strings it used to be, one page at a time
+        sys.stdout.write("[")
+        for i, (key, value) in enumerate(
+                storage.iter(class_name, after=after, limit=limit)):
+            sys.stdout.write("{}{!r}".format(", " if i else "", str(value)))
+            if i % self.page_size == self.page_size - 1:
+                sys.stdout.flush()
+        sys.stdout.write("]\n")
 
     def update_instance(self, class_name, instance_id, attribute, value):
         """
         Update the dictionary
         """
-        instance_dict = storage.all()[f"{class_name}.{instance_id}"]
+        instance_dict = storage.get(class_name, instance_id)
         value = value.strip('"')
+        # declared numbers are stored as such, so their indexes see them
+        kind = storage.attributes().get(class_name, {}).get(attribute)
+        if kind in (int, float):
+            try:
+                value = kind(value)
+            except ValueError:
+                pass
         setattr(instance_dict, attribute, value)
         new_instance_dict = {attribute: value}
         new_instance_dict.update(instance_dict.__dict__)
@@ -135,21 +173,113 @@ class HBNBCommand(cmd.Cmd):
         Function: Counts all the instances of the class
         """
         class_name = line.strip()
-        count = sum(
-            1 for key in storage.all().keys()
-            if not class_name or key.startswith(class_name + ".")
-        )
-        print(count)
+        print(storage.count(class_name or None))
+
+    def do_stats(self, line):
+        """
+        Usage: stats [class name] [by <attribute>]
+        Function: Counts the instances per class, or of a class grouped
+        by the values of an attribute
+        """
+        args = line.split()
+        if not args:
+            print({name: storage.count(name) for name in storage.classes()})
+            return
+        class_name = args[0]
+        if not self.validate_class_existence(class_name):
+            return
+        if len(args) == 1:
+            print(storage.count(class_name))
+            return
+        if len(args) != 3 or args[1] != "by":
+            print("Usage: stats [class name] [by <attribute>]")
+            return
+        try:
+            print(storage.group_by(class_name, args[2]))
+        except ValueError:
+            print("** attribute doesn't exist **")
+
+    def do_nearby(self, line):
+        """
+        Usage: nearby <latitude> <longitude> <radius in km> [limit]
+        Function: Prints the string representation of the places
+        within the radius of a point, nearest first
+        """
+        args = line.split()
+        try:
+            if len(args) not in (3, 4):
+                raise ValueError
+            lat, lon, radius = (float(arg) for arg in args[:3])
+            limit = int(args[3]) if len(args) == 4 else None
+        except ValueError:
+            print("Usage: nearby <latitude> <longitude> <radius in km> "
+                  "[limit]")
+            return
+        print([str(obj) for obj, distance in
+               storage.nearby(lat, lon, radius, limit)])
+
+    def do_search(self, line):
+        """
+        Usage: search <class name> <words>
+        Function: Prints the string representation of the instances
+        whose text has all the words (any of them if OR is one), best
+        match first; a word ending with * matches as a prefix
+        """
+        args = line.split(maxsplit=1)
+        if len(args) != 2:
+            print("Usage: search <class name> <words>")
+            return
+        class_name, text = args
+        if not self.validate_class_existence(class_name):
+            return
+        try:
+            found = storage.search(class_name, text)
+        except ValueError:
+            print("** class has no text attribute **")
+            return
+        print([str(obj) for obj, score in found])
+
+    def do_begin(self, line):
+        """
+        Usage: begin
+        Function: Starts a transaction; nothing is saved until commit
+        """
+        if storage.in_transaction():
+            print("** transaction already in progress **")
+            return
+        storage.begin()
+
+    def do_commit(self, line):
+        """
+        Usage: commit
+        Function: Saves every change made since begin at once
+        """
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+            return
+        storage.commit()
+
+    def do_rollback(self, line):
+        """
+        Usage: rollback
+        Function: Undoes every change made since begin
+        """
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+            return
+        storage.rollback()
 
     def emptyline(self):
         pass
 
     def precmd(self, line):
         """
-        Make the app work non-interactively
+        Make the app work non-interactively, and pick up what other
+        consoles saved to the same store since the last command
         """
         if not sys.stdin.isatty():
             print()
+        storage.sync()
         return cmd.Cmd.precmd(self, line)
 
 
@@ -1,8 +1,14 @@
 #!/usr/bin/python3
 '''Initializes the package'''
 # from models.base_model import BaseModel
+import os
+
 from models.engine import file_storage
 
 
-storage = file_storage.FileStorage()
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine import db_storage
+    storage = db_storage.DBStorage()
+else:
+    storage = file_storage.FileStorage()
 storage.reload()
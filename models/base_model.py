@@ -20,14 +20,25 @@ class BaseModel:
             self.updated_at = datetime.datetime.now()
             storage.new(self)
         else:
+            # the instance isn't stored yet, so there is nothing for
+            # __setattr__ to record: fill __dict__ directly
+            attributes = self.__dict__
             date_format = "%Y-%m-%dT%H:%M:%S.%f"
             for key, value in kwargs.items():
                 if key in ["created_at", "updated_at"]:
-                    setattr(
-                        self, key, datetime.datetime.strptime(
-                            value, date_format))
+                    attributes[key] = datetime.datetime.strptime(
+                        value, date_format)
                 elif key != "__class__":
-                    setattr(self, key, value)
+                    attributes[key] = value
+
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and records the instance as modified.
+        """
+        if name == "id" or storage.in_transaction():
+            storage.touch(self)
+        super().__setattr__(name, value)
+        storage.touch(self)
 
     def __str__(self):
         """
@@ -39,9 +50,10 @@ class BaseModel:
         """
         Updates the 'updated_at' attribute to
         the current timestamp and saves the instance.
+        Returns the handle of the write from storage.save().
         """
         self.updated_at = datetime.datetime.now()
-        storage.save()
+        return storage.save()
 
     def to_dict(self):
         """
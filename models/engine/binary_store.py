@@ -0,0 +1,339 @@
+"""This module reads and writes the binary storage format
+
+All integers are little endian. A store is laid out as:
+
+    b"HBNB\\x01"                        magic and format version
+    one record per object:
+        uint32  length of the rest of the record
+        uint16  class id (position in the class table)
+        int64   created_at, microseconds since 1970-01-01
+        int64   updated_at, same (NO_TIME if stored in the JSON part)
+        uint16  length of the id, then the id in UTF-8
+        the remaining attributes as compact JSON (may be empty)
+    trailer:
+        uint32  length of the class table, then the class names
+                joined by newlines
+        uint32  number of keys
+        uint64  length of the keys, then the keys joined by newlines
+        uint64  offset of each record, in the order of the keys
+    uint64  offset of the trailer
+    b"HBNB"
+
+The trailing key -> offset index lets a mapped store decode a single
+record without reading the others.
+
+The module only depends on the standard library, so that it can convert
+a store from the command line without loading the models package:
+
+    python3 models/engine/binary_store.py file.json file.hbnb
+    python3 models/engine/binary_store.py file.hbnb file.json
+"""
+import array
+import datetime
+import json
+import mmap
+import re
+import struct
+import sys
+
+MAGIC = b"HBNB"
+HEADER = MAGIC + b"\x01"
+NO_TIME = -(1 << 63)
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+LENGTH = struct.Struct("<I")
+RECORD = struct.Struct("<HqqH")
+COUNT = struct.Struct("<IQ")
+FOOTER = struct.Struct("<Q4s")
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def encode(record, class_ids):
+    """Returns the length-prefixed bytes of a to_dict() record."""
+    rest = dict(record)
+    class_id = class_ids[rest.pop("__class__")]
+    obj_id = rest.pop("id").encode("utf-8")
+    stamps = []
+    for field in ("created_at", "updated_at"):
+        value = rest.get(field)
+        try:
+            stamp = datetime.datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            stamp = None
+        if stamp is None or stamp.tzinfo or stamp.isoformat() != value:
+            stamps.append(NO_TIME)
+            continue
+        stamps.append((stamp - EPOCH) // MICROSECOND)
+        del rest[field]
+    body = RECORD.pack(class_id, stamps[0], stamps[1], len(obj_id)) + obj_id
+    if rest:
+        body += json.dumps(rest, separators=(",", ":")).encode("utf-8")
+    return LENGTH.pack(len(body)) + body
+
+
+def decode(data, offset, class_names):
+    """Returns the to_dict() record stored at offset of data."""
+    length, = LENGTH.unpack_from(data, offset)
+    start = offset + LENGTH.size
+    class_id, created, updated, id_length = RECORD.unpack_from(data, start)
+    start += RECORD.size
+    record = {"id": bytes(data[start:start + id_length]).decode("utf-8")}
+    start += id_length
+    end = offset + LENGTH.size + length
+    if end > start:
+        record.update(json.loads(bytes(data[start:end]).decode("utf-8")))
+    record["__class__"] = class_names[class_id]
+    for field, stamp in (("created_at", created), ("updated_at", updated)):
+        if stamp != NO_TIME:
+            record[field] = (EPOCH + stamp * MICROSECOND).isoformat()
+    return record
+
+
+def write(f, items, class_names):
+    """Writes the key, encoded record pairs of items to the binary file f.
+
+    The records must have been encoded with the ids of class_names.
+    """
+    f.write(HEADER)
+    position = len(HEADER)
+    keys, offsets = [], array.array("Q")
+    for key, data in items:
+        keys.append(key)
+        offsets.append(position)
+        f.write(data)
+        position += len(data)
+    names = "\n".join(class_names).encode("utf-8")
+    joined = "\n".join(keys).encode("utf-8")
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    f.write(LENGTH.pack(len(names)) + names)
+    f.write(COUNT.pack(len(keys), len(joined)) + joined)
+    f.write(offsets.tobytes())
+    f.write(FOOTER.pack(position, MAGIC))
+
+
+class LazyRecord(dict):
+    """A record of a BinaryStore, decoded the first time it is read.
+
+    store may be any object with the decode() and raw() methods of a
+    BinaryStore, such as the JSON one of a lazy reload.
+    """
+
+    __slots__ = ("store", "offset", "loaded")
+
+    def __init__(self, store, offset):
+        """Creates the record stored at offset of store."""
+        super().__init__()
+        self.store = store
+        self.offset = offset
+        self.loaded = False
+
+    def load(self):
+        """Decodes the record if that has not happened yet."""
+        if not self.loaded:
+            dict.update(self, self.store.decode(self.offset))
+            self.loaded = True
+        return self
+
+    def raw(self):
+        """Returns the encoded bytes (or text) of the record."""
+        return self.store.raw(self.offset)
+
+    def __getitem__(self, key):
+        """Returns the value of key."""
+        return dict.__getitem__(self.load(), key)
+
+    def __iter__(self):
+        """Iterates over the keys."""
+        return dict.__iter__(self.load())
+
+    def __len__(self):
+        """Returns the number of keys."""
+        return dict.__len__(self.load())
+
+    def __contains__(self, key):
+        """Tells whether key is in the record."""
+        return dict.__contains__(self.load(), key)
+
+    def get(self, key, default=None):
+        """Returns the value of key, or default."""
+        return dict.get(self.load(), key, default)
+
+    def keys(self):
+        """Returns the keys."""
+        return dict.keys(self.load())
+
+    def values(self):
+        """Returns the values."""
+        return dict.values(self.load())
+
+    def items(self):
+        """Returns the key, value pairs."""
+        return dict.items(self.load())
+
+    def __eq__(self, other):
+        """Tells whether the record equals other."""
+        if isinstance(other, LazyRecord):
+            other.load()
+        return dict.__eq__(self.load(), other)
+
+    def __ne__(self, other):
+        """Tells whether the record differs from other."""
+        if isinstance(other, LazyRecord):
+            other.load()
+        return dict.__ne__(self.load(), other)
+
+
+class BinaryStore:
+    """A binary store mapped in memory, with its key -> offset index."""
+
+    def __init__(self, path):
+        """Maps the store at path and reads its trailer."""
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.data
+        if data[:len(HEADER)] != HEADER:
+            raise ValueError("{} is not a binary store".format(path))
+        position, magic = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError("{} is truncated".format(path))
+        length, = LENGTH.unpack_from(data, position)
+        position += LENGTH.size
+        self.classes = data[position:position + length].decode(
+            "utf-8").split("\n")
+        position += length
+        count, length = COUNT.unpack_from(data, position)
+        position += COUNT.size
+        keys = data[position:position + length].decode("utf-8").split("\n")
+        position += length
+        offsets = array.array("Q")
+        offsets.frombytes(data[position:position + 8 * count])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        self.index = dict(zip(keys, offsets)) if count else {}
+
+    def decode(self, offset):
+        """Returns the record stored at offset."""
+        return decode(self.data, offset, self.classes)
+
+    def raw(self, offset):
+        """Returns the encoded bytes of the record stored at offset."""
+        length, = LENGTH.unpack_from(self.data, offset)
+        return self.data[offset:offset + LENGTH.size + length]
+
+    def get(self, key):
+        """Returns the record of key, or None."""
+        offset = self.index.get(key)
+        return None if offset is None else self.decode(offset)
+
+    def items(self):
+        """Yields every key, record pair in file order."""
+        for key, offset in self.index.items():
+            yield key, self.decode(offset)
+
+    def lazy_items(self):
+        """Yields every key with a LazyRecord that decodes on access."""
+        for key, offset in self.index.items():
+            yield key, LazyRecord(self, offset)
+
+    def close(self):
+        """Unmaps the store."""
+        self.data.close()
+
+
+def iter_records(f, chunk_size=1 << 16, spans=False):
+    """Yields the key, record pairs of the JSON object in f one by one.
+
+    f is read chunk_size characters at a time; a pair that straddles
+    two chunks is parsed again once the next chunk has been read.
+    With spans, each record is replaced by the (start, end) positions in
+    f of its whole "key": record text; records are still parsed to find
+    where they end, but none is kept.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, started, first = f.read(chunk_size), 0, False, True
+    base = 0
+    while True:
+        try:
+            p = WHITESPACE.match(buf, pos).end()
+            if not started:
+                if buf[p] != "{":
+                    raise json.JSONDecodeError("Expecting '{'", buf, p)
+                pos, started = p + 1, True
+                continue
+            if buf[p] == "}":
+                return
+            if not first:
+                if buf[p] != ",":
+                    raise json.JSONDecodeError(
+                        "Expecting ',' delimiter", buf, p)
+                p = WHITESPACE.match(buf, p + 1).end()
+            start = p
+            key, p = decoder.raw_decode(buf, p)
+            p = WHITESPACE.match(buf, p).end()
+            if buf[p] != ":":
+                raise json.JSONDecodeError(
+                    "Expecting ':' delimiter", buf, p)
+            p = WHITESPACE.match(buf, p + 1).end()
+            record, p = decoder.raw_decode(buf, p)
+        except (IndexError, json.JSONDecodeError) as e:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                if isinstance(e, json.JSONDecodeError):
+                    raise
+                raise json.JSONDecodeError(
+                    "Unexpected end of file", buf, len(buf))
+            buf, pos, base = buf[pos:] + chunk, 0, base + pos
+            continue
+        pos, first = p, False
+        yield key, (base + start, base + p) if spans else record
+
+
+def json_to_binary(src, dst, class_names=None):
+    """Converts the JSON store src to the binary store dst.
+
+    Without class_names, the class table lists the classes in the order
+    their first record is read.
+    """
+    if class_names is None:
+        class_names = []
+    class_ids = {name: i for i, name in enumerate(class_names)}
+
+    def encoded(records):
+        """Encodes the records, adding their classes to the table."""
+        for key, record in records:
+            name = record["__class__"]
+            if name not in class_ids:
+                class_ids[name] = len(class_names)
+                class_names.append(name)
+            yield key, encode(record, class_ids)
+    with open(src, "r", encoding="utf-8") as f_in, \
+            open(dst, "wb") as f_out:
+        write(f_out, encoded(iter_records(f_in)), class_names)
+
+
+def binary_to_json(src, dst):
+    """Converts the binary store src to the JSON store dst."""
+    store = BinaryStore(src)
+    try:
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write("{")
+            sep = ""
+            for key, record in store.items():
+                f.write("{}{}: {}".format(sep, json.dumps(key),
+                                          json.dumps(record)))
+                sep = ", "
+            f.write("}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: {} <src> <dst>".format(sys.argv[0]))
+        print("Converts between file.json and file.hbnb by extension")
+        sys.exit(1)
+    if sys.argv[1].endswith(".json"):
+        json_to_binary(sys.argv[1], sys.argv[2])
+    else:
+        binary_to_json(sys.argv[1], sys.argv[2])
@@ -0,0 +1,115 @@
+"""This module defines the columnar store of numeric attributes"""
+import array
+import math
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = math.nan
+# comparisons of one column against a value, over the given rows
+SCANS = {
+    "exact": lambda column, rows, value: [
+        i for i in rows if column[i] == value],
+    "ne": lambda column, rows, value: [
+        i for i in rows if column[i] != value],
+    "lt": lambda column, rows, value: [
+        i for i in rows if column[i] < value],
+    "lte": lambda column, rows, value: [
+        i for i in rows if column[i] <= value],
+    "gt": lambda column, rows, value: [
+        i for i in rows if column[i] > value],
+    "gte": lambda column, rows, value: [
+        i for i in rows if column[i] >= value]
+}
+VECTORS = {
+    "exact": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge
+}
+
+
+class ColumnStore:
+    """Keeps numeric attributes of the objects of one class in columns.
+
+    Each attribute is an array of doubles with one row per key; a value
+    that is missing or not a number is stored as NaN, which no comparison
+    but "ne" matches. Rows are kept contiguous: removing a key moves the
+    last row into its place. With NumPy, filter() compares whole columns
+    at once through zero-copy views of the arrays.
+    """
+
+    def __init__(self, attributes):
+        """Creates an empty store of the given attributes."""
+        self.columns = {attribute: array.array("d")
+                        for attribute in attributes}
+        self.keys = []
+        self.rows = {}
+
+    @staticmethod
+    def number(value):
+        """Returns value as a float, or NaN if it is not a number."""
+        if type(value) in (int, float, bool):
+            return float(value)
+        return NAN
+
+    def set(self, key, values):
+        """Stores values, one per column in order, as the row of key."""
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            for column, value in zip(self.columns.values(), values):
+                column.append(self.number(value))
+            return
+        for column, value in zip(self.columns.values(), values):
+            column[row] = self.number(value)
+
+    def remove(self, key):
+        """Drops the row of key."""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = self.keys.pop()
+        if row < len(self.keys):
+            self.keys[row] = last
+            self.rows[last] = row
+        for column in self.columns.values():
+            value = column.pop()
+            if row < len(column):
+                column[row] = value
+
+    def filter(self, conditions):
+        """Returns the keys whose rows meet every condition.
+
+        conditions are attribute, operator, value triples, the operator
+        being one of those of SCANS.
+        """
+        for attribute, op, value in conditions:
+            if attribute not in self.columns or op not in SCANS:
+                raise ValueError("{}__{} can't be filtered on columns"
+                                 .format(attribute, op))
+            if type(value) not in (int, float, bool):
+                raise ValueError("{!r} is not a number".format(value))
+        if not self.keys:
+            return []
+        if numpy is not None:
+            mask = None
+            for attribute, op, value in conditions:
+                column = numpy.frombuffer(self.columns[attribute],
+                                          dtype=numpy.float64)
+                matched = VECTORS[op](column, value)
+                mask = matched if mask is None else mask & matched
+                del column
+            if mask is None:
+                return list(self.keys)
+            return [self.keys[i] for i in numpy.flatnonzero(mask).tolist()]
+        rows = range(len(self.keys))
+        for attribute, op, value in conditions:
+            rows = SCANS[op](self.columns[attribute], rows, value)
+        return [self.keys[i] for i in rows]
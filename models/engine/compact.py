@@ -0,0 +1,197 @@
+"""This module defines the compact, slotted versions of the model classes"""
+from collections.abc import MutableMapping
+
+MISSING = object()
+# the compact class made for each model class
+CLASSES = {}
+
+
+class Field:
+    """A declared attribute kept in a slot.
+
+    An instance whose slot is empty reads the class default instead, like
+    an ordinary instance that never set the attribute reads the class
+    attribute; the class itself reads the default as well.
+    """
+
+    __slots__ = ("slot", "default")
+
+    def __init__(self, slot, default):
+        """Wraps the member descriptor slot, with default (or MISSING)."""
+        self.slot = slot
+        self.default = default
+
+    def __get__(self, obj, owner=None):
+        """Returns the value of the slot, or the default."""
+        if obj is not None:
+            try:
+                return self.slot.__get__(obj, owner)
+            except AttributeError:
+                if self.default is MISSING:
+                    raise
+                return self.default
+        if self.default is MISSING:
+            raise AttributeError(self.slot.__name__)
+        return self.default
+
+    def __set__(self, obj, value):
+        """Stores value in the slot."""
+        self.slot.__set__(obj, value)
+
+    def __delete__(self, obj):
+        """Empties the slot."""
+        self.slot.__delete__(obj)
+
+
+class AttributeView(MutableMapping):
+    """The __dict__ of a compact object.
+
+    It holds the declared attributes set in slots, in declaration order,
+    with the other attributes kept in the _extra dict of the object
+    coming before the last ones (see compact()).
+    Changes are written through to the object, without going through
+    its __setattr__, exactly like changes to an ordinary __dict__.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        """Creates the view of the attributes of obj."""
+        self.obj = obj
+
+    def __getitem__(self, key):
+        """Returns the value of attribute key."""
+        slot = type(self.obj)._slots.get(key)
+        if slot is not None:
+            try:
+                return slot.__get__(self.obj)
+            except AttributeError:
+                raise KeyError(key) from None
+        extra = self.obj._extra
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def __setitem__(self, key, value):
+        """Sets attribute key to value."""
+        slot = type(self.obj)._slots.get(key)
+        if slot is not None:
+            slot.__set__(self.obj, value)
+            return
+        extra = self.obj._extra
+        if extra is None:
+            object.__setattr__(self.obj, "_extra", {key: value})
+        else:
+            extra[key] = value
+
+    def __delitem__(self, key):
+        """Deletes attribute key."""
+        slot = type(self.obj)._slots.get(key)
+        if slot is not None:
+            try:
+                slot.__delete__(self.obj)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        extra = self.obj._extra
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        del extra[key]
+        if not extra:
+            object.__setattr__(self.obj, "_extra", None)
+
+    def __iter__(self):
+        """Iterates over the names of the attributes set."""
+        cls = type(self.obj)
+        for key, slot in cls._slots.items():
+            if key == cls._extra_before:
+                yield from list(self.obj._extra or ())
+            try:
+                slot.__get__(self.obj)
+            except AttributeError:
+                continue
+            yield key
+        if cls._extra_before is None:
+            yield from list(self.obj._extra or ())
+
+    def __len__(self):
+        """Returns the number of attributes set."""
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        """Returns the repr of the attributes as a dict."""
+        return repr(dict(self))
+
+
+def compact(cls, attributes, last=()):
+    """Returns the compact version of the model class cls.
+
+    attributes and last are the names declared for cls (the BaseModel
+    ones included), last being kept at the end. The compact class keeps
+    them in __slots__ rather than in a __dict__ per instance, and any
+    other attribute, e.g. set with the console update command, in a dict
+    of its own created on demand. It is a subclass of cls with the same
+    name, so keys, to_dict() and __str__() are unchanged, but for the
+    order of the attributes: the declaration one, with the other
+    attributes before the last ones. Attribute reads go through a Field
+    and are a bit slower.
+    """
+    compact_cls = CLASSES.get(cls)
+    if compact_cls is not None:
+        return compact_cls
+    last = [name for name in dict.fromkeys(last) if name != "_extra"]
+    fields = [name for name in dict.fromkeys(attributes)
+              if name not in last and name != "_extra"] + last
+    names = {"__module__": cls.__module__, "__qualname__": cls.__qualname__,
+             "__doc__": cls.__doc__}
+    slotted = type(cls.__name__, (cls,), dict(
+        names, __slots__=tuple(fields) + ("_extra",)))
+    setattr_ = cls.__setattr__
+
+    def __setattr__(self, name, value):
+        """Sets an attribute, in its slot or else in the _extra dict."""
+        if name in compact_cls._slots or name in ("_extra", "__dict__"):
+            setattr_(self, name, value)
+            return
+        extra = dict(self._extra or ())
+        extra[name] = value
+        setattr_(self, "_extra", extra)
+
+    def __getattr__(self, name):
+        """Returns an attribute of the _extra dict."""
+        extra = self._extra
+        if extra is None or name not in extra:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+        return extra[name]
+
+    def __delattr__(self, name):
+        """Deletes an attribute, from its slot or from the _extra dict."""
+        if name in compact_cls._slots or name == "_extra":
+            object.__delattr__(self, name)
+            return
+        try:
+            del AttributeView(self)[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def set_dict(self, attributes):
+        """Replaces every attribute with those of attributes."""
+        view = AttributeView(self)
+        attributes = dict(attributes)
+        view.clear()
+        view.update(attributes)
+
+    namespace = dict(
+        names, __slots__=(), __setattr__=__setattr__,
+        __getattr__=__getattr__, __delattr__=__delattr__,
+        __dict__=property(AttributeView, set_dict),
+        _slots={name: vars(slotted)[name] for name in fields},
+        _extra_before=last[0] if last else None,
+        _extra=Field(vars(slotted)["_extra"], None))
+    for name in fields:
+        namespace[name] = Field(vars(slotted)[name],
+                                getattr(cls, name, MISSING))
+    compact_cls = type(cls.__name__, (slotted,), namespace)
+    CLASSES[cls] = compact_cls
+    return compact_cls
@@ -0,0 +1,146 @@
+"""This module is the SQLite storage class"""
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+
+from models.engine.file_storage import FileStorage
+
+
+class DBStorage(FileStorage):
+    """Class for storing and retrieving data in a SQLite database.
+
+    Objects are kept in memory exactly like FileStorage does; only the
+    persistence differs. Every class from attributes() gets its own table
+    keyed by id, and save() only writes the rows of the objects created,
+    modified or deleted since the last save.
+    """
+    __db_path = os.getenv("HBNB_SQLITE_PATH", "hbnb.db")
+    __connection = None
+    __types = {
+        str: "TEXT",
+        int: "INTEGER",
+        float: "REAL",
+        list: "TEXT",
+        datetime.datetime: "TEXT"
+    }
+
+    def _snapshot(self, changes):
+        """Captures the records of the changed objects, by class."""
+        puts, deletes = {}, {}
+        for key, obj in changes.items():
+            name, obj_id = key.split(".", 1)
+            if obj is None:
+                deletes.setdefault(name, []).append((obj_id,))
+            else:
+                puts.setdefault(name, []).append(obj.to_dict())
+        return puts, deletes
+
+    def _dump(self, payload):
+        """Writes the changed rows in a single transaction."""
+        puts, deletes = payload
+        connection = self.__connect()
+        with connection:
+            for name, rows in deletes.items():
+                connection.executemany(
+                    'DELETE FROM "{}" WHERE id = ?'.format(name), rows)
+            for name, records in puts.items():
+                types = self.__declared(name)
+                columns = list(types) + ["extra"]
+                connection.executemany(
+                    'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                        name, ", ".join(columns),
+                        ", ".join("?" * len(columns))),
+                    (self.__row(types, record) for record in records))
+
+    def _load(self):
+        """Yields the key, record pairs of every table."""
+        connection = self.__connect()
+        for name in self.classes():
+            types = self.__declared(name)
+            columns = list(types) + ["extra"]
+            cursor = connection.execute(
+                'SELECT {} FROM "{}"'.format(", ".join(columns), name))
+            for row in cursor:
+                record = self.__record(name, types, columns, row)
+                yield "{}.{}".format(name, record["id"]), record
+
+    def _lock(self, shared=False, create=True):
+        """Returns a no-op context manager: SQLite locks the database."""
+        return contextlib.nullcontext()
+
+    def _stamp(self):
+        """Returns the data_version, which other connections' commits bump."""
+        return self.__connect().execute("PRAGMA data_version").fetchone()[0]
+
+    def __connect(self):
+        """Opens the database once and creates the missing tables."""
+        if DBStorage.__connection is None:
+            connection = sqlite3.connect(DBStorage.__db_path,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                for name in self.classes():
+                    types = self.__declared(name)
+                    connection.execute(
+                        'CREATE TABLE IF NOT EXISTS "{}" ({})'.format(
+                            name, ", ".join(
+                                "{} {}{}".format(
+                                    column, DBStorage.__types[kind],
+                                    " PRIMARY KEY" if column == "id" else "")
+                                for column, kind in types.items()) +
+                            ", extra TEXT"))
+            DBStorage.__connection = connection
+        return DBStorage.__connection
+
+    def close(self):
+        """Closes the database connection."""
+        if DBStorage.__connection is not None:
+            DBStorage.__connection.close()
+            DBStorage.__connection = None
+
+    def __declared(self, name):
+        """Returns the declared attributes and types of class name."""
+        types = dict(self.attributes()["BaseModel"])
+        types.update(self.attributes().get(name, {}))
+        return types
+
+    def __row(self, types, record):
+        """Returns the column values of a record for the declared types.
+
+        Attributes whose value does not have the declared type (e.g. a
+        string set with the console update command) and attributes that
+        are not declared at all go to the JSON "extra" column, so that a
+        reload gives back exactly what to_dict() returned.
+        """
+        record = dict(record)
+        del record["__class__"]
+        row = []
+        for column, kind in types.items():
+            value = record.get(column)
+            if kind is datetime.datetime:
+                kind = str
+            if type(value) is not kind:
+                row.append(None)
+                continue
+            del record[column]
+            row.append(json.dumps(value) if kind is list else value)
+        row.append(json.dumps(record) if record else None)
+        return row
+
+    def __record(self, name, types, columns, row):
+        """Returns the to_dict() style record of a table row."""
+        record = {}
+        for column, value in zip(columns, row):
+            if value is None:
+                continue
+            if column == "extra":
+                record.update(json.loads(value))
+            elif types[column] is list:
+                record[column] = json.loads(value)
+            else:
+                record[column] = value
+        record["__class__"] = name
+        return record
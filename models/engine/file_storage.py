@@ -1,38 +1,1550 @@
 """This module is the file storage class"""
+import atexit
+import bisect
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import gzip
+import itertools
 import json
+import lzma
+import mmap
 import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from models.engine import binary_store
+from models.engine.binary_store import WHITESPACE, iter_records
+from models.engine.columns import ColumnStore
+from models.engine.geo import GridIndex
+from models.engine.indexes import HashIndex, MultiIndex, SortedIndex
+from models.engine.locking import ReadWriteLock
+from models.engine.query import Query
+from models.engine.text import TextIndex
+
+DECODER = json.JSONDecoder()
+COMPRESSORS = {".gz": gzip, ".xz": lzma}
+SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+
+
+def compressor(path):
+    """Returns the gzip or lzma module for the extension of path, or None."""
+    return COMPRESSORS.get(os.path.splitext(path)[1])
+
+
+def open_text(path):
+    """Opens the JSON file at path for reading, decompressing as needed.
+
+    Compressed files are decompressed block by block as they are read.
+    """
+    module = compressor(path)
+    if module is None:
+        return open(path, "r", encoding="utf-8")
+    return module.open(path, "rt", encoding="utf-8")
+
+
+def read_records(path, lazy=False):
+    """Yields the key, record pairs of the JSON store at path.
+
+    The store is streamed with iter_records(), one record at a time. In
+    lazy mode an uncompressed store is mapped in memory instead, and its
+    records are only decoded when they are first read (see JsonStore).
+    """
+    if lazy and compressor(path) is None and os.path.getsize(path):
+        yield from JsonStore(path).lazy_items()
+        return
+    with open_text(path) as f:
+        yield from iter_records(f)
+
+
+class JsonStore:
+    """A JSON store mapped in memory, read one record at a time.
+
+    It stands in for the binary_store.BinaryStore of lazy reloads: the
+    store is scanned once for the position of every record, and each
+    binary_store.LazyRecord only keeps that position until it is read.
+    The offset of a record packs its position and the length of its
+    "key": record text, as position << 32 | length.
+    """
+
+    def __init__(self, path):
+        """Maps the store at path."""
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def pair(self, offset):
+        """Returns the key and the JSON text of the record at offset."""
+        start = offset >> 32
+        text = self.data[start:start + (offset & 0xFFFFFFFF)].decode(
+            "utf-8")
+        key, p = DECODER.raw_decode(text)
+        p = WHITESPACE.match(text, p).end() + 1
+        return key, text[WHITESPACE.match(text, p).end():]
+
+    def decode(self, offset):
+        """Returns the record stored at offset."""
+        return json.loads(self.pair(offset)[1])
+
+    def raw(self, offset):
+        """Returns the JSON text of the record stored at offset."""
+        return self.pair(offset)[1]
+
+    def lazy_items(self):
+        """Yields every key with a LazyRecord that decodes on access.
+
+        The scan reads the store as latin-1, so that positions in the
+        text are positions in the file; only keys that are not ASCII have
+        to be decoded again.
+        """
+        with open(self.path, "r", encoding="latin-1", newline="") as f:
+            for key, (start, end) in iter_records(f, spans=True):
+                offset = start << 32 | end - start
+                if not key.isascii():
+                    key = self.pair(offset)[0]
+                yield key, binary_store.LazyRecord(self, offset)
+
+
+def dumps(record):
+    """Returns the JSON text of a record, which may be a LazyRecord.
+
+    json.dumps() reads the dict itself, which stays empty until a
+    LazyRecord is loaded: one that was never read is copied from its
+    JSON store as it is, and any other is loaded first.
+    """
+    if isinstance(record, binary_store.LazyRecord):
+        if not record.loaded and isinstance(record.store, JsonStore):
+            return record.raw()
+        record.load()
+    return json.dumps(record)
 
 
 class FileStorage:
     """Class for storing and retrieving data."""
     __file_path = "file.json"
     __objects = {}
+    __journal = os.getenv("HBNB_STORAGE_JOURNAL") == "1"
+    __journal_limit = 1000
+    __journal_size = 0
+    __changes = {}
+    __fragments = {}
+    __version = 0
+    __versions = {}
+    __lazy = os.getenv("HBNB_STORAGE_LAZY") == "1"
+    __compact = os.getenv("HBNB_STORAGE_COMPACT") == "1"
+    __records = {}
+    __by_class = {}
+    __partitioned = None
+    __indexes = {}
+    __sorted = {}
+    __grouped = {}
+    __columns = {}
+    __ranges = {}
+    __grid = None
+    __texts = None
+    __texts_written = None
+    __texts_at_exit = False
+    __durability = os.getenv("HBNB_STORAGE_DURABILITY", "always")
+    __pending = False
+    __writer = None
+    __deferred = False
+    __lock = ReadWriteLock()
+    __executor = None
+    __last = None
+    __next = None
+    __layout = os.getenv("HBNB_STORAGE_LAYOUT", "single")
+    __format = os.getenv("HBNB_STORAGE_FORMAT", "json")
+    __compression = os.getenv("HBNB_STORAGE_COMPRESSION", "")
+    __stamp = None
+    __undo = None
+    __begun = None
+    __savepoints = []
+    __store = None
+    __raw_store = None
+
+    def all(self, cls=None):
+        """Returns a copy of __objects, or only the objects of cls.
+
+        cls is a class or a class name; its objects are read from the
+        per-class partition instead of being filtered out of __objects.
+        The copy can be iterated while other threads add or delete objects.
+        """
+        with FileStorage.__lock.reading(self.__built):
+            if cls is not None:
+                name = cls if isinstance(cls, str) else cls.__name__
+                partition = self.__partitions().get(name, {})
+                for key, obj in list(partition.items()):
+                    if isinstance(obj, dict):
+                        self.__materialize(key)
+                return dict(partition)
+            if FileStorage.__records:
+                for key in list(FileStorage.__records):
+                    self.__materialize(key)
+            return dict(FileStorage.__objects)
+
+    def count(self, cls=None):
+        """Returns the number of objects of cls, or of all objects."""
+        with FileStorage.__lock.reading(self.__built):
+            if cls is None:
+                return (len(FileStorage.__objects) +
+                        len(FileStorage.__records))
+            name = cls if isinstance(cls, str) else cls.__name__
+            return len(self.__partitions().get(name, ()))
+
+    def __built(self):
+        """Tells whether readers can go without building anything.
+
+        Readers hold the lock shared, so they must not change any state;
+        they take the lock exclusively whenever the partitions are out of
+        date or raw records of a lazy reload are left to build.
+        """
+        return (FileStorage.__partitioned is FileStorage.__objects and
+                not FileStorage.__records)
+
+    def __partitions(self):
+        """Returns the objects partitioned by class name.
+
+        The partition maps each class name to a {key: object} dict; in lazy
+        mode an entry holds the raw record until the object is built. It
+        is rebuilt whenever __objects has been replaced as a whole.
+        """
+        if FileStorage.__partitioned is not FileStorage.__objects:
+            partitions = {}
+            for objects in (FileStorage.__objects, FileStorage.__records):
+                for key, obj in objects.items():
+                    partitions.setdefault(key.split(".", 1)[0], {})[key] = obj
+            FileStorage.__by_class = partitions
+            FileStorage.__partitioned = FileStorage.__objects
+            FileStorage.__indexes = {}
+            FileStorage.__sorted = {}
+            FileStorage.__columns = {}
+            FileStorage.__ranges = {}
+            FileStorage.__grid = None
+            FileStorage.__texts = None
+        return FileStorage.__by_class
+
+    def lookup(self, cls, attribute, value):
+        """Returns the objects of cls whose foreign key attribute is value.
+
+        The foreign keys are the <name>_id attributes declared for cls in
+        attributes(). Their hash indexes are built the first time a class
+        is looked up and kept up to date by new(), touch() and delete().
+        Attributes grouped by with group_by() can be looked up as well.
+        The <name>_ids list attributes (e.g. Place.amenity_ids) have a
+        MultiIndex instead, which finds the objects whose list has value.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and name in FileStorage.__indexes):
+            index = self.__indexes_of(name).get(attribute)
+            if index is None:
+                raise ValueError(
+                    "{}.{} is not indexed".format(name, attribute))
+            return {key: self.__object(key) for key in index.lookup(value)}
+
+    def lookup_all(self, cls, attribute, values):
+        """Returns the objects of cls whose list attribute has all values.
+
+        For example storage.lookup_all(Place, "amenity_ids", [wifi.id,
+        tv.id]) finds the places with both amenities. attribute must be
+        one of the <name>_ids lists indexed by a MultiIndex (see
+        lookup()); the sets of keys of the values are intersected
+        smallest first.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and name in FileStorage.__indexes):
+            index = self.__indexes_of(name).get(attribute)
+            if not isinstance(index, MultiIndex):
+                raise ValueError(
+                    "{}.{} is not an indexed list".format(name, attribute))
+            return {key: self.__object(key)
+                    for key in index.lookup_all(values)}
+
+    def iter(self, cls=None, after=None, limit=None):
+        """Yields the key, object pairs of cls (or of all classes) by key.
+
+        The keys come in a stable sorted order, so the key of the last
+        object yielded is a cursor: passing it as after resumes right
+        behind it. At most limit objects are yielded. The objects are
+        fetched one by one, so a large class is never copied whole;
+        objects deleted while iterating are skipped.
+        """
+        if cls is None:
+            with FileStorage.__lock.reading(
+                    lambda: FileStorage.__partitioned is
+                    FileStorage.__objects):
+                names = sorted(self.__partitions())
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        count = 0
+        for name in names:
+            if after is not None and after.split(".", 1)[0] > name:
+                continue
+            keys = self.__sorted_keys(name)
+            start = 0 if after is None else bisect.bisect_right(keys, after)
+            for key in itertools.islice(keys, start, None):
+                if limit is not None and count >= limit:
+                    return
+                obj = self.get(name, key.split(".", 1)[1])
+                if obj is not None:
+                    count += 1
+                    yield key, obj
+
+    def __sorted_keys(self, name):
+        """Returns the sorted keys of class name.
+
+        The list is cached until a key of the class is added or removed,
+        and replaced rather than changed then, so iterators can hold it.
+        """
+        with FileStorage.__lock.reading(
+                lambda: FileStorage.__partitioned is FileStorage.__objects
+                and name in FileStorage.__sorted):
+            keys = FileStorage.__sorted.get(name)
+            if keys is None:
+                keys = sorted(self.__partitions().get(name, ()))
+                FileStorage.__sorted[name] = keys
+            return keys
 
-    def all(self):
-        """Returns the dictionary __objects."""
-        return FileStorage.__objects
+    def query(self, cls):
+        """Returns a lazy Query on the objects of cls (or class name).
+
+        For example storage.query(Place).where(price_by_night__lt=100)
+        .order_by("name").limit(20). Equality conditions on foreign keys
+        are answered from their index, ranges of numbers and the first
+        objects in the order of a number from its sorted index (see
+        ordered()), the rest from the partition of cls.
+        """
+        return Query(self, cls)
+
+    def group_by(self, cls, attribute):
+        """Returns the number of objects of cls per value of attribute.
+
+        The counts come straight from the hash index of attribute, in
+        O(groups). Any attribute declared for cls can be grouped by: the
+        first call builds its index, which is then kept up to date like
+        the foreign key ones, and rebuilt with them after a reload.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and
+                attribute in FileStorage.__indexes.get(name, ())):
+            indexes = self.__indexes_of(name)
+            if attribute not in indexes:
+                if attribute not in self.attributes().get(name, {}):
+                    raise ValueError("{} has no attribute {}".format(
+                        name, attribute))
+                FileStorage.__grouped.setdefault(name, set()).add(attribute)
+                indexes[attribute] = HashIndex(attribute)
+                self.__fill(name, [indexes[attribute]])
+            return indexes[attribute].counts()
+
+    def __indexes_of(self, name):
+        """Returns the attribute -> index dict of class name."""
+        # drops the indexes first if __objects has been replaced
+        self.__partitions()
+        indexes = FileStorage.__indexes.get(name)
+        if indexes is None:
+            indexes = {attribute: HashIndex(attribute)
+                       for attribute, kind in
+                       self.attributes().get(name, {}).items()
+                       if kind is str and attribute.endswith("_id") or
+                       attribute in FileStorage.__grouped.get(name, ())}
+            indexes.update({attribute: MultiIndex(attribute)
+                            for attribute, kind in
+                            self.attributes().get(name, {}).items()
+                            if kind is list and attribute.endswith("_ids")})
+            self.__fill(name, indexes.values())
+            FileStorage.__indexes[name] = indexes
+        return indexes
+
+    def __fill(self, name, indexes):
+        """Adds every object of class name to indexes."""
+        default = self.classes().get(name)
+        for key, obj in self.__partitions().get(name, {}).items():
+            for index in indexes:
+                if isinstance(obj, dict):
+                    value = obj.get(index.attribute,
+                                    getattr(default, index.attribute, None))
+                else:
+                    value = getattr(obj, index.attribute, None)
+                index.add(key, value)
+
+    def __reindex(self, key, obj):
+        """Updates the entries of obj in the indexes of its class."""
+        for attribute, index in FileStorage.__indexes.get(
+                type(obj).__name__, {}).items():
+            index.add(key, getattr(obj, attribute, None))
+        columns = FileStorage.__columns.get(type(obj).__name__)
+        if columns is not None:
+            columns.set(key, [getattr(obj, attribute, None)
+                              for attribute in columns.columns])
+        for attribute, index in FileStorage.__ranges.get(
+                type(obj).__name__, {}).items():
+            index.add(key, getattr(obj, attribute, None))
+        if (FileStorage.__grid is not None and
+                type(obj).__name__ in self.__located()):
+            FileStorage.__grid.add(key, getattr(obj, "latitude", None),
+                                   getattr(obj, "longitude", None))
+        texts = (FileStorage.__texts or {}).get(type(obj).__name__)
+        if texts is not None:
+            texts.add(key, [getattr(obj, field, None)
+                            for field in texts.fields])
+
+    def filter(self, cls, **conditions):
+        """Returns the ids of the objects of cls meeting every condition.
+
+        Conditions are written like those of Query.where(), on the int
+        and float attributes declared for cls, with the exact, ne, lt,
+        lte, gt and gte operators; for example storage.filter(Place,
+        price_by_night__lt=100, max_guest__gte=4). They are checked on
+        the columns of a ColumnStore rather than object by object, so no
+        object is built. The columns are built on the first call and
+        kept up to date like the indexes. The ids come in no given order.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        parsed = Query(self, name).where(**conditions).conditions
+        with FileStorage.__lock.reading(
+                lambda: FileStorage.__partitioned is FileStorage.__objects
+                and name in FileStorage.__columns):
+            columns = self.__columns_of(name)
+            return [key.split(".", 1)[1] for key in columns.filter(parsed)]
+
+    def __columns_of(self, name):
+        """Returns the ColumnStore of the numbers declared for class name."""
+        partition = self.__partitions().get(name, {})
+        columns = FileStorage.__columns.get(name)
+        if columns is None:
+            columns = ColumnStore(
+                attribute for attribute, kind in
+                self.attributes().get(name, {}).items()
+                if kind in (int, float))
+            default = self.classes().get(name)
+            for key, obj in partition.items():
+                if isinstance(obj, dict):
+                    values = [obj.get(attribute,
+                                      getattr(default, attribute, None))
+                              for attribute in columns.columns]
+                else:
+                    values = [getattr(obj, attribute, None)
+                              for attribute in columns.columns]
+                columns.set(key, values)
+            FileStorage.__columns[name] = columns
+        return columns
+
+    def ordered(self, cls, attribute, limit=None, descending=False,
+                **bounds):
+        """Returns the objects of cls ordered by a numeric attribute.
+
+        Only the objects whose value is within bounds (any of gt, gte, lt
+        and lte) are returned, at most limit of them, the largest values
+        first if descending; objects whose value is not a number are left
+        out. The int and float attributes declared for cls in attributes()
+        have a SortedIndex, built on the first call and kept up to date
+        like the other indexes, so that this takes O(log n + limit).
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and name in FileStorage.__ranges):
+            index = self.__ranges_of(name).get(attribute)
+            if index is None:
+                raise ValueError(
+                    "{}.{} is not a number".format(name, attribute))
+            return [self.__object(key) for key in
+                    index.range(limit, descending, **bounds)]
+
+    def __ranges_of(self, name):
+        """Returns the attribute -> SortedIndex dict of class name."""
+        partition = self.__partitions().get(name, {})
+        ranges = FileStorage.__ranges.get(name)
+        if ranges is None:
+            ranges = {}
+            default = self.classes().get(name)
+            for attribute, kind in self.attributes().get(name, {}).items():
+                if kind not in (int, float):
+                    continue
+                ranges[attribute] = SortedIndex(attribute)
+                ranges[attribute].fill(
+                    (key, obj.get(attribute, getattr(default, attribute))
+                     if isinstance(obj, dict) else
+                     getattr(obj, attribute, None))
+                    for key, obj in partition.items())
+            FileStorage.__ranges[name] = ranges
+        return ranges
+
+    def nearby(self, lat, lon, radius_km, limit=None):
+        """Returns the objects within radius_km of a point, nearest first.
+
+        The result is a list of object, distance in km pairs, at most
+        limit long. The objects searched are those of the classes that
+        declare a latitude and a longitude (see __located()); they are
+        found through a GridIndex of their coordinates, built on the
+        first search and kept up to date like the other indexes.
+        """
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and
+                FileStorage.__grid is not None):
+            found = self.__grid_of().nearby(lat, lon, radius_km, limit)
+            return [(self.__object(key), distance)
+                    for distance, key in found]
+
+    def within(self, bbox):
+        """Returns the objects located inside a bounding box.
+
+        bbox is a (south, west, north, east) tuple of degrees, edges
+        included; west greater than east crosses the antimeridian.
+        """
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and
+                FileStorage.__grid is not None):
+            return {key: self.__object(key)
+                    for key in self.__grid_of().within(*bbox)}
+
+    def __located(self):
+        """Returns the names of the classes with coordinates."""
+        return [name for name, types in self.attributes().items()
+                if types.get("latitude") is float and
+                types.get("longitude") is float]
+
+    def __grid_of(self):
+        """Returns the GridIndex of the located objects, building it."""
+        partitions = self.__partitions()
+        if FileStorage.__grid is None:
+            grid = GridIndex()
+            for name in self.__located():
+                default = self.classes().get(name)
+                for key, obj in partitions.get(name, {}).items():
+                    if isinstance(obj, dict):
+                        grid.add(key, obj.get("latitude", default.latitude),
+                                 obj.get("longitude", default.longitude))
+                    else:
+                        grid.add(key, getattr(obj, "latitude", None),
+                                 getattr(obj, "longitude", None))
+            FileStorage.__grid = grid
+        return FileStorage.__grid
+
+    def __object(self, key):
+        """Returns the object of key, building it if it is still raw."""
+        obj = FileStorage.__objects.get(key)
+        return self.__materialize(key) if obj is None else obj
+
+    def search(self, cls, text, limit=None):
+        """Returns the objects of cls whose text matches, best first.
+
+        The result is a list of object, score pairs, at most limit long.
+        The words of text must all appear in the text attributes of an
+        object (see __text_fields()), unless text has the word OR, and a
+        word ending with "*" matches the words it is a prefix of; see
+        TextIndex.search(). The TextIndex of cls is built on the first
+        search, kept up to date like the other indexes and saved next to
+        the store, so that it is read back rather than built again after
+        a reload when the store has not changed meanwhile.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading(
+                lambda: self.__built() and
+                name in (FileStorage.__texts or ())):
+            found = self.__texts_of(name).search(text, limit)
+            return [(self.__object(key), score) for score, key in found]
+
+    def __text_fields(self, name):
+        """Returns the text attributes of class name.
+
+        Those are the str attributes declared in attributes(), but for
+        the ids, foreign keys and passwords.
+        """
+        return [attribute for attribute, kind in
+                self.attributes().get(name, {}).items()
+                if kind is str and attribute not in ("id", "password") and
+                not attribute.endswith("_id")]
+
+    def __texts_of(self, name):
+        """Returns the TextIndex of class name, reading or building it."""
+        partitions = self.__partitions()
+        if FileStorage.__texts is None:
+            FileStorage.__texts = self.__read_texts()
+        texts = FileStorage.__texts.get(name)
+        if texts is None:
+            fields = self.__text_fields(name)
+            if not fields:
+                raise ValueError("{} has no text attribute".format(name))
+            texts = TextIndex(fields)
+            default = self.classes().get(name)
+            for key, obj in partitions.get(name, {}).items():
+                if isinstance(obj, dict):
+                    texts.add(key, [obj.get(field,
+                                            getattr(default, field, None))
+                                    for field in fields])
+                else:
+                    texts.add(key, [getattr(obj, field, None)
+                                    for field in fields])
+            FileStorage.__texts[name] = texts
+            FileStorage.__texts_written = None
+            self.__write_texts()
+            if not FileStorage.__texts_at_exit:
+                atexit.register(self.__write_texts_at_exit)
+                FileStorage.__texts_at_exit = True
+        return texts
+
+    def __text_path(self):
+        """Returns the path of the saved text indexes."""
+        return FileStorage.__file_path + ".text"
+
+    def __settled(self):
+        """Tells whether the store holds what was read or written last.
+
+        That is, every write is done and went fine, and no other
+        process wrote the store since.
+        """
+        last = FileStorage.__last
+        return (isinstance(FileStorage.__stamp, dict) and
+                (last is None or last.done() and last.exception() is None)
+                and self._stamp() == FileStorage.__stamp)
+
+    def __read_texts(self):
+        """Returns the text indexes saved for the store, if up to date.
+
+        They are when the store did not change since they were saved;
+        the changes made here and not saved yet are indexed on top.
+        """
+        if not self.__settled():
+            return {}
+        try:
+            with open(self.__text_path(), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            stamp = {path: tuple(value) if value else None
+                     for path, value in saved["stamp"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+        if stamp != FileStorage.__stamp:
+            return {}
+        FileStorage.__texts_written = FileStorage.__stamp
+        texts = {}
+        for name, entry in saved.get("classes", {}).items():
+            if entry["fields"] != self.__text_fields(name):
+                continue
+            texts[name] = TextIndex(entry["fields"])
+            for key, counts in entry["docs"].items():
+                texts[name].load(key, counts)
+        for key, obj in FileStorage.__changes.items():
+            index = texts.get(key.split(".", 1)[0])
+            if index is not None and obj is None:
+                index.remove(key)
+            elif index is not None:
+                index.add(key, [getattr(obj, field, None)
+                                for field in index.fields])
+        return texts
+
+    def __write_texts(self):
+        """Saves the text indexes next to the store, with its _stamp().
+
+        Nothing is written unless the indexes match the store on disk,
+        i.e. every change is saved, or if they were saved for it already.
+        """
+        if (not FileStorage.__texts or FileStorage.__changes or
+                not self.__settled() or
+                FileStorage.__texts_written == FileStorage.__stamp):
+            return
+        path = self.__text_path()
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"stamp": FileStorage.__stamp,
+                           "classes": {
+                               name: {"fields": index.fields,
+                                      "docs": index.docs}
+                               for name, index in
+                               FileStorage.__texts.items()}}, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            # the indexes are only a cache of the store
+            return
+        FileStorage.__texts_written = FileStorage.__stamp
+
+    def __write_texts_at_exit(self):
+        """Saves the text indexes once the last changes are written."""
+        try:
+            self.flush()
+        except Exception:
+            return
+        with FileStorage.__lock:
+            self.__write_texts()
+
+    def get(self, cls, id):
+        """Returns the object of class cls (or class name) with id."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        with FileStorage.__lock.reading(
+                lambda: key not in FileStorage.__records):
+            obj = FileStorage.__objects.get(key)
+            if obj is None and key in FileStorage.__records:
+                obj = self.__materialize(key)
+            return obj
+
+    def __materialize(self, key):
+        """Builds the object of a record left raw by a lazy reload."""
+        record = FileStorage.__records.pop(key)
+        obj = self.classes()[record["__class__"]](**record)
+        FileStorage.__objects[key] = obj
+        self.__partitions()[key.split(".", 1)[0]][key] = obj
+        cached = FileStorage.__fragments.get(key)
+        if cached is not None and cached[0] is record:
+            FileStorage.__fragments[key] = (obj, cached[1])
+        return obj
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id."""
-        key = "{}.{}".format(type(obj).__name__, obj.id)
-        FileStorage.__objects[key] = obj
+        with FileStorage.__lock:
+            key = "{}.{}".format(type(obj).__name__, obj.id)
+            partitions = self.__partitions()
+            self.__backup(key)
+            FileStorage.__objects[key] = obj
+            FileStorage.__records.pop(key, None)
+            partition = partitions.setdefault(type(obj).__name__, {})
+            if key not in partition:
+                FileStorage.__sorted.pop(type(obj).__name__, None)
+            partition[key] = obj
+            self.__reindex(key, obj)
+            FileStorage.__changes[key] = obj
+            self.__bump(key)
+
+    def touch(self, obj):
+        """Records obj as modified since the last save.
+
+        BaseModel calls this whenever an attribute is set, so the cached
+        JSON of obj is dropped and re-encoded on the next save, and its
+        index entries are refreshed. In-place
+        changes (e.g. appending to a list) are only seen once an attribute
+        is assigned again, which BaseModel.save() does via updated_at.
+        During a transaction BaseModel also calls it before the assignment,
+        so that the previous state of obj can be restored by rollback().
+        """
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if FileStorage.__objects.get(key) is not obj:
+            # not stored (yet): new() indexes it when it is
+            return
+        with FileStorage.__lock:
+            if FileStorage.__objects.get(key) is obj:
+                self.__backup(key)
+                FileStorage.__changes[key] = obj
+                FileStorage.__fragments.pop(key, None)
+                self.__bump(key)
+                self.__reindex(key, obj)
+
+    def delete(self, obj=None):
+        """Deletes obj from __objects if it's inside."""
+        with FileStorage.__lock:
+            if obj is None:
+                return
+            key = "{}.{}".format(type(obj).__name__, obj.id)
+            partitions = self.__partitions()
+            self.__backup(key)
+            if (FileStorage.__objects.pop(key, None) is not None or
+                    FileStorage.__records.pop(key, None) is not None):
+                partitions[type(obj).__name__].pop(key, None)
+                FileStorage.__sorted.pop(type(obj).__name__, None)
+                for index in FileStorage.__indexes.get(
+                        type(obj).__name__, {}).values():
+                    index.remove(key)
+                columns = FileStorage.__columns.get(type(obj).__name__)
+                if columns is not None:
+                    columns.remove(key)
+                for index in FileStorage.__ranges.get(
+                        type(obj).__name__, {}).values():
+                    index.remove(key)
+                if FileStorage.__grid is not None:
+                    FileStorage.__grid.remove(key)
+                texts = (FileStorage.__texts or {}).get(type(obj).__name__)
+                if texts is not None:
+                    texts.remove(key)
+                FileStorage.__changes[key] = None
+                FileStorage.__fragments.pop(key, None)
+                self.__bump(key)
+
+    def __bump(self, key):
+        """Records that key changed since the snapshots taken so far.
+
+        _dump() only caches the JSON it wrote for a key that has not
+        changed since its snapshot was taken, which a later save may
+        already have taken out of __changes.
+        """
+        FileStorage.__version += 1
+        FileStorage.__versions[key] = FileStorage.__version
+
+    def delete_cascade(self, obj):
+        """Deletes obj and every object that depends on it.
+
+        An object depends on obj when one of its foreign keys (see
+        references()) is the id of obj, or of an object depending on obj:
+        deleting a State deletes its cities, their places and the reviews
+        of those. The dependents are found through the foreign key
+        indexes. Nothing is saved; returns the number of objects deleted.
+        """
+        references = self.references()
+        with FileStorage.__lock:
+            if self.get(type(obj), obj.id) is not obj:
+                return 0
+            found = {"{}.{}".format(type(obj).__name__, obj.id): obj}
+            queue = collections.deque([obj])
+            while queue:
+                parent = queue.popleft()
+                for name, attribute in references.get(
+                        type(parent).__name__, ()):
+                    for key, child in self.lookup(
+                            name, attribute, parent.id).items():
+                        if key not in found:
+                            found[key] = child
+                            queue.append(child)
+            for child in found.values():
+                self.delete(child)
+            return len(found)
+
+    def references(self):
+        """Returns the foreign keys referring to each class.
+
+        The result maps a class name to the class name, attribute pairs
+        of the <name>_id attributes declared in attributes() that hold
+        the ids of its objects, e.g. "City" to [("Place", "city_id")].
+        """
+        names = {name.lower(): name for name in self.classes()}
+        references = {}
+        for name, types in self.attributes().items():
+            for attribute, kind in types.items():
+                parent = names.get(attribute[:-len("_id")])
+                if (kind is str and attribute.endswith("_id") and
+                        parent is not None):
+                    references.setdefault(parent, []).append(
+                        (name, attribute))
+        return references
+
+    def __backup(self, key):
+        """Remembers the state of key for rollback(), once a transaction."""
+        undo = FileStorage.__undo
+        if undo is None or key in undo:
+            return
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            undo[key] = (FileStorage.__records.get(key), None)
+        else:
+            undo[key] = (obj, dict(obj.__dict__))
+
+    def begin(self):
+        """Starts a transaction, or nests one in the current transaction.
+
+        Until the outermost transaction is committed, save() only records
+        that there is something to save and flush() leaves it alone. The
+        transaction covers the whole storage, whichever thread changes it.
+        A nested transaction is a savepoint: rolling it back only undoes
+        the changes made since it began.
+        """
+        with FileStorage.__lock:
+            if FileStorage.__undo is not None:
+                FileStorage.__savepoints.append(
+                    (FileStorage.__undo, FileStorage.__begun))
+            FileStorage.__undo = {}
+            FileStorage.__begun = (dict(FileStorage.__changes),
+                                   FileStorage.__pending)
+
+    def commit(self):
+        """Ends a transaction, saving its changes once if it is outermost.
+
+        Returns the handle of the write like save() does, or None when
+        nothing was saved.
+        """
+        with FileStorage.__lock:
+            if FileStorage.__undo is None:
+                raise RuntimeError("no transaction in progress")
+            if FileStorage.__savepoints:
+                # the enclosing transaction now undoes these changes too
+                undo, FileStorage.__begun = FileStorage.__savepoints.pop()
+                for key, entry in FileStorage.__undo.items():
+                    undo.setdefault(key, entry)
+                FileStorage.__undo = undo
+                return None
+            FileStorage.__undo = None
+            FileStorage.__begun = None
+            pending = FileStorage.__pending
+        return self.save() if pending else None
+
+    def rollback(self):
+        """Aborts the innermost transaction.
+
+        Objects created since its begin() are dropped, deleted ones come
+        back and modified ones get their attributes back. Values changed
+        in place (e.g. a list appended to) are not restored. An enclosing
+        transaction goes on with the changes made before the nested one.
+        """
+        with FileStorage.__lock:
+            if FileStorage.__undo is None:
+                raise RuntimeError("no transaction in progress")
+            # a new dict makes the partitions and indexes rebuild
+            objects = dict(FileStorage.__objects)
+            for key, (obj, state) in FileStorage.__undo.items():
+                objects.pop(key, None)
+                FileStorage.__records.pop(key, None)
+                FileStorage.__fragments.pop(key, None)
+                self.__bump(key)
+                if obj is None:
+                    continue
+                if state is None:
+                    FileStorage.__records[key] = obj
+                    continue
+                obj.__dict__.clear()
+                obj.__dict__.update(state)
+                objects[key] = obj
+            FileStorage.__objects = objects
+            FileStorage.__changes, FileStorage.__pending = FileStorage.__begun
+            if FileStorage.__savepoints:
+                (FileStorage.__undo,
+                 FileStorage.__begun) = FileStorage.__savepoints.pop()
+            else:
+                FileStorage.__undo = None
+                FileStorage.__begun = None
+
+    def in_transaction(self):
+        """Tells whether a transaction is in progress."""
+        return FileStorage.__undo is not None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs the block in a transaction.
+
+        The changes are saved once when the block ends, or rolled back
+        if it raises.
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            if self.in_transaction():
+                self.rollback()
+            raise
+        self.commit()
 
     def save(self):
-        """Serializes __objects to the JSON file (path: __file_path)."""
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as f:
-            d = {k: v.to_dict() for k, v in FileStorage.__objects.items()}
-            json.dump(d, f)
+        """Serializes __objects to the JSON file (path: __file_path).
+
+        The objects are captured right away and written by a background
+        writer; the returned future completes once they are on disk. When
+        the write happens depends on the durability policy: "always" waits
+        for it, "async" returns at once, "interval=N" coalesces saves and
+        writes at most once every N milliseconds and "on_exit" waits for
+        flush(), which also runs at interpreter exit. During a transaction
+        nothing is written before commit().
+        """
+        with FileStorage.__lock:
+            FileStorage.__pending = True
+            policy = FileStorage.__durability
+            deferred = policy.startswith("interval=") or policy == "on_exit"
+            if deferred:
+                self.__defer(policy)
+            if deferred or FileStorage.__undo is not None:
+                if FileStorage.__next is None:
+                    FileStorage.__next = concurrent.futures.Future()
+                return FileStorage.__next
+            handle = self.__submit()
+        if policy != "async":
+            handle.result()
+        return handle
+
+    def flush(self):
+        """Writes the saved changes and waits until every write is done.
+
+        Changes saved during a transaction are left for commit().
+        """
+        with FileStorage.__lock:
+            if FileStorage.__pending and FileStorage.__undo is None:
+                self.__submit()
+            handle = FileStorage.__last
+        if handle is not None:
+            handle.result()
+
+    def __submit(self):
+        """Hands the pending changes over to the writer thread."""
+        payload = self._snapshot(FileStorage.__changes)
+        FileStorage.__changes = {}
+        FileStorage.__pending = False
+        try:
+            if FileStorage.__executor is None:
+                FileStorage.__executor = (
+                    concurrent.futures.ThreadPoolExecutor(max_workers=1))
+            handle = FileStorage.__executor.submit(self._dump, payload)
+        except RuntimeError:
+            # the interpreter is exiting: write from this thread instead
+            handle = concurrent.futures.Future()
+            try:
+                self._dump(payload)
+                handle.set_result(None)
+            except Exception as e:
+                handle.set_exception(e)
+        FileStorage.__last = handle
+        if FileStorage.__next is not None:
+            waiting, FileStorage.__next = FileStorage.__next, None
+            handle.add_done_callback(
+                lambda done: waiting.set_exception(done.exception())
+                if done.exception() else waiting.set_result(None))
+        return handle
+
+    def __defer(self, policy):
+        """Makes sure deferred saves get flushed.
+
+        Saves are flushed at interpreter exit and, for "interval=N", by a
+        background thread every N milliseconds.
+        """
+        if not FileStorage.__deferred:
+            atexit.register(self.flush)
+            FileStorage.__deferred = True
+        if policy.startswith("interval=") and (
+                FileStorage.__writer is None or
+                not FileStorage.__writer.is_alive()):
+            FileStorage.__writer = threading.Thread(
+                target=self.__write_loop,
+                args=(int(policy[len("interval="):]) / 1000,), daemon=True)
+            FileStorage.__writer.start()
+
+    def __write_loop(self, interval):
+        """Flushes the pending saves every interval seconds."""
+        while FileStorage.__durability.startswith("interval="):
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                # the error is on the future of the failed write already
+                pass
+
+    def _snapshot(self, changes):
+        """Captures what _dump() needs to persist changes.
+
+        changes maps keys to the objects put (or None if deleted) since the
+        last save. This runs under the storage lock, while _dump() runs on
+        the writer thread, so nothing returned may be shared with objects
+        that can still change. Other engines override this method.
+
+        The result maps each file to write to its key, object, JSON items,
+        next to the set of keys changed and the version of the storage
+        the items were captured at.
+        In journal mode only the changes are captured; the whole store is
+        captured once the journal grows larger than the store itself. In
+        the sharded layout only the shards of the changed classes are.
+        """
+        version = FileStorage.__version
+        if FileStorage.__format == "binary":
+            return "binary", {self.__binary_path(): [
+                (key, obj, self.__fragment(key, obj))
+                for objects in (FileStorage.__objects, FileStorage.__records)
+                for key, obj in objects.items()]}, set(changes), version
+        if FileStorage.__layout == "sharded":
+            partitions = self.__partitions()
+            names = {key.split(".", 1)[0] for key in changes}
+            if not os.path.isdir(self.__shard_dir()):
+                names.update(partitions)
+            return "snapshot", {
+                self.__shard_path(name): [
+                    (key, obj, self.__fragment(key, obj))
+                    for key, obj in partitions.get(name, {}).items()]
+                for name in names}, set(changes), version
+        limit = max(FileStorage.__journal_limit,
+                    len(FileStorage.__objects) + len(FileStorage.__records))
+        if (FileStorage.__journal and FileStorage.__journal_size < limit and
+                self.__snapshot_path() is not None):
+            FileStorage.__journal_size += len(changes)
+            return "journal", {self.__journal_path(): [
+                (key, obj, None if obj is None else self.__fragment(key, obj))
+                for key, obj in changes.items()]}, set(changes), version
+        FileStorage.__journal_size = 0
+        return "snapshot", {self.__store_path(): [
+            (key, obj, self.__fragment(key, obj))
+            for objects in (FileStorage.__objects, FileStorage.__records)
+            for key, obj in objects.items()]}, set(changes), version
+
+    def _dump(self, payload):
+        """Writes what _snapshot() captured; runs on the writer thread.
+
+        The snapshot goes to a temporary file that is fsynced and renamed
+        over the JSON file, so a crash leaves either the old or the new
+        store on disk, never a truncated one. An uncompressed store left
+        over from before compression was enabled is retired afterwards.
+
+        The files are written under the advisory lock of the store. If
+        another process wrote them since this one last read them, the
+        records it saved are merged in first: the keys changed here keep
+        their new version and every other key gets the one on disk.
+        """
+        kind, files, changed, version = payload
+        class_names = list(self.classes())
+        class_ids = {name: i for i, name in enumerate(class_names)}
+        encoded = []
+        for items in files.values():
+            for i, (key, obj, fragment) in enumerate(items):
+                if isinstance(fragment, dict):
+                    if kind == "binary":
+                        fragment = binary_store.encode(fragment, class_ids)
+                    else:
+                        fragment = dumps(fragment)
+                    encoded.append((key, obj, fragment))
+                    items[i] = (key, obj, fragment)
+        with self._lock():
+            stale = self.__stale()
+            for path, items in files.items():
+                if kind == "journal":
+                    self.__append_journal(path, items)
+                    continue
+                if stale:
+                    items = self.__merge(kind, path, items, changed,
+                                         class_ids)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                if kind == "binary":
+                    self.__write_atomic(path, items, class_names)
+                else:
+                    self.__write_atomic(path, items)
+                if path != self.__store_path():
+                    continue
+                if os.path.isfile(self.__journal_path()):
+                    os.remove(self.__journal_path())
+                if (path != FileStorage.__file_path and
+                        os.path.isfile(FileStorage.__file_path)):
+                    os.replace(FileStorage.__file_path,
+                               FileStorage.__file_path + ".migrated")
+            stamp = self._stamp()
+        with FileStorage.__lock:
+            if not stale:
+                FileStorage.__stamp = stamp
+            for key, obj, fragment in encoded:
+                current = FileStorage.__objects.get(
+                    key, FileStorage.__records.get(key))
+                if (current is obj and
+                        FileStorage.__versions.get(key, 0) <= version):
+                    FileStorage.__fragments[key] = (obj, fragment)
+
+    def __merge(self, kind, path, items, changed, class_ids):
+        """Returns items with the other records found at path merged in."""
+        if kind == "binary":
+            disk = {}
+            if os.path.isfile(path):
+                store = binary_store.BinaryStore(path)
+                try:
+                    disk = dict(store.items())
+                finally:
+                    store.close()
+        elif path == self.__store_path():
+            disk = dict(self.__replay(self.__read_journal()))
+        else:
+            disk = dict(read_records(path)) if os.path.isfile(path) else {}
+        merged = []
+        for key, obj, fragment in items:
+            if key in changed:
+                merged.append((key, obj, fragment))
+            elif key in disk:
+                merged.append((key, None, disk.pop(key)))
+        merged.extend((key, None, record) for key, record in disk.items()
+                      if key not in changed)
+        return [(key, obj, binary_store.encode(fragment, class_ids)
+                 if kind == "binary" else dumps(fragment))
+                if obj is None else (key, obj, fragment)
+                for key, obj, fragment in merged]
+
+    def _lock(self, shared=False, create=True):
+        """Returns a context manager holding the store against others.
+
+        That is an advisory fcntl lock on a .lock file next to the JSON
+        file: writes hold it exclusively, reads shared. Reads pass create
+        False: a store that was never written has no lock file and no
+        writer to wait for, and merely reading it leaves no file behind.
+        Without fcntl (e.g. on Windows) nothing is locked. Other engines
+        override this method.
+        """
+        if fcntl is None:
+            return contextlib.nullcontext()
+        return self.__flock(fcntl.LOCK_SH if shared else fcntl.LOCK_EX,
+                            create)
+
+    @contextlib.contextmanager
+    def __flock(self, operation, create):
+        """Holds the lock file with flock() while the block runs."""
+        path = FileStorage.__file_path + ".lock"
+        if create:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                yield
+                return
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+    def _stamp(self):
+        """Returns a value that changes whenever the store is written.
+
+        That maps the path of every file of the store to its inode, size
+        and modification time, so an atomic rename is noticed even within
+        the same clock tick. Other engines override this method.
+        """
+        stamp = {}
+        for path in self.__watched():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp[path] = None
+                continue
+            stamp[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+        return stamp
+
+    def __stale(self):
+        """Tells whether another process wrote the store read last.
+
+        A store at other paths than the one read last (or one that was
+        only read by another engine) was never read, so it is not stale
+        either.
+        """
+        stamp, last = self._stamp(), FileStorage.__stamp
+        if not isinstance(last, dict) or stamp.keys() != last.keys():
+            return False
+        return stamp != last
+
+    def __watched(self):
+        """Returns the paths of the files the store may be read from."""
+        if FileStorage.__format == "binary":
+            return [self.__binary_path()]
+        if FileStorage.__layout == "sharded":
+            return [self.__shard_path(name) for name in self.classes()]
+        return [self.__store_path(), FileStorage.__file_path,
+                self.__journal_path()]
+
+    def __append_journal(self, path, items):
+        """Appends one put/delete record per key, object, JSON item."""
+        with open(path, "a", encoding="utf-8") as f:
+            for key, obj, fragment in items:
+                if obj is None:
+                    f.write('{{"op": "delete", "key": {}}}\n'.format(
+                        json.dumps(key)))
+                else:
+                    f.write('{{"op": "put", "key": {}, "obj": {}}}\n'.format(
+                        json.dumps(key), fragment))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __write_atomic(self, path, items, class_names=None):
+        """Writes the key, object, fragment items as the store at path.
+
+        The fragments are JSON, or binary records encoded with the ids of
+        class_names when it is given. JSON is compressed on the fly when
+        path has a .gz or .xz extension.
+        """
+        tmp_path = path + ".tmp"
+        try:
+            if class_names is not None:
+                with open(tmp_path, "wb") as f:
+                    binary_store.write(f, ((key, fragment)
+                                           for key, obj, fragment in items),
+                                       class_names)
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                with open(tmp_path, "wb") as raw:
+                    module = compressor(path)
+                    f = raw if module is None else module.open(raw, "wb")
+                    f.write(b"{")
+                    sep = ""
+                    for key, obj, fragment in items:
+                        f.write("{}{}: {}".format(sep, json.dumps(key),
+                                                  fragment).encode("utf-8"))
+                        sep = ", "
+                    f.write(b"}")
+                    if f is not raw:
+                        f.close()
+                    raw.flush()
+                    os.fsync(raw.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(path) or ".", os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def __fragment(self, key, obj):
+        """Returns the cached JSON of obj, or its record to be encoded.
+
+        obj is either a model instance or a raw record of a lazy reload.
+        Records of a lazy reload that were never decoded are copied as
+        they are.
+        """
+        binary = FileStorage.__format == "binary"
+        cached = FileStorage.__fragments.get(key)
+        if (cached is not None and cached[0] is obj and
+                isinstance(cached[1], bytes) == binary):
+            return cached[1]
+        if isinstance(obj, binary_store.LazyRecord) and not obj.loaded:
+            if (obj.store is FileStorage.__raw_store if binary
+                    else isinstance(obj.store, JsonStore)):
+                return obj.raw()
+        return obj if isinstance(obj, dict) else obj.to_dict()
+
+    def __journal_path(self):
+        """Returns the path of the journal next to the JSON file."""
+        return FileStorage.__file_path + ".log"
 
     def reload(self):
-        """Reloads the stored objects."""
-        if not os.path.isfile(FileStorage.__file_path):
+        """Reloads the stored objects.
+
+        Records are handed to their class one at a time as they are read,
+        so the whole parsed store is never held in memory next to the
+        objects. In lazy mode the records are only indexed by key and each
+        object is built the first time it is accessed; an uncompressed
+        JSON store is mapped in memory and only the position of each
+        record is kept. It is still scanned from end to end, which the
+        binary format (HBNB_STORAGE_FORMAT=binary) avoids.
+        """
+        if FileStorage.__last is not None:
+            concurrent.futures.wait([FileStorage.__last])
+        with FileStorage.__lock, self._lock(create=False):
+            records = self._load()
+            FileStorage.__stamp = self._stamp()
+            if records is None:
+                return
+            classes = self.classes()
+            lazy = FileStorage.__lazy
+            obj_dict = {}
+            for key, record in records:
+                obj_dict[key] = record if lazy else (
+                    classes[record["__class__"]](**record))
+            FileStorage.__records = obj_dict if lazy else {}
+            FileStorage.__objects = {} if lazy else obj_dict
+            FileStorage.__changes = {}
+            FileStorage.__fragments = {}
+            FileStorage.__versions = {}
+            FileStorage.__pending = False
+
+    def sync(self):
+        """Merges the changes other processes saved to the store.
+
+        Only the _stamp() of the store is compared, which is cheap; the
+        store is read again when it differs from the one read or written
+        last. Objects changed here and not saved yet keep their version,
+        and unchanged objects keep their identity. Returns whether the
+        store was read, which never happens during a transaction.
+        """
+        if FileStorage.__last is not None:
+            concurrent.futures.wait([FileStorage.__last])
+        with FileStorage.__lock:
+            if (FileStorage.__undo is not None or
+                    self._stamp() == FileStorage.__stamp):
+                return False
+            with self._lock(shared=True, create=False):
+                records = self._load()
+                FileStorage.__stamp = self._stamp()
+                classes = self.classes()
+                changes = FileStorage.__changes
+                current = FileStorage.__objects
+                objects, raw = {}, {}
+                for key, record in records or ():
+                    if key in changes:
+                        continue
+                    obj = current.get(key)
+                    if obj is not None and obj.to_dict() == record:
+                        objects[key] = obj
+                    elif FileStorage.__lazy:
+                        raw[key] = record
+                    else:
+                        objects[key] = classes[record["__class__"]](**record)
+                for key, obj in changes.items():
+                    if obj is not None:
+                        objects[key] = obj
+                FileStorage.__objects = objects
+                FileStorage.__records = raw
+                FileStorage.__fragments = {
+                    key: cached
+                    for key, cached in FileStorage.__fragments.items()
+                    if objects.get(key, raw.get(key)) is cached[0]}
+        return True
+
+    def _load(self):
+        """Returns an iterator of the stored key, record pairs.
+
+        The snapshot is read first and any journal left next to it is
+        replayed on top. Returns None when nothing has been stored yet.
+        Other engines override this method.
+
+        In the sharded layout every class has its own file, and the
+        shards are streamed one after the other. A single-file store
+        found there instead is migrated to shards first.
+
+        The binary format is mapped in memory; in lazy mode each record is
+        only decoded when it is first read. A JSON store found instead is
+        converted first.
+        """
+        if FileStorage.__format == "binary":
+            if not os.path.isfile(self.__binary_path()):
+                self.__convert_to_binary()
+            if not os.path.isfile(self.__binary_path()):
+                return None
+            if FileStorage.__store is not None:
+                FileStorage.__store.close()
+            store = binary_store.BinaryStore(self.__binary_path())
+            FileStorage.__store = store
+            FileStorage.__raw_store = (
+                store if store.classes == list(self.classes()) else None)
+            if FileStorage.__lazy:
+                return store.lazy_items()
+            return store.items()
+        if FileStorage.__layout == "sharded":
+            if not os.path.isdir(self.__shard_dir()):
+                self.__migrate()
+            return self.__read_shards()
+        journal = self.__read_journal()
+        if not journal and self.__snapshot_path() is None:
+            return None
+        return self.__replay(journal)
+
+    def __shard_dir(self):
+        """Returns the directory holding the per-class shards."""
+        return FileStorage.__file_path + ".d"
+
+    def __shard_path(self, name):
+        """Returns the path of the shard of class name."""
+        return os.path.join(self.__shard_dir(), name + ".json" +
+                            SUFFIXES.get(FileStorage.__compression, ""))
+
+    def __store_path(self):
+        """Returns the path of the single-file store.
+
+        That is the JSON file, with a .gz or .xz extension added when
+        HBNB_STORAGE_COMPRESSION is gzip or lzma and it has none yet.
+        """
+        path = FileStorage.__file_path
+        if compressor(path) is None:
+            path += SUFFIXES.get(FileStorage.__compression, "")
+        return path
+
+    def __snapshot_path(self):
+        """Returns the path of the single-file store to read, or None.
+
+        An uncompressed store is still read until the first compressed
+        snapshot replaces it.
+        """
+        for path in (self.__store_path(), FileStorage.__file_path):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def __retire(self):
+        """Renames the single-file stores and drops the journal.
+
+        This runs once their records have been moved to another layout or
+        format, and the .migrated suffix keeps it from happening twice.
+        """
+        for path in {self.__store_path(), FileStorage.__file_path}:
+            if os.path.isfile(path):
+                os.replace(path, path + ".migrated")
+        if os.path.isfile(self.__journal_path()):
+            os.remove(self.__journal_path())
+        FileStorage.__journal_size = 0
+
+    def __binary_path(self):
+        """Returns the path of the binary store next to the JSON file."""
+        return os.path.splitext(FileStorage.__file_path)[0] + ".hbnb"
+
+    def __convert_to_binary(self):
+        """Converts the JSON store (and its journal) to the binary format.
+
+        The JSON file is renamed with a .migrated suffix afterwards, so
+        the conversion only ever runs once.
+        """
+        journal = self.__read_journal()
+        if not journal and self.__snapshot_path() is None:
+            return
+        class_names = list(self.classes())
+        class_ids = {name: i for i, name in enumerate(class_names)}
+        self.__write_atomic(
+            self.__binary_path(),
+            ((key, None, binary_store.encode(record, class_ids))
+             for key, record in self.__replay(journal)), class_names)
+        self.__retire()
+
+    def __migrate(self):
+        """Splits the single-file store into per-class shards.
+
+        The single file is renamed with a .migrated suffix afterwards, so
+        the migration only ever runs once.
+        """
+        journal = self.__read_journal()
+        if not journal and self.__snapshot_path() is None:
             return
-        with open(FileStorage.__file_path, "r", encoding="utf-8") as f:
-            obj_dict = json.load(f)
-            obj_dict = {k: self.classes()[v["__class__"]](**v)
-                        for k, v in obj_dict.items()}
-            FileStorage.__objects = obj_dict
+        shards = {}
+        for key, record in self.__replay(journal):
+            shards.setdefault(self.__shard_path(key.split(".", 1)[0]),
+                              []).append((key, None, dumps(record)))
+        os.makedirs(self.__shard_dir(), exist_ok=True)
+        for path, items in shards.items():
+            self.__write_atomic(path, items)
+        self.__retire()
+
+    def __read_shards(self):
+        """Returns the key, record pairs of every shard, or None."""
+        paths = [self.__shard_path(name) for name in self.classes()]
+        paths = [path for path in paths if os.path.isfile(path)]
+        if not paths:
+            return None
+        lazy = FileStorage.__lazy
+        return (pair for path in paths for pair in read_records(path, lazy))
+
+    def __replay(self, journal):
+        """Yields the snapshot records with the journal applied."""
+        path = self.__snapshot_path()
+        if path is not None:
+            for key, record in read_records(path, FileStorage.__lazy):
+                if key in journal:
+                    record = journal.pop(key)
+                    if record is None:
+                        continue
+                yield key, record
+        for key, record in journal.items():
+            if record is not None:
+                yield key, record
+
+    def __read_journal(self):
+        """Returns the last record (None if deleted) journaled per key.
+
+        A write torn by a crash can only be the last line. It is cut off
+        the journal, so that the next record appended starts on a line of
+        its own instead of being lost with it.
+        """
+        journal = {}
+        FileStorage.__journal_size = 0
+        path = self.__journal_path()
+        if not os.path.isfile(path):
+            return journal
+        end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                journal.pop(record["key"], None)
+                journal[record["key"]] = record.get("obj")
+                FileStorage.__journal_size += 1
+                end += len(line)
+        if os.path.getsize(path) > end:
+            os.truncate(path, end)
+        return journal
 
     def classes(self):
         """Returns a dictionary of valid classes and their references."""
@@ -53,6 +1565,15 @@ class FileStorage:
             "Place": Place,
             "Review": Review
         }
+        if FileStorage.__compact:
+            # the declared attributes go in slots, in the order of the
+            # records save() writes (see models/engine/compact.py)
+            from models.engine.compact import compact
+            attributes = self.attributes()
+            for name, cls in classes.items():
+                classes[name] = compact(
+                    cls, ["id", *attributes[name]],
+                    last=("created_at", "updated_at"))
         return classes
 
     def attributes(self):
@@ -0,0 +1,120 @@
+"""This module defines the grid index of coordinates"""
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance in km between two points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) *
+         math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Indexes keys by their latitude and longitude on a grid of cells.
+
+    The cells are cell_size degrees on each side; every key is kept in
+    the cell its coordinates fall in. A search only looks at the cells
+    overlapping the box it covers, or at the occupied cells if those are
+    fewer. Keys whose coordinates are not numbers, or are out of range,
+    are left out.
+    """
+
+    def __init__(self, cell_size=0.5):
+        """Creates an empty index with cells of cell_size degrees."""
+        self.cell_size = cell_size
+        self.cells = {}
+        self.points = {}
+
+    def __cell(self, lat, lon):
+        """Returns the cell of a point."""
+        return (math.floor(lat / self.cell_size),
+                math.floor(lon / self.cell_size))
+
+    def add(self, key, lat, lon):
+        """Indexes key at lat, lon, moving it if it was indexed already."""
+        self.remove(key)
+        if type(lat) not in (int, float) or type(lon) not in (int, float):
+            return
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return
+        self.points[key] = (lat, lon)
+        self.cells.setdefault(self.__cell(lat, lon), set()).add(key)
+
+    def remove(self, key):
+        """Drops key from the index."""
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self.__cell(*point)
+        keys = self.cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self.cells[cell]
+
+    def __boxes(self, south, west, north, east):
+        """Splits a box crossing the antimeridian (west > east) in two."""
+        if west <= east:
+            return [(south, west, north, east)]
+        return [(south, west, north, 180), (south, -180, north, east)]
+
+    def __candidates(self, south, west, north, east):
+        """Yields the keys of the cells overlapping a box."""
+        for south, west, north, east in self.__boxes(south, west,
+                                                     north, east):
+            bottom, left = self.__cell(south, west)
+            top, right = self.__cell(north, east)
+            if (top - bottom + 1) * (right - left + 1) > len(self.cells):
+                for (row, column), keys in self.cells.items():
+                    if bottom <= row <= top and left <= column <= right:
+                        yield from keys
+                continue
+            for row in range(bottom, top + 1):
+                for column in range(left, right + 1):
+                    yield from self.cells.get((row, column), ())
+
+    def within(self, south, west, north, east):
+        """Returns the keys inside a box, edges included.
+
+        A box with west greater than east crosses the antimeridian.
+        """
+        found = set()
+        for key in self.__candidates(south, west, north, east):
+            lat, lon = self.points[key]
+            if not south <= lat <= north:
+                continue
+            if (west <= lon <= east if west <= east else
+                    lon >= west or lon <= east):
+                found.add(key)
+        return found
+
+    def nearby(self, lat, lon, radius_km, limit=None):
+        """Returns the distance, key pairs within radius_km of a point.
+
+        They come nearest first, at most limit of them.
+        """
+        span = radius_km / KM_PER_DEGREE
+        south, north = max(-90.0, lat - span), min(90.0, lat + span)
+        if south == -90 or north == 90:
+            west, east = -180.0, 180.0
+        else:
+            # the longitude span of the circle widens towards the poles
+            widest = max(abs(south), abs(north))
+            lon_span = span / math.cos(math.radians(widest))
+            if lon_span >= 180:
+                west, east = -180.0, 180.0
+            else:
+                west = (lon - lon_span + 180) % 360 - 180
+                east = (lon + lon_span + 180) % 360 - 180
+        found = []
+        for key in self.__candidates(south, west, north, east):
+            distance = haversine(lat, lon, *self.points[key])
+            if distance <= radius_km:
+                found.append((distance, key))
+        if limit is not None:
+            return heapq.nsmallest(limit, found)
+        return sorted(found)
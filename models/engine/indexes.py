@@ -0,0 +1,206 @@
+"""This module defines the in-memory indexes maintained by the storage"""
+import bisect
+
+
+class HashIndex:
+    """Maps each value of one attribute to the keys of the objects having it.
+
+    The value indexed for every key is remembered as well, so an entry can
+    be moved or dropped without knowing the previous value of the object.
+    """
+
+    def __init__(self, attribute):
+        """Creates an empty index over attribute."""
+        self.attribute = attribute
+        self.__keys = {}
+        self.__values = {}
+
+    def add(self, key, value):
+        """Indexes key under value, replacing its previous entry."""
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.remove(key)
+        try:
+            self.__keys.setdefault(value, set()).add(key)
+        except TypeError:
+            # unhashable values (e.g. lists) can't be looked up anyway
+            return
+        self.__values[key] = value
+
+    def remove(self, key):
+        """Drops key from the index."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        keys.discard(key)
+        if not keys:
+            del self.__keys[value]
+
+    def lookup(self, value):
+        """Returns the set of keys indexed under value."""
+        try:
+            return self.__keys.get(value, set())
+        except TypeError:
+            return set()
+
+    def counts(self):
+        """Returns the number of keys indexed under each value."""
+        return {value: len(keys) for value, keys in self.__keys.items()}
+
+
+class MultiIndex:
+    """Maps each item of a list attribute to the keys of the objects having
+    it in their list.
+
+    The items indexed for every key are remembered as well, so that an
+    entry can be moved or dropped without the previous list of the object.
+    Anything but a list indexes nothing, as do unhashable items.
+    """
+
+    def __init__(self, attribute):
+        """Creates an empty index over attribute."""
+        self.attribute = attribute
+        self.__keys = {}
+        self.__items = {}
+
+    def add(self, key, value):
+        """Indexes key under every item of the list value."""
+        items = set()
+        if isinstance(value, list):
+            for item in value:
+                try:
+                    items.add(item)
+                except TypeError:
+                    continue
+        if self.__items.get(key) == items:
+            return
+        self.remove(key)
+        for item in items:
+            self.__keys.setdefault(item, set()).add(key)
+        self.__items[key] = items
+
+    def remove(self, key):
+        """Drops key from the index."""
+        for item in self.__items.pop(key, ()):
+            keys = self.__keys[item]
+            keys.discard(key)
+            if not keys:
+                del self.__keys[item]
+
+    def lookup(self, value):
+        """Returns the set of keys whose list has value."""
+        try:
+            return self.__keys.get(value, set())
+        except TypeError:
+            return set()
+
+    def lookup_all(self, values):
+        """Returns the set of keys whose list has every one of values.
+
+        The sets are intersected smallest first, so the work is bounded
+        by the rarest of values.
+        """
+        sets = sorted((self.lookup(value) for value in values), key=len)
+        if not sets:
+            return set()
+        found = set(sets[0])
+        for keys in sets[1:]:
+            if not found:
+                break
+            found.intersection_update(keys)
+        return found
+
+    def counts(self):
+        """Returns the number of keys indexed under each item."""
+        return {item: len(keys) for item, keys in self.__keys.items()}
+
+
+class SortedIndex:
+    """Keeps the keys of the objects ordered by one numeric attribute.
+
+    Values and keys sit in two parallel lists sorted by value, then key,
+    so ranges are found by bisection. Values that are not numbers (e.g.
+    strings, or NaN) are not indexed.
+    """
+
+    def __init__(self, attribute):
+        """Creates an empty index over attribute."""
+        self.attribute = attribute
+        self.__sorted_values = []
+        self.__sorted_keys = []
+        self.__values = {}
+
+    def __position(self, key, value):
+        """Returns where key belongs in the sorted lists."""
+        values = self.__sorted_values
+        lo = bisect.bisect_left(values, value)
+        hi = bisect.bisect_right(values, value, lo)
+        return bisect.bisect_left(self.__sorted_keys, key, lo, hi)
+
+    def add(self, key, value):
+        """Indexes key under value, replacing its previous entry."""
+        if key in self.__values:
+            previous = self.__values[key]
+            if previous == value and type(previous) is type(value):
+                return
+            self.remove(key)
+        if type(value) not in (int, float) or value != value:
+            return
+        i = self.__position(key, value)
+        self.__sorted_values.insert(i, value)
+        self.__sorted_keys.insert(i, key)
+        self.__values[key] = value
+
+    def fill(self, items):
+        """Indexes the key, value pairs of items in a single sort."""
+        for key, value in items:
+            if type(value) in (int, float) and value == value:
+                self.__values[key] = value
+        pairs = sorted((value, key) for key, value in self.__values.items())
+        self.__sorted_values = [value for value, key in pairs]
+        self.__sorted_keys = [key for value, key in pairs]
+
+    def remove(self, key):
+        """Drops key from the index."""
+        if key not in self.__values:
+            return
+        i = self.__position(key, self.__values.pop(key))
+        del self.__sorted_values[i]
+        del self.__sorted_keys[i]
+
+    def __len__(self):
+        """Returns the number of keys indexed."""
+        return len(self.__sorted_keys)
+
+    def bounds(self, gt=None, gte=None, lt=None, lte=None):
+        """Returns the start and end positions of the keys within bounds."""
+        values = self.__sorted_values
+        start, end = 0, len(values)
+        if gte is not None:
+            start = max(start, bisect.bisect_left(values, gte))
+        if gt is not None:
+            start = max(start, bisect.bisect_right(values, gt))
+        if lte is not None:
+            end = min(end, bisect.bisect_right(values, lte))
+        if lt is not None:
+            end = min(end, bisect.bisect_left(values, lt))
+        return start, max(start, end)
+
+    def range(self, limit=None, descending=False, **bounds):
+        """Returns the keys whose value is within bounds, in order.
+
+        bounds are any of gt, gte, lt and lte; at most limit keys are
+        returned, the largest values first if descending.
+        """
+        start, end = self.bounds(**bounds)
+        if limit is not None:
+            if descending:
+                start = max(start, end - limit)
+            else:
+                end = min(end, start + limit)
+        keys = self.__sorted_keys[start:end]
+        if descending:
+            keys.reverse()
+        return keys
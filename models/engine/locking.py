@@ -0,0 +1,111 @@
+"""This module defines the lock shared by the storage readers and writers"""
+import contextlib
+import threading
+
+
+class ReadWriteLock:
+    """A lock held by many readers at once or by a single writer.
+
+    Using the lock as a context manager (or acquire/release) takes the
+    writer side, which is reentrant; the writer may read as well. Once a
+    writer waits, no new reader gets in, so writers are not starved.
+    A reader can't become a writer without releasing the read side first.
+    """
+
+    def __init__(self):
+        """Creates an unlocked lock."""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None
+        self.__depth = 0
+        self.__waiting = 0
+        self.__local = threading.local()
+
+    def __held(self):
+        """Returns the number of read holds of the current thread."""
+        return getattr(self.__local, "reads", 0)
+
+    def acquire(self):
+        """Acquires the writer side, waiting for the readers to leave."""
+        me = threading.get_ident()
+        if self.__writer == me:
+            # only this thread changes the hold it has: no need to lock
+            self.__depth += 1
+            return True
+        with self.__cond:
+            if self.__held():
+                raise RuntimeError("cannot write while holding a read lock")
+            self.__waiting += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__cond.wait()
+            finally:
+                self.__waiting -= 1
+            self.__writer = me
+            self.__depth = 1
+            return True
+
+    def release(self):
+        """Releases one hold of the writer side."""
+        if self.__writer != threading.get_ident():
+            raise RuntimeError("cannot release un-acquired lock")
+        if self.__depth > 1:
+            self.__depth -= 1
+            return
+        with self.__cond:
+            self.__depth = 0
+            self.__writer = None
+            self.__cond.notify_all()
+
+    def __enter__(self):
+        """Acquires the writer side."""
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        """Releases the writer side."""
+        self.release()
+
+    def acquire_read(self):
+        """Acquires the reader side, next to any other readers."""
+        if self.__writer == threading.get_ident():
+            self.__depth += 1
+            return True
+        with self.__cond:
+            if not self.__held():
+                while self.__writer is not None or self.__waiting:
+                    self.__cond.wait()
+            self.__readers += 1
+            self.__local.reads = self.__held() + 1
+            return True
+
+    def release_read(self):
+        """Releases one hold of the reader side."""
+        if self.__writer == threading.get_ident():
+            self.__depth -= 1
+            return
+        with self.__cond:
+            if not self.__held():
+                raise RuntimeError("cannot release un-acquired lock")
+            self.__local.reads -= 1
+            self.__readers -= 1
+            if not self.__readers:
+                self.__cond.notify_all()
+
+    @contextlib.contextmanager
+    def reading(self, ready=None):
+        """Holds the reader side while the block runs.
+
+        ready is checked once the reader side is held; if it returns
+        False the writer side is taken instead, so that the block may
+        build whatever it found missing.
+        """
+        self.acquire_read()
+        try:
+            upgrade = ready is not None and not ready()
+            if not upgrade:
+                yield
+        finally:
+            self.release_read()
+        if upgrade:
+            with self:
+                yield
@@ -0,0 +1,305 @@
+"""This module defines the queries returned by storage.query()"""
+import datetime
+import heapq
+import itertools
+import operator
+
+OPERATORS = {
+    "exact": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, values: value in values,
+    "startswith": lambda value, prefix: (
+        isinstance(value, str) and value.startswith(prefix)),
+    "contains": lambda value, item: isinstance(value, list) and item in value,
+    "contains_all": lambda value, items: (
+        isinstance(value, list) and all(item in value for item in items))
+}
+# the storage.ordered() bounds each operator puts on a number
+BOUNDS = {
+    "exact": ("gte", "lte"),
+    "lt": ("lt",),
+    "lte": ("lte",),
+    "gt": ("gt",),
+    "gte": ("gte",)
+}
+
+
+class Query:
+    """A lazy query on the objects of one class.
+
+    where(), order_by() and limit() each return a new query; the storage
+    is only read once the query is iterated. Conditions are written
+    <attribute>__<operator>=<value> (see OPERATORS), or just
+    <attribute>=<value> for equality.
+    """
+
+    def __init__(self, storage, cls, conditions=(), order=(), limit=None):
+        """Creates a query on the objects of cls (a class or class name)."""
+        self.storage = storage
+        self.name = cls if isinstance(cls, str) else cls.__name__
+        self.conditions = tuple(conditions)
+        self.order = tuple(order)
+        self.maximum = limit
+
+    def __copy(self, **changes):
+        """Returns a copy of this query with some of its parts replaced."""
+        parts = {"conditions": self.conditions, "order": self.order,
+                 "limit": self.maximum}
+        parts.update(changes)
+        return Query(self.storage, self.name, **parts)
+
+    def __declared(self):
+        """Returns the declared attributes and types of the class."""
+        attributes = self.storage.attributes()
+        if self.name not in self.storage.classes():
+            raise ValueError("{} is not a class".format(self.name))
+        types = dict(attributes["BaseModel"])
+        types.update(attributes.get(self.name, {}))
+        return types
+
+    def where(self, **conditions):
+        """Returns the query narrowed down to objects matching conditions.
+
+        Values given as strings are converted to the declared type of
+        their attribute, so that the console can pass them as typed.
+        """
+        types = self.__declared()
+        parsed = []
+        for condition, value in conditions.items():
+            attribute, _, op = condition.partition("__")
+            op = op or "exact"
+            if attribute not in types:
+                raise ValueError("{} has no attribute {}".format(
+                    self.name, attribute))
+            if op not in OPERATORS:
+                raise ValueError("unknown operator {}".format(op))
+            kind = types[attribute]
+            if op == "in":
+                value = [self.__convert(kind, v) for v in value]
+            else:
+                value = self.__convert(kind, value)
+            parsed.append((attribute, op, value))
+        return self.__copy(conditions=self.conditions + tuple(parsed))
+
+    @staticmethod
+    def __convert(kind, value):
+        """Returns value converted to kind if it is a string."""
+        if not isinstance(value, str) or kind in (str, list):
+            return value
+        if kind is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+        return kind(value)
+
+    def order_by(self, *attributes):
+        """Returns the query sorted by attributes ("-name" for descending).
+
+        Objects missing an attribute sort last either way.
+        """
+        types = self.__declared()
+        order = []
+        for attribute in attributes:
+            descending = attribute.startswith("-")
+            attribute = attribute.lstrip("-")
+            if attribute not in types:
+                raise ValueError("{} has no attribute {}".format(
+                    self.name, attribute))
+            order.append((attribute, descending))
+        return self.__copy(order=tuple(order))
+
+    def limit(self, count):
+        """Returns the query stopping after count objects."""
+        return self.__copy(limit=count)
+
+    def __candidates(self):
+        """Returns the objects the conditions have to be checked on.
+
+        Those are the objects found in the index of the most selective
+        indexed equality (or "in") condition, or list one ("contains" or
+        "contains_all"), or else the objects in the
+        narrowest range of a sorted index the conditions on numbers give,
+        or else the objects meeting the other conditions on numbers,
+        filtered on the columns of the class, or else every object of the
+        class from its partition.
+        """
+        types = self.__declared()
+        best = None
+        for attribute, op, value in self.conditions:
+            if op not in (("contains", "contains_all")
+                          if types[attribute] is list else ("exact", "in")):
+                continue
+            try:
+                if op in ("exact", "contains"):
+                    found = self.storage.lookup(self.name, attribute, value)
+                elif op == "contains_all":
+                    found = self.storage.lookup_all(self.name, attribute,
+                                                    value)
+                else:
+                    found = {}
+                    for v in value:
+                        found.update(
+                            self.storage.lookup(self.name, attribute, v))
+            except ValueError:
+                continue
+            if best is None or len(found) < len(best):
+                best = found
+        if best is None:
+            best = self.__ranged()
+        if best is None:
+            best = self.__filtered()
+        if best is None:
+            best = self.storage.all(self.name)
+        return best.values()
+
+    def __bounds(self, attribute):
+        """Returns the bounds the conditions put on a numeric attribute.
+
+        Returns None if one of them is not a number.
+        """
+        bounds = {}
+        for name, op, value in self.conditions:
+            if name != attribute or op not in BOUNDS:
+                continue
+            if type(value) not in (int, float):
+                return None
+            for bound in BOUNDS[op]:
+                pick = max if bound.startswith("g") else min
+                bounds[bound] = pick(bounds.get(bound, value), value)
+        return bounds
+
+    def __ranged(self):
+        """Returns the objects in the narrowest range the conditions give
+        on a numeric attribute, found with storage.ordered(), or None.
+        """
+        types = self.__declared()
+        best = None
+        for attribute in sorted({attribute for attribute, op, value
+                                 in self.conditions if op in BOUNDS and
+                                 types[attribute] in (int, float)}):
+            bounds = self.__bounds(attribute)
+            if bounds is None:
+                continue
+            try:
+                found = self.storage.ordered(self.name, attribute, **bounds)
+            except ValueError:
+                continue
+            if best is None or len(found) < len(best):
+                best = found
+        return None if best is None else {obj.id: obj for obj in best}
+
+    def __top(self):
+        """Returns the first objects in the order of a single numeric
+        attribute, read off its sorted index, or None if that can't do.
+
+        Twice as many objects are read each time too few of them match.
+        """
+        attribute, descending = self.order[0]
+        if self.__declared()[attribute] not in (int, float):
+            return None
+        bounds = self.__bounds(attribute)
+        if bounds is None:
+            return None
+        wanted = self.maximum
+        while True:
+            try:
+                objs = self.storage.ordered(self.name, attribute, wanted,
+                                            descending, **bounds)
+            except ValueError:
+                return None
+            found = [obj for obj in objs if self.__matches(obj)]
+            if len(found) >= self.maximum:
+                return found[:self.maximum]
+            if len(objs) < wanted:
+                # objects with no number come last, unless bounds left
+                # them out
+                return found if bounds else None
+            wanted *= 2
+
+    def __filtered(self):
+        """Returns the objects meeting the conditions on int and float
+        attributes, found with storage.filter(), or None if there are none.
+        """
+        types = self.__declared()
+        numeric = {"{}__{}".format(attribute, op): value
+                   for attribute, op, value in self.conditions
+                   if types[attribute] in (int, float) and
+                   op in ("exact", "ne", "lt", "lte", "gt", "gte")}
+        if not numeric:
+            return None
+        try:
+            ids = self.storage.filter(self.name, **numeric)
+        except ValueError:
+            return None
+        found = {}
+        for obj_id in ids:
+            obj = self.storage.get(self.name, obj_id)
+            if obj is not None:
+                found[obj_id] = obj
+        return found
+
+    def __matches(self, obj):
+        """Tells whether obj meets every condition."""
+        for attribute, op, value in self.conditions:
+            try:
+                if not OPERATORS[op](getattr(obj, attribute, None), value):
+                    return False
+            except TypeError:
+                # e.g. a string set with the console compared to an int
+                return False
+        return True
+
+    def __iter__(self):
+        """Yields the matching objects, in order if one was given."""
+        top = None
+        if len(self.order) == 1 and self.maximum is not None:
+            top = self.__top()
+        if top is not None:
+            yield from top
+            return
+        found = (obj for obj in self.__candidates() if self.__matches(obj))
+        if not self.order:
+            yield from itertools.islice(found, self.maximum)
+            return
+        if len(self.order) == 1 and self.maximum is not None:
+            attribute, descending = self.order[0]
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            yield from pick(self.maximum, found,
+                            key=self.__sort_key(attribute, descending))
+            return
+        found = list(found)
+        for attribute, descending in reversed(self.order):
+            found.sort(key=self.__sort_key(attribute, descending),
+                       reverse=descending)
+        yield from itertools.islice(found, self.maximum)
+
+    def __sort_key(self, attribute, descending):
+        """Returns the sort key on attribute.
+
+        Values of the declared type come first, then values of another
+        type (e.g. a string set with the console in place of an int),
+        sorted as text, then missing values, in either direction.
+        """
+        kind = self.__declared()[attribute]
+        kinds = (int, float) if kind in (int, float) else kind
+
+        def key(obj):
+            value = getattr(obj, attribute, None)
+            if value is None:
+                rank = 2
+            elif isinstance(value, kinds) and not isinstance(value, bool):
+                rank = 0
+            else:
+                rank, value = 1, str(value)
+            return (-rank if descending else rank, value)
+        return key
+
+    def first(self):
+        """Returns the first matching object, or None."""
+        return next(iter(self.limit(1)), None)
+
+    def count(self):
+        """Returns the number of matching objects."""
+        return sum(1 for obj in self)
@@ -0,0 +1,149 @@
+"""This module defines the inverted index of text attributes"""
+import bisect
+import heapq
+import math
+import re
+
+TOKEN = re.compile(r"\w+")
+# BM25 parameters: term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """Returns the lowercase words of text."""
+    return TOKEN.findall(text.lower()) if isinstance(text, str) else []
+
+
+class TextIndex:
+    """Maps each word of some text attributes to the keys containing it.
+
+    For every key the number of times each word occurs is kept, which
+    both ranks the results and lets an entry be dropped without knowing
+    the previous text of the object.
+    """
+
+    def __init__(self, fields):
+        """Creates an empty index of the text attributes fields."""
+        self.fields = list(fields)
+        self.postings = {}
+        self.docs = {}
+        self.length = 0
+        self.__terms = None
+
+    def add(self, key, texts):
+        """Indexes the words of texts for key, replacing its entry."""
+        self.remove(key)
+        counts = {}
+        for text in texts:
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + 1
+        if counts:
+            self.load(key, counts)
+
+    def load(self, key, counts):
+        """Indexes key with its term -> number of occurrences counts."""
+        self.docs[key] = counts
+        self.length += sum(counts.values())
+        for term, count in counts.items():
+            keys = self.postings.get(term)
+            if keys is None:
+                keys = self.postings[term] = {}
+                self.__terms = None
+            keys[key] = count
+
+    def remove(self, key):
+        """Drops key from the index."""
+        counts = self.docs.pop(key, None)
+        if counts is None:
+            return
+        self.length -= sum(counts.values())
+        for term in counts:
+            keys = self.postings[term]
+            del keys[key]
+            if not keys:
+                del self.postings[term]
+                self.__terms = None
+
+    def __expand(self, prefix):
+        """Returns the indexed terms starting with prefix."""
+        if self.__terms is None:
+            self.__terms = sorted(self.postings)
+        terms = self.__terms
+        start = bisect.bisect_left(terms, prefix)
+        end = start
+        while end < len(terms) and terms[end].startswith(prefix):
+            end += 1
+        return terms[start:end]
+
+    def __parse(self, query):
+        """Returns the term groups of query and whether any of them will do.
+
+        Each word of query gives a group of terms: the word itself, or
+        every term it is a prefix of when it ends with "*". The groups
+        must all match unless the word OR appears in query.
+        """
+        groups, any_term = [], False
+        for word in query.split():
+            if word == "OR":
+                any_term = True
+                continue
+            if word == "AND":
+                continue
+            terms = tokenize(word)
+            if not terms:
+                continue
+            for term in terms[:-1]:
+                groups.append([term])
+            if word.endswith("*"):
+                groups.append(self.__expand(terms[-1]))
+            else:
+                groups.append([terms[-1]])
+        return groups, any_term
+
+    def search(self, query, limit=None):
+        """Returns the score, key pairs matching query, best first.
+
+        See __parse() for the query syntax; the keys are ranked with
+        BM25, at most limit of them.
+        """
+        groups, any_term = self.__parse(query)
+        if not groups:
+            return []
+        matches = []
+        for terms in groups:
+            counts = {}
+            for term in terms:
+                for key, count in self.postings.get(term, {}).items():
+                    counts[key] = counts.get(key, 0) + count
+            matches.append(counts)
+        if any_term:
+            found = set().union(*matches)
+        else:
+            matches.sort(key=len)
+            found = set(matches[0])
+            for counts in matches[1:]:
+                found.intersection_update(counts)
+        if not found:
+            return []
+        total = len(self.docs)
+        average = self.length / total
+        scored = []
+        for key in found:
+            norm = K1 * (1 - B + B * sum(self.docs[key].values()) / average)
+            score = 0.0
+            for counts in matches:
+                count = counts.get(key)
+                if count:
+                    idf = math.log(1 + (total - len(counts) + 0.5) /
+                                   (len(counts) + 0.5))
+                    score += idf * count * (K1 + 1) / (count + norm)
+            scored.append((score, key))
+        if limit is not None:
+            return heapq.nsmallest(limit, scored, key=self.__rank)
+        return sorted(scored, key=self.__rank)
+
+    @staticmethod
+    def __rank(item):
+        """Returns the sort key of a score, key pair: best score first."""
+        return -item[0], item[1]
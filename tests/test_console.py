@@ -2,11 +2,13 @@
 """Module for testing the HBNBCommand Class"""
 import unittest
 from console import HBNBCommand
+from models import storage
 from unittest.mock import patch
 from io import StringIO
+from tests.test_models.test_engine.test_file_storage import StorageTestCase
 
 
-class Test_Console(unittest.TestCase):
+class Test_Console(StorageTestCase):
     """Test the HBNBCommand Console"""
 
 #     def test_help(self):
@@ -28,7 +30,9 @@ class Test_Console(unittest.TestCase):
         s = """
 Documented commands (type help <topic>):
 ========================================
-EOF  all  count  create  destroy  help  quit  show  update\n
+EOF  begin   count   destroy  nearby  rollback  show   update
+all  commit  create  help     quit    search    stats
+
 """
         self.assertEqual(s, f.getvalue())
 
@@ -101,6 +105,188 @@ EOF  all  count  create  destroy  help  quit  show  update\n
         msg = f.getvalue()
         self.assertNotEqual("", msg)
 
+    def test_do_count_class(self):
+        """Test the 'count' command with a class name"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("count State")
+        before = int(f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create State")
+            HBNBCommand().onecmd("count State")
+        self.assertEqual(str(before + 1), f.getvalue().split()[-1])
+
+    def test_do_all_class(self):
+        """Test the 'all' command with a class name"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create City")
+        city_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("all City")
+        msg = f.getvalue()
+        self.assertIn(f"[City] ({city_id})", msg)
+        self.assertNotIn("[State]", msg)
+
+    def test_do_stats(self):
+        """Test the 'stats' command"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create Place")
+        place_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("stats Place by city_id")
+        before = eval(f.getvalue()).get("Paris", 0)
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(f'update Place {place_id} city_id "Paris"')
+            HBNBCommand().onecmd("stats Place by city_id")
+        self.assertEqual(before + 1, eval(f.getvalue())["Paris"])
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("stats Place")
+            HBNBCommand().onecmd("count Place")
+        self.assertEqual(*f.getvalue().split())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("stats")
+        self.assertIn("'Place': ", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("stats Place by colour")
+        self.assertEqual("** attribute doesn't exist **\n", f.getvalue())
+
+    def test_do_all_pages(self):
+        """Test 'all' with --limit and --after"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            for i in range(3):
+                HBNBCommand().onecmd("create Amenity")
+        ids = sorted(f.getvalue().split())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("all Amenity --limit 2")
+        msg = f.getvalue()
+        self.assertTrue(msg.startswith('["[Amenity]'))
+        self.assertEqual(2, msg.count("[Amenity]"))
+        first = msg.split("(", 1)[1].split(")", 1)[0]
+        self.assertLessEqual(first, ids[0])
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(f"all Amenity --after {ids[1]}")
+        self.assertIn(f"({ids[2]})", f.getvalue())
+        self.assertNotIn(f"({ids[1]})", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("all Amenity --limit x")
+        self.assertEqual(
+            "Usage: all [class name] [--limit N] [--after KEY]\n",
+            f.getvalue())
+
+    def test_update_number(self):
+        """Test that 'update' stores declared numbers as numbers"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create Place")
+        place_id = f.getvalue().strip()
+        HBNBCommand().onecmd(f"update Place {place_id} price_by_night 7777")
+        HBNBCommand().onecmd(f"update Place {place_id} latitude x")
+        place = storage.get("Place", place_id)
+        self.assertEqual(7777, place.price_by_night)
+        self.assertEqual("x", place.latitude)
+        self.assertIn(place, storage.ordered(
+            "Place", "price_by_night", gte=7777, lte=7777))
+
+    def test_do_destroy_cascade(self):
+        """Test 'destroy --cascade' and its single save"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create State")
+            HBNBCommand().onecmd("create City")
+            HBNBCommand().onecmd("create Place")
+        state_id, city_id, place_id = f.getvalue().split()
+        HBNBCommand().onecmd(f"update City {city_id} state_id {state_id}")
+        HBNBCommand().onecmd(f"update Place {place_id} city_id {city_id}")
+        with patch('sys.stdout', new=StringIO()) as f, \
+                patch.object(storage, "save",
+                             wraps=storage.save) as save:
+            HBNBCommand().onecmd(f"destroy State {state_id} --cascade")
+        self.assertEqual("3\n", f.getvalue())
+        save.assert_called_once()
+        self.assertIsNone(storage.get("City", city_id))
+        self.assertIsNone(storage.get("Place", place_id))
+
+    def test_do_nearby(self):
+        """Test the 'nearby' command"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create Place")
+        place_id = f.getvalue().strip()
+        place = storage.get("Place", place_id)
+        place.latitude, place.longitude = -77.846, 166.676
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("nearby -77.85 166.67 5 10")
+        self.assertIn(f"({place_id})", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("nearby -77.85 160.0 5")
+        self.assertNotIn(f"({place_id})", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("nearby north 166.67 5")
+        self.assertEqual(
+            "Usage: nearby <latitude> <longitude> <radius in km> [limit]\n",
+            f.getvalue())
+
+    def test_do_search(self):
+        """Test the 'search' command"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create Review")
+        review_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(
+                f'update Review {review_id} text "Xylophonic"')
+            HBNBCommand().onecmd("search Review xylophonic")
+        self.assertIn(f"({review_id})", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("search Review xylo*")
+            HBNBCommand().onecmd("search Review xylophonic zebra")
+        first, second = f.getvalue().splitlines()
+        self.assertIn(f"({review_id})", first)
+        self.assertEqual("[]", second)
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("search Review")
+            HBNBCommand().onecmd("search BaseModel anything")
+        self.assertEqual("Usage: search <class name> <words>\n"
+                         "** class has no text attribute **\n",
+                         f.getvalue())
+
+    def test_do_rollback(self):
+        """Test that 'rollback' undoes the commands since 'begin'"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("create City")
+        city_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd(f'update City {city_id} name "Paris"')
+            HBNBCommand().onecmd(f"destroy City {city_id}")
+            HBNBCommand().onecmd("create City")
+            HBNBCommand().onecmd("rollback")
+            HBNBCommand().onecmd(f"show City {city_id}")
+        msg = f.getvalue()
+        self.assertIn(f"[City] ({city_id})", msg)
+        self.assertNotIn("Paris", msg)
+
+    def test_do_commit(self):
+        """Test that 'commit' keeps the commands since 'begin'"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("create City")
+            HBNBCommand().onecmd("commit")
+        city_id = f.getvalue().strip()
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd(f"show City {city_id}")
+        self.assertIn(f"[City] ({city_id})", f.getvalue())
+
+    def test_transaction_errors(self):
+        """Test 'begin', 'commit' and 'rollback' used out of order"""
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("commit")
+        self.assertEqual("** no transaction in progress **\n", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("rollback")
+        self.assertEqual("** no transaction in progress **\n", f.getvalue())
+        with patch('sys.stdout', new=StringIO()) as f:
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("begin")
+            HBNBCommand().onecmd("rollback")
+        self.assertEqual("** transaction already in progress **\n",
+                         f.getvalue())
+
     # Test cases for do_show
     def test_do_show(self):
         """Test the 'show' command"""
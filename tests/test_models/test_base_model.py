@@ -122,6 +122,10 @@ class TestBaseModelSave(unittest.TestCase):
             os.remove("file.json")
         except FileNotFoundError:
             pass
+        try:
+            os.remove("file.json.lock")
+        except FileNotFoundError:
+            pass
 
     def test_one_save(self):
         """Test if saving the BaseModel updates 'updated_at' attribute."""
@@ -170,6 +174,10 @@ class TestBaseModelToDict(unittest.TestCase):
             os.remove("file.json")
         except FileNotFoundError:
             pass
+        try:
+            os.remove("file.json.lock")
+        except FileNotFoundError:
+            pass
 
     def test_to_dict_type(self):
         """Test the data type of the to_dict method's return value."""
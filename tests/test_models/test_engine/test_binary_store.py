@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/binary_store.py.
+Unittest classes:
+    TestBinaryStore
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import models
+import unittest
+from models.engine import binary_store
+
+
+class TestBinaryStore(unittest.TestCase):
+    """Unittests for testing the binary storage format."""
+
+    def setUp(self):
+        """Write a small binary store to a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file.hbnb")
+        self.names = list(models.storage.classes())
+        class_ids = {name: i for i, name in enumerate(self.names)}
+        stamp = "2023-10-17T02:15:38.026790"
+        self.records = {
+            "Place.1": {"id": "1", "__class__": "Place", "name": "Loft",
+                        "amenity_ids": ["a", "b"], "created_at": stamp,
+                        "updated_at": stamp},
+            "User.2": {"id": "2", "__class__": "User",
+                       "created_at": stamp, "updated_at": stamp},
+            "User.3": {"id": "3", "__class__": "User",
+                       "created_at": "yesterday"}
+        }
+        with open(self.path, "wb") as f:
+            binary_store.write(f, ((key, binary_store.encode(r, class_ids))
+                                   for key, r in self.records.items()),
+                               self.names)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that records come back exactly as they were written."""
+        store = binary_store.BinaryStore(self.path)
+        try:
+            self.assertEqual(self.records, dict(store.items()))
+            self.assertEqual(self.names, store.classes)
+        finally:
+            store.close()
+
+    def test_get_uses_index(self):
+        """Test that get() decodes a single record by key."""
+        store = binary_store.BinaryStore(self.path)
+        try:
+            key = next(iter(self.records))
+            self.assertEqual(self.records[key], store.get(key))
+            self.assertIsNone(store.get("Place.nope"))
+        finally:
+            store.close()
+
+    def test_lazy_record(self):
+        """Test that a LazyRecord is only decoded when it is read."""
+        store = binary_store.BinaryStore(self.path)
+        try:
+            key, record = next(store.lazy_items())
+            self.assertFalse(record.loaded)
+            self.assertEqual(self.records[key]["id"], record["id"])
+            self.assertTrue(record.loaded)
+            self.assertEqual(self.records[key], dict(record))
+        finally:
+            store.close()
+
+    def test_empty_store(self):
+        """Test that a store without records can be read."""
+        with open(self.path, "wb") as f:
+            binary_store.write(f, (), self.names)
+        store = binary_store.BinaryStore(self.path)
+        try:
+            self.assertEqual([], list(store.items()))
+        finally:
+            store.close()
+
+    def test_not_a_store(self):
+        """Test that other files are rejected."""
+        with open(self.path, "wb") as f:
+            f.write(b"{}")
+        with self.assertRaises(ValueError):
+            binary_store.BinaryStore(self.path)
+
+    def test_converters(self):
+        """Test the conversion to JSON and back."""
+        json_path = os.path.join(self.tmp_dir.name, "file.json")
+        binary_store.binary_to_json(self.path, json_path)
+        with open(json_path, "r") as f:
+            self.assertEqual(self.records, json.load(f))
+        os.remove(self.path)
+        binary_store.json_to_binary(json_path, self.path, self.names)
+        store = binary_store.BinaryStore(self.path)
+        try:
+            self.assertEqual(self.records, dict(store.items()))
+        finally:
+            store.close()
+
+    def test_converter_script(self):
+        """Test the command line converter, run without the models."""
+        json_path = os.path.join(self.tmp_dir.name, "store.json")
+        binary_store.binary_to_json(self.path, json_path)
+        os.remove(self.path)
+        with open(os.path.join(self.tmp_dir.name, "file.json"), "w") as f:
+            f.write("not a store")
+        result = subprocess.run(
+            [sys.executable, binary_store.__file__, json_path, self.path],
+            cwd=self.tmp_dir.name, capture_output=True, text=True)
+        self.assertEqual((0, ""), (result.returncode, result.stderr))
+        store = binary_store.BinaryStore(self.path)
+        try:
+            self.assertEqual(["Place", "User"], store.classes)
+            self.assertEqual(self.records, dict(store.items()))
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
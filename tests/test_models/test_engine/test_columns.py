@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/columns.py.
+Unittest classes:
+    TestColumnStore
+"""
+
+import math
+import unittest
+from unittest.mock import patch
+from models.engine import columns
+from models.engine.columns import ColumnStore
+
+
+class TestColumnStore(unittest.TestCase):
+    """Unittests for testing the ColumnStore class."""
+
+    def setUp(self):
+        """Set up a store with a few rows."""
+        self.store = ColumnStore(["max_guest", "price_by_night"])
+        self.store.set("Place.1", [2, 50])
+        self.store.set("Place.2", [4, 120])
+        self.store.set("Place.3", [6, 80.5])
+
+    def filter(self, conditions):
+        """Returns the sorted keys found with and without NumPy."""
+        found = sorted(self.store.filter(conditions))
+        with patch.object(columns, "numpy", None):
+            self.assertEqual(found, sorted(self.store.filter(conditions)))
+        return found
+
+    def test_filter(self):
+        """Test filtering on one and on several columns."""
+        self.assertEqual(["Place.2", "Place.3"],
+                         self.filter([("max_guest", "gte", 4)]))
+        self.assertEqual(["Place.3"],
+                         self.filter([("max_guest", "gte", 4),
+                                      ("price_by_night", "lt", 100)]))
+        self.assertEqual(["Place.1", "Place.3"],
+                         self.filter([("max_guest", "ne", 4)]))
+        self.assertEqual(["Place.3"],
+                         self.filter([("price_by_night", "exact", 80.5)]))
+        self.assertEqual([], self.filter([("max_guest", "gt", 6)]))
+
+    def test_set_updates_row(self):
+        """Test that setting a key again replaces its row."""
+        self.store.set("Place.1", [8, 50])
+        self.assertEqual(3, len(self.store.keys))
+        self.assertEqual(["Place.1"], self.filter([("max_guest", "gt", 6)]))
+
+    def test_remove(self):
+        """Test that removing a key moves the last row into its place."""
+        self.store.remove("Place.1")
+        self.store.remove("Place.9")
+        self.assertEqual(["Place.3", "Place.2"], self.store.keys)
+        self.assertEqual(6.0, self.store.columns["max_guest"][0])
+        self.assertEqual(["Place.2", "Place.3"],
+                         self.filter([("max_guest", "gt", 0)]))
+        self.store.remove("Place.2")
+        self.store.remove("Place.3")
+        self.assertEqual([], self.filter([("max_guest", "gt", 0)]))
+
+    def test_not_a_number(self):
+        """Test that missing and non-numeric values only match ne."""
+        self.store.set("Place.4", ["many", None])
+        self.assertTrue(math.isnan(self.store.columns["max_guest"][3]))
+        self.assertNotIn("Place.4", self.filter([("max_guest", "lt", 99)]))
+        self.assertIn("Place.4", self.filter([("max_guest", "ne", 2)]))
+
+    def test_invalid(self):
+        """Test that unknown columns, operators and values are refused."""
+        for condition in (("name", "exact", 1), ("max_guest", "in", [1]),
+                          ("max_guest", "lt", "4")):
+            with self.assertRaises(ValueError):
+                self.store.filter([condition])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/compact.py.
+Unittest classes:
+    TestCompact
+"""
+
+import unittest
+import models
+from models.engine.compact import compact
+from models.place import Place
+
+
+class TestCompact(unittest.TestCase):
+    """Unittests for testing the compact version of a model class."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Make the compact version of Place."""
+        attributes = models.storage.attributes()["Place"]
+        cls.Compact = compact(Place, ["id", *attributes],
+                              last=("created_at", "updated_at"))
+        cls.record = {
+            "id": "1", "city_id": "c1", "name": "Loft", "number_rooms": 2,
+            "latitude": 48.85, "amenity_ids": ["a1"], "__class__": "Place",
+            "created_at": "2024-01-01T00:00:00.000000",
+            "updated_at": "2024-01-02T00:00:00.000000"}
+
+    def test_class(self):
+        """Test that the compact class passes for the model class."""
+        self.assertIs(self.Compact, compact(Place, []))
+        self.assertTrue(issubclass(self.Compact, Place))
+        self.assertEqual("Place", self.Compact.__name__)
+        self.assertEqual("", self.Compact.name)
+        self.assertFalse(hasattr(self.Compact, "note"))
+
+    def test_output(self):
+        """Test that to_dict() and str() match those of a Place."""
+        pl = Place(**self.record)
+        cp = self.Compact(**self.record)
+        self.assertEqual(pl.to_dict(), cp.to_dict())
+        self.assertEqual(list(pl.to_dict()), list(cp.to_dict()))
+        self.assertEqual(str(pl), str(cp))
+
+    def test_slots(self):
+        """Test that declared attributes are kept in slots."""
+        cp = self.Compact(**self.record)
+        self.assertIn("name", self.Compact.__mro__[1].__slots__)
+        self.assertIsNone(cp._extra)
+        self.assertEqual(0, cp.price_by_night)
+        self.assertNotIn("price_by_night", cp.__dict__)
+        cp.price_by_night = 80
+        self.assertEqual(80, cp.__dict__["price_by_night"])
+        del cp.price_by_night
+        self.assertEqual(0, cp.price_by_night)
+
+    def test_extra(self):
+        """Test that other attributes go in a dict of their own."""
+        cp = self.Compact(**self.record)
+        cp.note = "quiet"
+        self.assertEqual("quiet", cp.note)
+        self.assertEqual({"note": "quiet"}, cp._extra)
+        self.assertEqual("quiet", cp.to_dict()["note"])
+        self.assertEqual(["id", "city_id", "name", "number_rooms",
+                          "latitude", "amenity_ids", "note", "created_at",
+                          "updated_at"], list(cp.__dict__))
+        del cp.note
+        self.assertIsNone(cp._extra)
+        with self.assertRaises(AttributeError):
+            cp.note
+        with self.assertRaises(AttributeError):
+            del cp.note
+
+    def test_dict_assignment(self):
+        """Test that assigning __dict__ replaces every attribute."""
+        cp = self.Compact(**self.record)
+        attributes = {"note": "quiet"}
+        attributes.update(cp.__dict__)
+        del attributes["name"]
+        cp.__dict__ = attributes
+        self.assertEqual("", cp.name)
+        self.assertEqual("quiet", cp.note)
+        self.assertEqual(attributes, dict(cp.__dict__))
+        state = dict(cp.__dict__)
+        cp.name = "Attic"
+        cp.__dict__.clear()
+        cp.__dict__.update(state)
+        self.assertEqual(state, dict(cp.__dict__))
+
+
+if __name__ == "__main__":
+    unittest.main()
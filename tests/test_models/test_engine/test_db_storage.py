@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/db_storage.py.
+Unittest classes:
+    TestDBStorage
+"""
+
+import os
+import sqlite3
+import models
+import unittest
+from models.engine.file_storage import FileStorage
+from models.engine.db_storage import DBStorage
+from models.base_model import BaseModel
+from models.user import User
+from models.place import Place
+from models.review import Review
+from tests.test_models.test_engine.test_file_storage import StorageTestCase
+
+
+class TestDBStorage(StorageTestCase):
+    """Unittests for testing the DBStorage class."""
+
+    def setUp(self):
+        """Point the storage at a temporary database."""
+        super().setUp()
+        self.path = os.path.join(self.tmp_dir.name, "hbnb.db")
+        DBStorage._DBStorage__db_path = self.path
+        self.storage = DBStorage()
+
+    def tearDown(self):
+        """Close the database and restore the storage."""
+        self.storage.close()
+        super().tearDown()
+
+    def rows(self, sql):
+        """Returns the rows of a query run on a separate connection."""
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute(sql).fetchall()
+
+    def test_is_file_storage(self):
+        """Test that DBStorage exposes the FileStorage interface."""
+        self.assertIsInstance(self.storage, FileStorage)
+        self.assertEqual(models.storage.classes(), self.storage.classes())
+
+    def test_one_table_per_class(self):
+        """Test that each class gets its own table."""
+        self.storage.reload()
+        tables = {row[0] for row in self.rows(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertEqual(set(self.storage.classes()), tables)
+
+    def test_wal_mode(self):
+        """Test that the database runs in WAL mode."""
+        self.storage.reload()
+        self.assertEqual([("wal",)], self.rows("PRAGMA journal_mode"))
+
+    def test_save_and_reload(self):
+        """Test that objects survive a save and a reload."""
+        place = Place()
+        place.name = "Loft"
+        place.max_guest = 4
+        place.latitude = 1.5
+        place.amenity_ids = ["a", "b"]
+        place.my_number = 98
+        review = Review()
+        self.storage.save()
+        expected = {k: v.to_dict() for k, v in self.storage.all().items()}
+        self.storage.reload()
+        reloaded = {k: v.to_dict() for k, v in self.storage.all().items()}
+        self.assertEqual(expected, reloaded)
+        self.assertIsInstance(
+            self.storage.all()[f"Review.{review.id}"], Review)
+
+    def test_declared_columns(self):
+        """Test that declared attributes are stored in typed columns."""
+        place = Place()
+        place.price_by_night = 120
+        self.storage.save()
+        self.assertEqual([(120, None)], self.rows(
+            "SELECT price_by_night, extra FROM Place"))
+
+    def test_mistyped_value_kept(self):
+        """Test that a value of the wrong type round-trips unchanged."""
+        place = Place()
+        place.price_by_night = "120"
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(
+            "120", self.storage.all()[f"Place.{place.id}"].price_by_night)
+
+    def test_save_writes_only_changes(self):
+        """Test that save only rewrites the changed rows."""
+        us1 = User()
+        us2 = User()
+        self.storage.save()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "UPDATE User SET first_name = 'outside' WHERE id = ?",
+                (us1.id,))
+        us2.first_name = "Betty"
+        self.storage.save()
+        self.assertEqual({(us1.id, "outside"), (us2.id, "Betty")},
+                         set(self.rows("SELECT id, first_name FROM User")))
+
+    def test_sync(self):
+        """Test that sync() picks up rows committed by another connection."""
+        us = User()
+        self.storage.save()
+        self.storage.reload()
+        self.assertFalse(self.storage.sync())
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "UPDATE User SET first_name = 'outside' WHERE id = ?",
+                (us.id,))
+        self.assertTrue(self.storage.sync())
+        self.assertEqual(
+            "outside", self.storage.get(User, us.id).first_name)
+
+    def test_delete(self):
+        """Test that deleted objects are removed from their table."""
+        bm = BaseModel()
+        self.storage.save()
+        self.storage.delete(bm)
+        self.storage.save()
+        self.assertEqual([], self.rows("SELECT id FROM BaseModel"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,45 @@
 Unittest classes:
     TestFileStorageInstantiation
     TestFileStorageMethods
+    TestFileStorageJournal
+    TestFileStorageDirtyTracking
+    TestFileStorageLazyReload
+    TestFileStorageStreamingReload
+    TestFileStorageLookup
+    TestFileStorageGroupBy
+    TestFileStorageListIndex
+    TestFileStorageCascade
+    TestFileStorageColumns
+    TestFileStorageRanges
+    TestFileStorageGeo
+    TestFileStorageSearch
+    TestFileStorageDurability
+    TestFileStorageAtomicSave
+    TestFileStorageShards
+    TestFileStorageBinary
+    TestFileStorageCompression
+    TestFileStorageThreads
+    TestFileStorageProcesses
+    TestFileStorageTransactions
+    TestFileStorageCursor
+    TestFileStorageCompact
 """
 
 import os
+import sys
+import gzip
+import json
+import lzma
+import io
+import tempfile
+import threading
+import time
+import subprocess
+import concurrent.futures
 import models
 import unittest
-from models.engine.file_storage import FileStorage
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage, iter_records
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -17,6 +50,42 @@ from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class StorageTestCase(unittest.TestCase):
+    """Points the storage at an empty temporary file for each test."""
+
+    def setUp(self):
+        """Point the storage at a temporary file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file.json")
+        self.saved = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__changes)
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__changes = {}
+
+    def tearDown(self):
+        """Restore the storage settings."""
+        FileStorage._FileStorage__durability = "always"
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_limit = 1000
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__layout = "single"
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__compression = ""
+        FileStorage._FileStorage__compact = False
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__changes) = self.saved
+        self.tmp_dir.cleanup()
+
 
 class TestFileStorageInstantiation(unittest.TestCase):
     """Unittests for testing instantiation of the FileStorage class."""
@@ -37,6 +106,10 @@ class TestFileStorageInstantiation(unittest.TestCase):
             os.remove(FileStorage._FileStorage__file_path)
         except FileNotFoundError:
             pass
+        try:
+            os.remove(FileStorage._FileStorage__file_path + ".lock")
+        except FileNotFoundError:
+            pass
         try:
             os.rename(cls.tmp_file, FileStorage._FileStorage__file_path)
         except FileNotFoundError:
@@ -83,6 +156,10 @@ class TestFileStorageMethods(unittest.TestCase):
             os.remove(FileStorage._FileStorage__file_path)
         except IOError:
             pass
+        try:
+            os.remove(FileStorage._FileStorage__file_path + ".lock")
+        except IOError:
+            pass
         try:
             os.rename(cls.tmp_file, FileStorage._FileStorage__file_path)
         except IOError:
@@ -93,10 +170,59 @@ class TestFileStorageMethods(unittest.TestCase):
         """Test the all() method of FileStorage."""
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
-        """Test the all() method of FileStorage with an argument."""
+    def test_all_with_None(self):
+        """Test that all(None) returns every object."""
+        self.assertEqual(models.storage.all(), models.storage.all(None))
+
+    def test_all_returns_copy(self):
+        """Test that all() returns a copy of __objects."""
+        objs = models.storage.all()
+        self.assertIsNot(FileStorage._FileStorage__objects, objs)
+        objs.clear()
+        BaseModel()
+        self.assertEqual(0, len(objs))
+
+    def test_all_with_two_args(self):
+        """Test the all() method of FileStorage with two arguments."""
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(None, None)
+
+    def test_all_with_cls(self):
+        """Test that all(cls) only returns the objects of cls."""
+        us = User()
+        st = State()
+        for cls in (User, "User"):
+            objs = models.storage.all(cls)
+            self.assertIs(us, objs[f"User.{us.id}"])
+            self.assertNotIn(f"State.{st.id}", objs)
+            self.assertTrue(all(type(v) is User for v in objs.values()))
+        self.assertEqual({}, models.storage.all("Nope"))
+
+    def test_all_with_cls_after_delete(self):
+        """Test that deleted objects leave their class partition."""
+        us = User()
+        models.storage.delete(us)
+        self.assertNotIn(f"User.{us.id}", models.storage.all(User))
+
+    def test_all_with_cls_after_reload(self):
+        """Test that the partition follows a reload."""
+        us = User()
+        models.storage.save()
+        models.storage.reload()
+        self.assertIn(f"User.{us.id}", models.storage.all(User))
+        self.assertIsNot(us, models.storage.all(User)[f"User.{us.id}"])
+
+    def test_count(self):
+        """Test the count() method of FileStorage."""
+        before = models.storage.count(Review)
+        total = models.storage.count()
+        Review()
+        Review()
+        self.assertEqual(before + 2, models.storage.count("Review"))
+        self.assertEqual(total + 2, models.storage.count())
+        self.assertEqual(len(models.storage.all(Review)),
+                         models.storage.count(Review))
+        self.assertEqual(0, models.storage.count("Nope"))
 
     def test_new(self):
         """Test the new() method of FileStorage."""
@@ -175,5 +301,1625 @@ class TestFileStorageMethods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorageJournal(StorageTestCase):
+    """Unittests for the append-only journal mode of FileStorage."""
+
+    def setUp(self):
+        """Point the storage at a temporary file in journal mode."""
+        super().setUp()
+        FileStorage._FileStorage__journal = True
+
+    def journal(self):
+        """Returns the records currently in the journal."""
+        with open(self.path + ".log", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_first_save_writes_snapshot(self):
+        """Test that the first save creates the snapshot, not a journal."""
+        User().save()
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertFalse(os.path.isfile(self.path + ".log"))
+
+    def test_save_appends_one_record(self):
+        """Test that a mutation appends a single put record."""
+        User().save()
+        with open(self.path, "r") as f:
+            snapshot = f.read()
+        us = User()
+        us.save()
+        records = self.journal()
+        self.assertEqual(1, len(records))
+        self.assertEqual("put", records[0]["op"])
+        self.assertEqual(f"User.{us.id}", records[0]["key"])
+        with open(self.path, "r") as f:
+            self.assertEqual(snapshot, f.read())
+
+    def test_delete_appends_record(self):
+        """Test that deleting an object journals a delete record."""
+        us = User()
+        us.save()
+        models.storage.delete(us)
+        models.storage.save()
+        self.assertEqual([{"op": "delete", "key": f"User.{us.id}"}],
+                         self.journal())
+
+    def test_reload_replays_journal(self):
+        """Test that reload applies the journal over the snapshot."""
+        us1 = User()
+        us1.save()
+        us2 = User()
+        us2.first_name = "Betty"
+        us2.save()
+        models.storage.delete(us1)
+        models.storage.save()
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertNotIn(f"User.{us1.id}", objs)
+        self.assertEqual("Betty", objs[f"User.{us2.id}"].first_name)
+
+    def test_reload_ignores_torn_record(self):
+        """Test that a partially written last record is skipped."""
+        us = User()
+        us.save()
+        State().save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"op": "put", "key": "Sta')
+        models.storage.reload()
+        self.assertIn(f"User.{us.id}", models.storage.all())
+
+    def test_save_after_torn_record(self):
+        """Test that saves made after a torn record survive a reload."""
+        User().save()
+        State().save()
+        with open(self.path + ".log", "a") as f:
+            f.write('{"op": "put", "key": "User.1", "obj": {}}')
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+        pl = Place()
+        pl.save()
+        models.storage.reload()
+        self.assertEqual(3, models.storage.count())
+        self.assertIn(f"Place.{pl.id}", models.storage.all())
+
+    def test_compaction(self):
+        """Test that a long journal is rolled into a new snapshot."""
+        FileStorage._FileStorage__journal_limit = 2
+        bm = BaseModel()
+        bm.save()
+        bm.save()
+        bm.save()
+        self.assertEqual(2, len(self.journal()))
+        bm.save()
+        self.assertFalse(os.path.isfile(self.path + ".log"))
+        with open(self.path, "r") as f:
+            self.assertIn(f"BaseModel.{bm.id}", json.load(f))
+
+
+class TestFileStorageDirtyTracking(StorageTestCase):
+    """Unittests for change tracking and cached serialization."""
+
+    def changes(self):
+        """Returns the changes recorded since the last save."""
+        return FileStorage._FileStorage__changes
+
+    def test_save_clears_changes(self):
+        """Test that save forgets the recorded changes."""
+        us = User()
+        self.assertIn(f"User.{us.id}", self.changes())
+        models.storage.save()
+        self.assertEqual({}, self.changes())
+
+    def test_setattr_records_change(self):
+        """Test that setting an attribute records the instance."""
+        us = User()
+        models.storage.save()
+        us.first_name = "Betty"
+        self.assertIs(us, self.changes()[f"User.{us.id}"])
+
+    def test_reload_records_nothing(self):
+        """Test that building objects from records doesn't touch them."""
+        User().save()
+        with patch.object(FileStorage, "touch") as touch:
+            models.storage.reload()
+        touch.assert_not_called()
+        self.assertEqual({}, self.changes())
+
+    def test_touch_unstored_without_lock(self):
+        """Test that objects not stored are set without the lock."""
+        us = User()
+        models.storage.delete(us)
+        done = threading.Event()
+
+        def hold():
+            with FileStorage._FileStorage__lock:
+                done.wait(5)
+        holder = threading.Thread(target=hold, daemon=True)
+        holder.start()
+        time.sleep(0.05)
+        setter = threading.Thread(target=setattr, daemon=True,
+                                  args=(us, "first_name", "Betty"))
+        setter.start()
+        setter.join(1)
+        finished = not setter.is_alive()
+        done.set()
+        holder.join()
+        self.assertTrue(finished)
+        self.assertEqual("Betty", us.first_name)
+        self.assertIsNone(self.changes()[f"User.{us.id}"])
+
+    def test_delete_records_change(self):
+        """Test that deleting an instance records a deletion."""
+        us = User()
+        models.storage.save()
+        models.storage.delete(us)
+        self.assertIsNone(self.changes()[f"User.{us.id}"])
+
+    def test_unchanged_objects_not_reencoded(self):
+        """Test that save only calls to_dict on changed objects."""
+        us1 = User()
+        us2 = User()
+        models.storage.save()
+        with patch.object(BaseModel, "to_dict", autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            us2.first_name = "Betty"
+            models.storage.save()
+        to_dict.assert_called_once_with(us2)
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(us1.to_dict(), saved[f"User.{us1.id}"])
+        self.assertEqual("Betty", saved[f"User.{us2.id}"]["first_name"])
+
+    def test_save_matches_json_dump(self):
+        """Test that the file is identical to a plain json.dump."""
+        for cls in (BaseModel, User, Place):
+            cls().save()
+        expected = json.dumps({k: v.to_dict()
+                               for k, v in models.storage.all().items()})
+        with open(self.path, "r") as f:
+            self.assertEqual(expected, f.read())
+
+
+class TestFileStorageLazyReload(StorageTestCase):
+    """Unittests for the lazy reload mode of FileStorage."""
+
+    def setUp(self):
+        """Save a few objects to a temporary file and reload lazily."""
+        super().setUp()
+        self.user = User()
+        self.place = Place()
+        self.place.name = "Loft"
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def test_reload_builds_no_objects(self):
+        """Test that a lazy reload only keeps the raw records."""
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(2, len(FileStorage._FileStorage__records))
+
+    def test_get_materializes_one_object(self):
+        """Test that get() builds only the requested object."""
+        place = models.storage.get("Place", self.place.id)
+        self.assertIsInstance(place, Place)
+        self.assertEqual("Loft", place.name)
+        self.assertIs(place, models.storage.get(Place, self.place.id))
+        self.assertEqual([f"Place.{self.place.id}"],
+                         list(FileStorage._FileStorage__objects))
+
+    def test_get_missing(self):
+        """Test that get() returns None for unknown ids."""
+        self.assertIsNone(models.storage.get("Place", "nope"))
+
+    def test_all_materializes_everything(self):
+        """Test that all() builds every remaining object."""
+        objs = models.storage.all()
+        self.assertIsInstance(objs[f"User.{self.user.id}"], User)
+        self.assertIsInstance(objs[f"Place.{self.place.id}"], Place)
+        self.assertEqual({}, FileStorage._FileStorage__records)
+
+    def test_save_keeps_raw_records(self):
+        """Test that save writes records that were never accessed."""
+        models.storage.get("User", self.user.id).first_name = "Betty"
+        models.storage.save()
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Loft", saved[f"Place.{self.place.id}"]["name"])
+        self.assertEqual("Betty",
+                         saved[f"User.{self.user.id}"]["first_name"])
+
+    def test_all_with_cls_builds_only_cls(self):
+        """Test that all(cls) only builds the objects of cls."""
+        objs = models.storage.all(Place)
+        self.assertEqual([f"Place.{self.place.id}"], list(objs))
+        self.assertIn(f"User.{self.user.id}",
+                      FileStorage._FileStorage__records)
+        self.assertEqual(1, models.storage.count(User))
+
+    def test_delete_raw_record(self):
+        """Test that an object can be deleted before it is built."""
+        models.storage.delete(models.storage.get("User", self.user.id))
+        self.assertIsNone(models.storage.get("User", self.user.id))
+
+    def test_reload_keeps_no_parsed_records(self):
+        """Test that a lazy reload only keeps the position of records."""
+        records = FileStorage._FileStorage__records.values()
+        self.assertEqual([False, False],
+                         [record.loaded for record in records])
+        with patch("json.loads", side_effect=AssertionError):
+            models.storage.save()
+        self.assertEqual([False, False],
+                         [record.loaded for record in records])
+        models.storage.reload()
+        self.assertEqual("Loft", models.storage.get(Place, self.place.id).name)
+
+    def test_reload_positions(self):
+        """Test the positions of records written as text by hand."""
+        stamp = "2023-10-17T02:15:38.026790"
+        place = {"id": "é", "__class__": "Place", "name": "Café\r\n",
+                 "created_at": stamp, "updated_at": stamp}
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write('{\r\n  "Place.\\u00e9":\r\n  ')
+            json.dump(place, f, ensure_ascii=False, indent=1)
+            f.write(',\r\n "Place.ü": ')
+            json.dump(dict(place, id="ü", name="Ü"), f, ensure_ascii=False)
+            f.write("}")
+        models.storage.reload()
+        self.assertEqual("Café\r\n", models.storage.get(Place, "é").name)
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(["Place.é", "Place.ü"],
+                         sorted(FileStorage._FileStorage__records))
+        self.assertEqual("ü", models.storage.get(Place, "ü").id)
+        self.assertEqual("Café\r\n", models.storage.get(Place, "é").name)
+
+    def test_migration_keeps_raw_records(self):
+        """Test that records never read are copied into the shards."""
+        FileStorage._FileStorage__layout = "sharded"
+        models.storage.reload()
+        with open(os.path.join(self.path + ".d", "Place.json"), "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Loft", saved[f"Place.{self.place.id}"]["name"])
+        with open(os.path.join(self.path + ".d", "User.json"), "r") as f:
+            saved = json.load(f)
+        self.assertEqual("User", saved[f"User.{self.user.id}"]["__class__"])
+
+    def test_merge_keeps_raw_records(self):
+        """Test that a merge with another process's save keeps records."""
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        other = User()
+        saved[f"User.{other.id}"] = other.to_dict()
+        with open(self.path + ".new", "w") as f:
+            json.dump(saved, f)
+        os.replace(self.path + ".new", self.path)
+        models.storage.get(User, self.user.id).first_name = "Betty"
+        models.storage.save()
+        FileStorage._FileStorage__lazy = False
+        models.storage.reload()
+        self.assertEqual("Loft", models.storage.get(Place, self.place.id).name)
+        self.assertEqual("Betty",
+                         models.storage.get(User, self.user.id).first_name)
+        self.assertIsInstance(models.storage.get(User, other.id), User)
+
+
+class TestFileStorageStreamingReload(unittest.TestCase):
+    """Unittests for the incremental JSON reader used by reload()."""
+
+    def records(self, text, chunk_size=7):
+        """Returns the pairs read from text with a tiny chunk size."""
+        f = io.StringIO(text)
+        return list(iter_records(f, chunk_size))
+
+    def test_matches_json_load(self):
+        """Test that records straddling chunks are read correctly."""
+        d = {
+            "User.1": {"id": "1", "first_name": "B\u00e9tty \\ \"x\""},
+            "Place.2": {"id": "2", "amenity_ids": ["a", "b"],
+                        "latitude": 1.5e-3, "nested": {"k": [1, {}]}}
+        }
+        for text in (json.dumps(d), json.dumps(d, indent=4)):
+            for size in (1, 3, 7, 1 << 16):
+                self.assertEqual(list(d.items()), self.records(text, size))
+
+    def test_empty_object(self):
+        """Test reading an empty store."""
+        self.assertEqual([], self.records(" { \n } "))
+
+    def test_truncated_file(self):
+        """Test that a truncated store raises a JSONDecodeError."""
+        with self.assertRaises(json.JSONDecodeError):
+            self.records('{"User.1": {"id": "1"}, "User.2": {"id"')
+
+    def test_missing_delimiter(self):
+        """Test that a malformed store raises a JSONDecodeError."""
+        with self.assertRaises(json.JSONDecodeError):
+            self.records('{"User.1": {"id": "1"} "User.2": {}}')
+
+    def test_empty_file(self):
+        """Test that an empty file raises a JSONDecodeError."""
+        with self.assertRaises(json.JSONDecodeError):
+            self.records("")
+
+
+class TestFileStorageLookup(StorageTestCase):
+    """Unittests for the foreign key indexes of FileStorage."""
+
+    def setUp(self):
+        """Set up a place with two reviews in an empty storage."""
+        super().setUp()
+        self.place = Place()
+        self.reviews = [Review(), Review()]
+        for review in self.reviews:
+            review.place_id = self.place.id
+
+    def keys(self, value, cls=Review, attribute="place_id"):
+        """Returns the sorted keys found by a lookup."""
+        return sorted(models.storage.lookup(cls, attribute, value))
+
+    def test_lookup(self):
+        """Test finding the reviews of a place."""
+        expected = sorted(f"Review.{r.id}" for r in self.reviews)
+        self.assertEqual(expected, self.keys(self.place.id))
+        self.assertEqual([], self.keys("nope"))
+        objs = models.storage.lookup("Review", "place_id", self.place.id)
+        self.assertIn(self.reviews[0], objs.values())
+
+    def test_lookup_not_indexed(self):
+        """Test that only foreign keys can be looked up."""
+        with self.assertRaises(ValueError):
+            models.storage.lookup(Review, "text", "")
+
+    def test_lookup_follows_new(self):
+        """Test that new objects are indexed."""
+        self.keys(self.place.id)
+        review = Review()
+        review.place_id = self.place.id
+        self.assertIn(f"Review.{review.id}", self.keys(self.place.id))
+
+    def test_lookup_follows_update(self):
+        """Test that changing a foreign key moves the object."""
+        self.keys(self.place.id)
+        self.reviews[0].place_id = "other"
+        self.assertEqual([f"Review.{self.reviews[0].id}"],
+                         self.keys("other"))
+        self.assertEqual([f"Review.{self.reviews[1].id}"],
+                         self.keys(self.place.id))
+
+    def test_lookup_follows_console_update(self):
+        """Test that the console update command reindexes the object."""
+        from console import HBNBCommand
+        self.keys(self.place.id)
+        with patch("sys.stdout", new=io.StringIO()):
+            HBNBCommand().onecmd(
+                f"update Review {self.reviews[0].id} place_id other")
+        self.assertEqual([f"Review.{self.reviews[0].id}"],
+                         self.keys("other"))
+
+    def test_lookup_follows_delete(self):
+        """Test that deleted objects leave the index."""
+        self.keys(self.place.id)
+        models.storage.delete(self.reviews[0])
+        self.assertEqual([f"Review.{self.reviews[1].id}"],
+                         self.keys(self.place.id))
+
+    def test_lookup_after_objects_replaced(self):
+        """Test that a lookup does not use the indexes of old objects."""
+        self.keys(self.place.id)
+        review = self.reviews[0]
+        FileStorage._FileStorage__objects = {
+            f"Review.{review.id}": review}
+        self.assertEqual([f"Review.{review.id}"], self.keys(self.place.id))
+
+    def test_lookup_after_lazy_reload(self):
+        """Test lookups on records that have not been built yet."""
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        objs = models.storage.lookup(Review, "place_id", self.place.id)
+        self.assertEqual(2, len(objs))
+        self.assertTrue(all(type(v) is Review for v in objs.values()))
+        self.assertNotIn(f"Place.{self.place.id}",
+                         FileStorage._FileStorage__objects)
+
+
+class TestFileStorageGroupBy(StorageTestCase):
+    """Unittests for the group-by counts of FileStorage."""
+
+    def setUp(self):
+        """Fill an empty storage with a few places."""
+        super().setUp()
+        self.places = [Place() for i in range(4)]
+        for place, guests in zip(self.places, (2, 2, 4, 6)):
+            place.max_guest = guests
+            place.city_id = "c1" if guests < 5 else "c2"
+
+    def tearDown(self):
+        """Restore the storage."""
+        FileStorage._FileStorage__grouped = {}
+        super().tearDown()
+
+    def test_foreign_key(self):
+        """Test the counts per foreign key value."""
+        self.assertEqual({"c1": 3, "c2": 1},
+                         models.storage.group_by(Place, "city_id"))
+
+    def test_incremental(self):
+        """Test that the counts follow creates, updates and deletes."""
+        self.assertEqual({2: 2, 4: 1, 6: 1},
+                         models.storage.group_by("Place", "max_guest"))
+        self.places[0].max_guest = 4
+        models.storage.delete(self.places[3])
+        Place().max_guest = 8
+        self.assertEqual({2: 1, 4: 2, 8: 1},
+                         models.storage.group_by("Place", "max_guest"))
+
+    def test_kept_across_reload(self):
+        """Test that grouped attributes are indexed again after a reload."""
+        models.storage.group_by(Place, "max_guest")
+        FileStorage._FileStorage__objects = dict(
+            FileStorage._FileStorage__objects)
+        self.assertIn("max_guest", FileStorage._FileStorage__grouped["Place"])
+        self.assertEqual(
+            [f"Place.{self.places[3].id}"],
+            list(models.storage.lookup(Place, "max_guest", 6)))
+
+    def test_undeclared(self):
+        """Test that only declared attributes can be grouped by."""
+        with self.assertRaises(ValueError):
+            models.storage.group_by(Place, "colour")
+
+
+class TestFileStorageColumns(StorageTestCase):
+    """Unittests for the columnar filtering of FileStorage."""
+
+    def setUp(self):
+        """Fill an empty storage with a few places."""
+        super().setUp()
+        self.places = [Place() for i in range(4)]
+        for place, guests, price in zip(self.places, (2, 4, 4, 6),
+                                        (50, 150, 90, 300)):
+            place.max_guest = guests
+            place.price_by_night = price
+
+    def ids(self, *places):
+        """Returns the sorted ids of places."""
+        return sorted(place.id for place in places)
+
+    def test_filter(self):
+        """Test filtering places on several numeric attributes."""
+        self.assertEqual(
+            self.ids(self.places[2]),
+            sorted(models.storage.filter(Place, price_by_night__lt=100,
+                                         max_guest__gte=4)))
+        self.assertEqual(self.ids(self.places[1], self.places[2]),
+                         sorted(models.storage.filter("Place",
+                                                      max_guest="4")))
+
+    def test_incremental(self):
+        """Test that the columns follow creates, updates and deletes."""
+        models.storage.filter(Place, max_guest__gt=0)
+        self.places[0].max_guest = 5
+        models.storage.delete(self.places[3])
+        place = Place()
+        place.max_guest = 8
+        self.assertEqual(self.ids(self.places[0], place),
+                         sorted(models.storage.filter(Place,
+                                                      max_guest__gt=4)))
+
+    def test_rebuilt_after_reload(self):
+        """Test that the columns are rebuilt when __objects is replaced."""
+        models.storage.filter(Place, max_guest__gt=0)
+        FileStorage._FileStorage__objects = {
+            f"Place.{self.places[0].id}": self.places[0]}
+        self.assertEqual(self.ids(self.places[0]),
+                         models.storage.filter(Place, max_guest__gt=0))
+
+    def test_query_uses_columns(self):
+        """Test that queries on numbers but ranges use the columns."""
+        with patch.object(FileStorage, "filter",
+                          wraps=models.storage.filter) as spy:
+            found = models.storage.query(Place).where(
+                max_guest__ne=4, name="").order_by("price_by_night")
+            self.assertEqual([self.places[0], self.places[3]], list(found))
+        spy.assert_called_once()
+
+    def test_invalid(self):
+        """Test that only numeric attributes can be filtered on."""
+        with self.assertRaises(ValueError):
+            models.storage.filter(Place, name="x")
+        with self.assertRaises(ValueError):
+            models.storage.filter(Place, max_guest__in=[1, 2])
+
+
+class TestFileStorageGeo(StorageTestCase):
+    """Unittests for the coordinate searches of FileStorage."""
+
+    def setUp(self):
+        """Set up a few located places in an empty storage."""
+        super().setUp()
+        self.paris, self.versailles, self.london = (Place(), Place(),
+                                                    Place())
+        for place, lat, lon in ((self.paris, 48.8566, 2.3522),
+                                (self.versailles, 48.8049, 2.1204),
+                                (self.london, 51.5074, -0.1278)):
+            place.latitude, place.longitude = lat, lon
+
+    def test_nearby(self):
+        """Test the places around a point, nearest first."""
+        found = models.storage.nearby(48.86, 2.35, 50)
+        self.assertEqual([self.paris, self.versailles],
+                         [place for place, distance in found])
+        self.assertEqual([self.paris],
+                         [place for place, distance in
+                          models.storage.nearby(48.86, 2.35, 500, 1)])
+
+    def test_within(self):
+        """Test the places inside a bounding box."""
+        self.assertEqual({f"Place.{self.london.id}": self.london},
+                         models.storage.within((51, -1, 52, 0)))
+
+    def test_incremental(self):
+        """Test that the index follows creates, moves and deletes."""
+        models.storage.nearby(0, 0, 1)
+        self.london.latitude, self.london.longitude = 48.85, 2.35
+        models.storage.delete(self.paris)
+        place = Place()
+        place.latitude, place.longitude = 48.8, 2.1
+        self.assertEqual({self.london, self.versailles, place},
+                         set(models.storage.within((48, 2, 49, 3)).values()))
+
+    def test_lazy_reload(self):
+        """Test searches on records that have not been built yet."""
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        found = models.storage.nearby(48.86, 2.35, 50)
+        self.assertEqual([self.paris.id, self.versailles.id],
+                         [place.id for place, distance in found])
+        self.assertNotIn(f"Place.{self.london.id}",
+                         FileStorage._FileStorage__objects)
+
+
+class TestFileStorageSearch(StorageTestCase):
+    """Unittests for the full-text search of FileStorage."""
+
+    def setUp(self):
+        """Save a few reviews and places to a temporary file."""
+        super().setUp()
+        self.reviews = [Review(), Review(), Review()]
+        for review, text in zip(self.reviews, ("Lovely quiet garden",
+                                               "Quiet but far from all",
+                                               "Noisy and dirty")):
+            review.text = text
+        self.place = Place()
+        self.place.name = "Garden loft"
+        models.storage.save()
+
+    def ids(self, cls, text):
+        """Returns the ids of the objects found, best first."""
+        return [obj.id for obj, score in models.storage.search(cls, text)]
+
+    def test_search(self):
+        """Test searching the text attributes of a class."""
+        self.assertEqual([self.reviews[0].id, self.reviews[1].id],
+                         self.ids(Review, "quiet"))
+        self.assertEqual([self.reviews[0].id], self.ids("Review", "gard*"))
+        self.assertEqual([self.place.id], self.ids(Place, "garden"))
+        with self.assertRaises(ValueError):
+            models.storage.search(BaseModel, "garden")
+
+    def test_incremental(self):
+        """Test that the index follows creates, updates and deletes."""
+        self.ids(Review, "quiet")
+        self.reviews[2].text = "Quiet at last"
+        models.storage.delete(self.reviews[0])
+        Review().text = "Very quiet"
+        self.assertEqual(3, len(self.ids(Review, "quiet")))
+        self.assertNotIn(self.reviews[0].id, self.ids(Review, "quiet"))
+
+    def plant(self, review):
+        """Adds "quiet" to the saved index entry of review only."""
+        with open(self.path + ".text", "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        saved["classes"]["Review"]["docs"][f"Review.{review.id}"] = {
+            "quiet": 1}
+        with open(self.path + ".text", "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+
+    def test_saved_index_read_back(self):
+        """Test that a reload reads the saved index instead of building."""
+        self.ids(Review, "quiet")
+        self.plant(self.reviews[2])
+        models.storage.reload()
+        FileStorage._FileStorage__objects[
+            f"Review.{self.reviews[1].id}"].text = "Far away"
+        self.assertEqual({self.reviews[0].id, self.reviews[2].id},
+                         set(self.ids(Review, "quiet")))
+
+    def test_saved_index_outdated(self):
+        """Test that the saved index is not read once the store changed."""
+        self.ids(Review, "quiet")
+        self.plant(self.reviews[2])
+        self.reviews[1].text = "Far away"
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual([self.reviews[0].id], self.ids(Review, "quiet"))
+
+
+class TestFileStorageRanges(StorageTestCase):
+    """Unittests for the sorted indexes of FileStorage."""
+
+    def setUp(self):
+        """Fill an empty storage with a few places."""
+        super().setUp()
+        self.places = [Place() for i in range(4)]
+        for place, price in zip(self.places, (50, 150, 90, 300)):
+            place.price_by_night = price
+
+    def test_ordered(self):
+        """Test ranges and top-k of a numeric attribute."""
+        self.assertEqual(
+            [self.places[0], self.places[2]],
+            models.storage.ordered(Place, "price_by_night", lt=100))
+        self.assertEqual(
+            [self.places[3], self.places[1]],
+            models.storage.ordered("Place", "price_by_night", 2, True))
+        self.assertEqual(4, len(models.storage.ordered(Place, "max_guest")))
+        with self.assertRaises(ValueError):
+            models.storage.ordered(Place, "name")
+
+    def test_incremental(self):
+        """Test that the index follows creates, updates and deletes."""
+        models.storage.ordered(Place, "price_by_night")
+        self.places[3].price_by_night = 10
+        models.storage.delete(self.places[0])
+        place = Place()
+        place.price_by_night = 100
+        self.assertEqual(
+            [self.places[3], self.places[2], place],
+            models.storage.ordered(Place, "price_by_night", lte=100))
+
+
+class TestFileStorageListIndex(StorageTestCase):
+    """Unittests for the amenity -> place index of FileStorage."""
+
+    def setUp(self):
+        """Set up places with a few amenities in an empty storage."""
+        super().setUp()
+        self.wifi, self.tv, self.pets = Amenity(), Amenity(), Amenity()
+        self.places = [Place(), Place(), Place()]
+        self.places[0].amenity_ids = [self.wifi.id, self.tv.id,
+                                      self.pets.id]
+        self.places[1].amenity_ids = [self.wifi.id, self.tv.id]
+        self.places[2].amenity_ids = [self.wifi.id]
+
+    def places_with(self, *amenities):
+        """Returns the places having every one of amenities."""
+        return set(models.storage.lookup_all(
+            Place, "amenity_ids",
+            [amenity.id for amenity in amenities]).values())
+
+    def test_lookup(self):
+        """Test finding the places with one or several amenities."""
+        self.assertEqual(
+            [f"Place.{self.places[0].id}"],
+            list(models.storage.lookup(Place, "amenity_ids", self.pets.id)))
+        self.assertEqual({self.places[0], self.places[1]},
+                         self.places_with(self.wifi, self.tv))
+        self.assertEqual({self.places[0]},
+                         self.places_with(self.pets, self.tv, self.wifi))
+        with self.assertRaises(ValueError):
+            models.storage.lookup_all(Place, "city_id", ["c1"])
+
+    def test_follows_updates(self):
+        """Test that the index follows new lists, places and deletes."""
+        self.places_with(self.wifi)
+        self.places[2].amenity_ids = [self.wifi.id, self.tv.id]
+        self.places[0].amenity_ids = self.places[0].amenity_ids[2:]
+        models.storage.delete(self.places[1])
+        place = Place()
+        place.amenity_ids = [self.tv.id, self.wifi.id]
+        self.assertEqual({self.places[2], place},
+                         self.places_with(self.wifi, self.tv))
+        self.assertEqual({self.wifi.id: 2, self.tv.id: 2, self.pets.id: 1},
+                         models.storage.group_by(Place, "amenity_ids"))
+
+    def test_after_lazy_reload(self):
+        """Test lookups on records that have not been built yet."""
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual([self.places[0].id],
+                         [place.id for place in
+                          self.places_with(self.pets, self.wifi)])
+        self.assertNotIn(f"Place.{self.places[1].id}",
+                         FileStorage._FileStorage__objects)
+
+
+class TestFileStorageCascade(StorageTestCase):
+    """Unittests for the cascading deletes of FileStorage."""
+
+    def setUp(self):
+        """Set up a state with its cities, places and reviews."""
+        super().setUp()
+        self.state, self.other = State(), State()
+        self.user = User()
+        self.cities = [City(), City(), City()]
+        for city, state in zip(self.cities,
+                               (self.state, self.state, self.other)):
+            city.state_id = state.id
+        self.places = [Place(), Place()]
+        for place, city in zip(self.places, self.cities[1:]):
+            place.city_id = city.id
+            place.user_id = self.user.id
+        self.reviews = [Review(), Review()]
+        for review, place in zip(self.reviews, self.places):
+            review.place_id = place.id
+        self.amenity = Amenity()
+
+    def test_references(self):
+        """Test the foreign keys found in attributes()."""
+        references = models.storage.references()
+        self.assertEqual([("City", "state_id")], references["State"])
+        self.assertEqual({("Place", "user_id"), ("Review", "user_id")},
+                         set(references["User"]))
+        self.assertEqual([("Review", "place_id")], references["Place"])
+        self.assertNotIn("Amenity", references)
+
+    def test_delete_cascade(self):
+        """Test that the dependents are deleted, the others kept."""
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scan")):
+            self.assertEqual(
+                5, models.storage.delete_cascade(self.state))
+        remaining = set(models.storage.all().values())
+        self.assertEqual({self.other, self.user, self.cities[2],
+                          self.places[1], self.reviews[1], self.amenity},
+                         remaining)
+
+    def test_delete_cascade_user(self):
+        """Test a parent with several kinds of dependents."""
+        self.reviews[1].user_id = self.user.id
+        self.assertEqual(5, models.storage.delete_cascade(self.user))
+        self.assertEqual(0, models.storage.count(Place))
+        self.assertEqual(0, models.storage.count(Review))
+
+    def test_breadth_first(self):
+        """Test that dependents are deleted one level after the other."""
+        self.cities[2].state_id = self.state.id
+        place = Place()
+        place.city_id = self.cities[0].id
+        with patch.object(FileStorage, "delete", autospec=True,
+                          side_effect=FileStorage.delete) as delete:
+            self.assertEqual(9, models.storage.delete_cascade(self.state))
+        self.assertEqual(
+            ["State", "City", "City", "City", "Place", "Place", "Place",
+             "Review", "Review"],
+            [type(call.args[1]).__name__ for call in delete.call_args_list])
+
+    def test_not_stored(self):
+        """Test that an object missing from the storage deletes nothing."""
+        models.storage.delete(self.state)
+        self.assertEqual(0, models.storage.delete_cascade(self.state))
+        self.assertEqual(3, models.storage.count(City))
+
+
+class TestFileStorageDurability(StorageTestCase):
+    """Unittests for the durability policies of FileStorage."""
+
+    def tearDown(self):
+        """Write the saves left pending, then restore the settings."""
+        FileStorage._FileStorage__durability = "always"
+        models.storage.flush()
+        super().tearDown()
+
+    def test_always(self):
+        """Test that the default policy writes on every save."""
+        with patch.object(FileStorage, "_dump",
+                          autospec=True,
+                          side_effect=FileStorage._dump) as dump:
+            for _ in range(3):
+                User().save()
+        self.assertEqual(3, dump.call_count)
+        self.assertTrue(os.path.isfile(self.path))
+
+    def test_on_exit(self):
+        """Test that on_exit defers every write to flush()."""
+        FileStorage._FileStorage__durability = "on_exit"
+        with patch.object(FileStorage, "_dump",
+                          autospec=True,
+                          side_effect=FileStorage._dump) as dump:
+            users = [User() for _ in range(100)]
+            for us in users:
+                us.save()
+            self.assertFalse(os.path.isfile(self.path))
+            models.storage.flush()
+            models.storage.flush()
+        self.assertEqual(1, dump.call_count)
+        with open(self.path, "r") as f:
+            self.assertEqual(100, len(json.load(f)))
+
+    def test_interval(self):
+        """Test that interval coalesces saves in a background writer."""
+        FileStorage._FileStorage__durability = "interval=50"
+        with patch.object(FileStorage, "_dump",
+                          autospec=True,
+                          side_effect=FileStorage._dump) as dump:
+            for _ in range(1000):
+                User().save()
+            deadline = time.time() + 5
+            while (not os.path.isfile(self.path) and
+                   time.time() < deadline):
+                time.sleep(0.01)
+            models.storage.flush()
+        self.assertLess(dump.call_count, 20)
+        with open(self.path, "r") as f:
+            self.assertEqual(1000, len(json.load(f)))
+
+    def test_interval_after_failed_write(self):
+        """Test that a failed write does not stop the background writer."""
+        FileStorage._FileStorage__durability = "interval=20"
+        write = FileStorage._dump
+        failures = [OSError("disk full")]
+
+        def dump(storage, changes):
+            if failures:
+                raise failures.pop()
+            return write(storage, changes)
+        with patch.object(FileStorage, "_dump", autospec=True,
+                          side_effect=dump):
+            User().save()
+            deadline = time.time() + 5
+            while failures and time.time() < deadline:
+                time.sleep(0.01)
+            us = User()
+            us.save()
+            while (not os.path.isfile(self.path) and
+                   time.time() < deadline):
+                time.sleep(0.01)
+            self.assertTrue(FileStorage._FileStorage__writer.is_alive())
+        with open(self.path, "r") as f:
+            self.assertIn(f"User.{us.id}", json.load(f))
+
+    def test_quit_flushes(self):
+        """Test that quitting the console flushes deferred saves."""
+        from console import HBNBCommand
+        FileStorage._FileStorage__durability = "on_exit"
+        for command in ("quit", "EOF"):
+            User().save()
+            self.assertTrue(FileStorage._FileStorage__pending)
+            with patch("sys.stdout", new=io.StringIO()):
+                HBNBCommand().onecmd(command)
+            self.assertFalse(FileStorage._FileStorage__pending)
+
+
+class TestFileStorageAtomicSave(StorageTestCase):
+    """Unittests for the atomic, background saves of FileStorage."""
+
+    def files(self):
+        """Returns the files of the store, without its lock file."""
+        return sorted(name for name in os.listdir(self.tmp_dir.name)
+                      if not name.endswith(".lock"))
+
+    def test_save_returns_handle(self):
+        """Test that save returns a completed future by default."""
+        handle = models.storage.save()
+        self.assertIsInstance(handle, concurrent.futures.Future)
+        self.assertTrue(handle.done())
+
+    def test_no_temporary_file_left(self):
+        """Test that the temporary file is renamed into place."""
+        User().save()
+        self.assertEqual(["file.json"], self.files())
+
+    def test_failed_save_keeps_store(self):
+        """Test that a failing save leaves the previous store intact."""
+        us = User()
+        us.save()
+        with open(self.path, "r") as f:
+            before = f.read()
+        us.unserializable = object()
+        with self.assertRaises(TypeError):
+            us.save()
+        with open(self.path, "r") as f:
+            self.assertEqual(before, f.read())
+        self.assertEqual(["file.json"], self.files())
+
+    def test_async_snapshot(self):
+        """Test that an async save writes the objects as they were."""
+        FileStorage._FileStorage__durability = "async"
+        us = User()
+        us.first_name = "Betty"
+        handle = models.storage.save()
+        us.first_name = "John"
+        handle.result()
+        with open(self.path, "r") as f:
+            self.assertEqual("Betty",
+                             json.load(f)[f"User.{us.id}"]["first_name"])
+        models.storage.save().result()
+        with open(self.path, "r") as f:
+            self.assertEqual("John",
+                             json.load(f)[f"User.{us.id}"]["first_name"])
+
+    def test_overlapping_writes(self):
+        """Test that a write finishing late does not cache an old version."""
+        FileStorage._FileStorage__durability = "async"
+        write = FileStorage._dump
+        gates = [threading.Event() for i in range(3)]
+        calls = []
+
+        def dump(storage, payload):
+            gates[len(calls)].wait(5)
+            calls.append(payload)
+            return write(storage, payload)
+        with patch.object(FileStorage, "_dump", autospec=True,
+                          side_effect=dump):
+            us = User()
+            us.first_name = "v1"
+            first = models.storage.save()
+            us.first_name = "v2"
+            models.storage.save()
+            gates[0].set()
+            first.result(timeout=5)
+            User().save()
+            gates[1].set()
+            gates[2].set()
+            models.storage.flush()
+        with open(self.path, "r") as f:
+            self.assertEqual("v2",
+                             json.load(f)[f"User.{us.id}"]["first_name"])
+
+    def test_deferred_handle(self):
+        """Test that a deferred save completes once flushed."""
+        FileStorage._FileStorage__durability = "on_exit"
+        handle = User().save()
+        self.assertFalse(handle.done())
+        models.storage.flush()
+        self.assertIsNone(handle.result(timeout=5))
+
+
+class TestFileStorageShards(StorageTestCase):
+    """Unittests for the sharded layout of FileStorage."""
+
+    def setUp(self):
+        """Point the storage at a temporary file in the sharded layout."""
+        super().setUp()
+        FileStorage._FileStorage__layout = "sharded"
+
+    def shard(self, name):
+        """Returns the path of the shard of class name."""
+        return os.path.join(self.path + ".d", name + ".json")
+
+    def test_one_file_per_class(self):
+        """Test that each class is saved to its own shard."""
+        us = User()
+        pl = Place()
+        models.storage.save()
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertEqual(["Place.json", "User.json"],
+                         sorted(os.listdir(self.path + ".d")))
+        with open(self.shard("User"), "r") as f:
+            self.assertEqual([f"User.{us.id}"], list(json.load(f)))
+        with open(self.shard("Place"), "r") as f:
+            self.assertEqual([f"Place.{pl.id}"], list(json.load(f)))
+
+    def test_save_rewrites_changed_shards(self):
+        """Test that save leaves the shards of unchanged classes alone."""
+        us = User()
+        pl = Place()
+        models.storage.save()
+        with open(self.shard("User"), "w") as f:
+            f.write("{}")
+        pl.name = "Loft"
+        models.storage.save()
+        with open(self.shard("User"), "r") as f:
+            self.assertEqual("{}", f.read())
+        models.storage.delete(pl)
+        models.storage.save()
+        with open(self.shard("Place"), "r") as f:
+            self.assertEqual({}, json.load(f))
+
+    def test_reload(self):
+        """Test that reload reads every shard."""
+        objs = [User(), Place(), Review(), State()]
+        models.storage.save()
+        models.storage.reload()
+        for obj in objs:
+            key = f"{type(obj).__name__}.{obj.id}"
+            self.assertEqual(obj.to_dict(),
+                             models.storage.all()[key].to_dict())
+
+    def test_reload_streams_shards(self):
+        """Test that shards are read one record at a time."""
+        objs = [User(), Place(), Review()]
+        models.storage.save()
+        with patch.object(json, "load", side_effect=AssertionError("load")):
+            models.storage.reload()
+        for obj in objs:
+            self.assertIn(f"{type(obj).__name__}.{obj.id}",
+                          models.storage.all())
+
+    def test_import_large_store(self):
+        """Test that importing models reads a large sharded store."""
+        # a stamp with no microseconds would be saved without them
+        stamp = "2023-10-17T02:15:38.026790"
+        for i in range(6000):
+            for cls in (User, Place):
+                models.storage.new(cls(id=f"{i}", name="x" * 100,
+                                       created_at=stamp, updated_at=stamp))
+        models.storage.save()
+        self.assertGreater(sum(
+            os.path.getsize(os.path.join(self.path + ".d", name))
+            for name in os.listdir(self.path + ".d")), 1 << 20)
+        root = os.path.dirname(os.path.dirname(models.__file__))
+        code = ("import sys; sys.path.insert(0, {!r}); import models; "
+                "print(len(models.storage.all()))".format(root))
+        env = dict(os.environ, HBNB_STORAGE_LAYOUT="sharded")
+        out = subprocess.run([sys.executable, "-c", code], env=env,
+                             cwd=self.tmp_dir.name, timeout=30,
+                             capture_output=True, text=True, check=True)
+        self.assertEqual("12000", out.stdout.strip())
+
+    def test_migration(self):
+        """Test that a single-file store is split into shards once."""
+        FileStorage._FileStorage__layout = "single"
+        us = User()
+        pl = Place()
+        models.storage.save()
+        FileStorage._FileStorage__layout = "sharded"
+        models.storage.reload()
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertTrue(os.path.isfile(self.path + ".migrated"))
+        self.assertTrue(os.path.isfile(self.shard("User")))
+        self.assertTrue(os.path.isfile(self.shard("Place")))
+        self.assertIn(f"User.{us.id}", models.storage.all())
+        self.assertIn(f"Place.{pl.id}", models.storage.all())
+
+
+class TestFileStorageBinary(StorageTestCase):
+    """Unittests for the binary format of FileStorage."""
+
+    def setUp(self):
+        """Point the storage at a temporary file in the binary format."""
+        super().setUp()
+        self.binary = os.path.join(self.tmp_dir.name, "file.hbnb")
+        FileStorage._FileStorage__format = "binary"
+
+    def tearDown(self):
+        """Restore the storage settings."""
+        if FileStorage._FileStorage__store is not None:
+            FileStorage._FileStorage__store.close()
+            FileStorage._FileStorage__store = None
+        FileStorage._FileStorage__raw_store = None
+        super().tearDown()
+
+    def test_save_and_reload(self):
+        """Test that objects survive a save and a reload."""
+        pl = Place()
+        pl.name = "Loft"
+        pl.latitude = 1.5
+        us = User()
+        models.storage.save()
+        self.assertTrue(os.path.isfile(self.binary))
+        self.assertFalse(os.path.isfile(self.path))
+        models.storage.reload()
+        for obj in (pl, us):
+            key = f"{type(obj).__name__}.{obj.id}"
+            self.assertEqual(obj.to_dict(),
+                             models.storage.all()[key].to_dict())
+
+    def test_lazy_get_decodes_one_record(self):
+        """Test that a lazy reload only decodes the records accessed."""
+        pl = Place()
+        User()
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual(pl.id, models.storage.get(Place, pl.id).id)
+        loaded = [record.loaded for record in
+                  FileStorage._FileStorage__records.values()]
+        self.assertEqual([False], loaded)
+
+    def test_save_copies_untouched_records(self):
+        """Test that records never decoded are saved unchanged."""
+        us1 = User()
+        us2 = User()
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        models.storage.get(User, us1.id).first_name = "Betty"
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(
+            "Betty", models.storage.get(User, us1.id).first_name)
+        self.assertEqual(us2.to_dict(),
+                         models.storage.get(User, us2.id).to_dict())
+
+    def test_json_store_converted(self):
+        """Test that a JSON store is converted on the first reload."""
+        FileStorage._FileStorage__format = "json"
+        us = User()
+        models.storage.save()
+        FileStorage._FileStorage__format = "binary"
+        models.storage.reload()
+        self.assertTrue(os.path.isfile(self.binary))
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertTrue(os.path.isfile(self.path + ".migrated"))
+        self.assertIn(f"User.{us.id}", models.storage.all())
+
+
+class TestFileStorageCompression(StorageTestCase):
+    """Unittests for the compressed stores of FileStorage."""
+
+    def check_round_trip(self, module, path):
+        """Saves and reloads objects through the compressed file path."""
+        us = User()
+        pl = Place()
+        pl.name = "Loft"
+        models.storage.save()
+        self.assertFalse(os.path.isfile(self.path))
+        with module.open(path, "rt") as f:
+            self.assertEqual({f"User.{us.id}", f"Place.{pl.id}"},
+                             set(json.load(f)))
+        models.storage.reload()
+        self.assertEqual("Loft", models.storage.all()[
+            f"Place.{pl.id}"].name)
+
+    def test_gzip_setting(self):
+        """Test HBNB_STORAGE_COMPRESSION=gzip."""
+        FileStorage._FileStorage__compression = "gzip"
+        self.check_round_trip(gzip, self.path + ".gz")
+
+    def test_lzma_setting(self):
+        """Test HBNB_STORAGE_COMPRESSION=lzma."""
+        FileStorage._FileStorage__compression = "lzma"
+        self.check_round_trip(lzma, self.path + ".xz")
+
+    def test_extension(self):
+        """Test that a .gz file path is compressed without the setting."""
+        self.path += ".gz"
+        FileStorage._FileStorage__file_path = self.path
+        us = User()
+        models.storage.save()
+        with gzip.open(self.path, "rt") as f:
+            self.assertEqual([f"User.{us.id}"], list(json.load(f)))
+        models.storage.reload()
+        self.assertIn(f"User.{us.id}", models.storage.all())
+
+    def test_uncompressed_store_replaced(self):
+        """Test that an existing plain store is read, then retired."""
+        us = User()
+        models.storage.save()
+        FileStorage._FileStorage__compression = "gzip"
+        models.storage.reload()
+        self.assertIn(f"User.{us.id}", models.storage.all())
+        models.storage.save()
+        self.assertTrue(os.path.isfile(self.path + ".gz"))
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertTrue(os.path.isfile(self.path + ".migrated"))
+
+    def test_compressed_shards(self):
+        """Test that shards are compressed as well."""
+        FileStorage._FileStorage__compression = "gzip"
+        FileStorage._FileStorage__layout = "sharded"
+        us = User()
+        models.storage.save()
+        self.assertEqual(["User.json.gz"],
+                         os.listdir(self.path + ".d"))
+        models.storage.reload()
+        self.assertIn(f"User.{us.id}", models.storage.all())
+
+
+class TestFileStorageThreads(StorageTestCase):
+    """Stress tests for FileStorage shared by reader and writer threads."""
+
+    def run_threads(self, *targets):
+        """Runs each target in its own thread and re-raises any error."""
+        errors = []
+
+        def run(target):
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(target,))
+                   for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def test_readers_and_writers(self):
+        """Test that reads never see a dict changing size mid-iteration."""
+        done = threading.Event()
+        kept = [Place() for i in range(20)]
+
+        def write():
+            for i in range(200):
+                us = User()
+                us.first_name = "Betty"
+                if i % 3:
+                    models.storage.delete(us)
+                if i % 50 == 0:
+                    models.storage.save()
+
+        def writers():
+            try:
+                self.run_threads(write, write)
+            finally:
+                done.set()
+
+        def read():
+            while not done.is_set():
+                for obj in models.storage.all().values():
+                    str(obj)
+                self.assertEqual(20, len(models.storage.all(Place)))
+                models.storage.count(User)
+                models.storage.get(Place, kept[0].id)
+
+        self.run_threads(writers, read, read, read)
+        models.storage.save()
+        self.assertEqual(20 + 2 * 67, models.storage.count())
+        models.storage.reload()
+        self.assertEqual(20 + 2 * 67, models.storage.count())
+
+    def test_reload_while_reading(self):
+        """Test that reload() can replace __objects under readers."""
+        for i in range(50):
+            User()
+        models.storage.save()
+        done = threading.Event()
+
+        def reload():
+            for i in range(20):
+                models.storage.reload()
+            done.set()
+
+        def read():
+            while not done.is_set():
+                self.assertEqual(50, len(models.storage.all(User)))
+                self.assertEqual(50, models.storage.count())
+
+        self.run_threads(reload, read, read)
+
+
+class TestFileStorageProcesses(StorageTestCase):
+    """Unittests for several processes sharing one store."""
+
+    def setUp(self):
+        """Point the storage at a temporary file and read it."""
+        super().setUp()
+        self.us = User()
+        self.pl = Place()
+        models.storage.save()
+        models.storage.reload()
+
+    def other_process(self, code):
+        """Runs code against the store in another interpreter.
+
+        Returns what the code printed.
+        """
+        root = os.path.dirname(os.path.dirname(models.__file__))
+        return subprocess.run(
+            [sys.executable, "-c", "import models\n" + code],
+            cwd=self.tmp_dir.name, check=True, capture_output=True,
+            text=True, env=dict(os.environ, PYTHONPATH=root)).stdout.strip()
+
+    def test_save_merges_other_changes(self):
+        """Test that a save keeps what another process saved meanwhile."""
+        other = self.other_process(
+            "from models.user import User\n"
+            "us = User()\n"
+            "us.save()\n"
+            "print(us.id)\n")
+        models.storage.get(Place, self.pl.id).name = "Loft"
+        models.storage.save()
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertIn(f"User.{other}", saved)
+        self.assertEqual("Loft", saved[f"Place.{self.pl.id}"]["name"])
+
+    def test_save_keeps_other_deletes(self):
+        """Test that a save doesn't bring back objects deleted elsewhere."""
+        self.other_process(
+            f"models.storage.delete(models.storage.get('User', "
+            f"'{self.us.id}'))\n"
+            "models.storage.save()\n")
+        models.storage.get(Place, self.pl.id).name = "Loft"
+        models.storage.save()
+        with open(self.path, "r") as f:
+            self.assertEqual([f"Place.{self.pl.id}"], list(json.load(f)))
+
+    def test_sync(self):
+        """Test that sync() only reads the store once it has changed."""
+        self.assertFalse(models.storage.sync())
+        pl = models.storage.get(Place, self.pl.id)
+        other = self.other_process(
+            "from models.user import User\n"
+            "us = User()\n"
+            "us.save()\n"
+            "print(us.id)\n")
+        us = models.storage.get(User, self.us.id)
+        us.first_name = "Betty"
+        self.assertTrue(models.storage.sync())
+        self.assertFalse(models.storage.sync())
+        self.assertIsInstance(models.storage.get(User, other), User)
+        self.assertIs(pl, models.storage.get(Place, self.pl.id))
+        self.assertIs(us, models.storage.get(User, self.us.id))
+        self.assertEqual("Betty", us.first_name)
+
+    @unittest.skipIf(fcntl is None, "fcntl is not available")
+    def test_save_waits_for_lock(self):
+        """Test that the write waits while another process holds the lock."""
+        FileStorage._FileStorage__durability = "async"
+        fd = os.open(self.path + ".lock", os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            handle = User().save()
+            time.sleep(0.2)
+            self.assertFalse(handle.done())
+        finally:
+            os.close(fd)
+        handle.result(timeout=5)
+
+    @unittest.skipIf(fcntl is None, "fcntl is not available")
+    def test_read_leaves_no_lock_file(self):
+        """Test that only writes create the lock file."""
+        os.remove(self.path + ".lock")
+        models.storage.reload()
+        models.storage.sync()
+        self.assertFalse(os.path.exists(self.path + ".lock"))
+        User().save()
+        self.assertTrue(os.path.exists(self.path + ".lock"))
+
+
+class TestFileStorageTransactions(StorageTestCase):
+    """Unittests for the transactions of FileStorage."""
+
+    def setUp(self):
+        """Point the storage at a temporary file holding one Place."""
+        super().setUp()
+        self.pl = Place()
+        self.pl.name = "Loft"
+        self.pl.city_id = "c1"
+        self.pl.save()
+
+    def tearDown(self):
+        """Restore the storage settings."""
+        while models.storage.in_transaction():
+            models.storage.rollback()
+        super().tearDown()
+
+    def test_single_write(self):
+        """Test that a transaction saves many changes in one write."""
+        places = [Place() for i in range(1000)]
+        with patch.object(FileStorage, "_dump", autospec=True,
+                          side_effect=FileStorage._dump) as dump:
+            with models.storage.transaction():
+                for place in places:
+                    place.price_by_night = 100
+                    place.save()
+                self.assertEqual(0, dump.call_count)
+        self.assertEqual(1, dump.call_count)
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(100, saved[f"Place.{places[0].id}"]["price_by_night"])
+
+    def test_rollback_on_exception(self):
+        """Test that an exception undoes every change of the transaction."""
+        before = self.pl.to_dict()
+        with open(self.path, "r") as f:
+            stored = f.read()
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                self.pl.name = "Attic"
+                self.pl.city_id = "c2"
+                self.pl.save()
+                us = User()
+                us.save()
+                raise KeyError("oops")
+        self.assertFalse(models.storage.in_transaction())
+        self.assertEqual(before, self.pl.to_dict())
+        self.assertIsNone(models.storage.get(User, us.id))
+        self.assertEqual([f"Place.{self.pl.id}"],
+                         list(models.storage.lookup(Place, "city_id", "c1")))
+        self.assertEqual({}, models.storage.lookup(Place, "city_id", "c2"))
+        models.storage.flush()
+        with open(self.path, "r") as f:
+            self.assertEqual(stored, f.read())
+
+    def test_rollback_restores_deleted(self):
+        """Test that rollback brings deleted objects back."""
+        models.storage.begin()
+        models.storage.delete(self.pl)
+        self.assertIsNone(models.storage.get(Place, self.pl.id))
+        models.storage.rollback()
+        self.assertIs(self.pl, models.storage.get(Place, self.pl.id))
+        self.assertEqual(1, models.storage.count(Place))
+
+    def test_nested(self):
+        """Test that only the outermost commit saves."""
+        models.storage.begin()
+        models.storage.begin()
+        self.pl.name = "Attic"
+        self.pl.save()
+        self.assertIsNone(models.storage.commit())
+        self.assertTrue(models.storage.in_transaction())
+        models.storage.commit().result()
+        with open(self.path, "r") as f:
+            self.assertEqual(
+                "Attic", json.load(f)[f"Place.{self.pl.id}"]["name"])
+
+    def test_nested_rollback(self):
+        """Test that a failed nested block only undoes its own changes."""
+        with models.storage.transaction():
+            self.pl.name = "Attic"
+            us = User()
+            with self.assertRaises(KeyError):
+                with models.storage.transaction():
+                    self.pl.name = "Cellar"
+                    self.pl.city_id = "c2"
+                    Amenity()
+                    models.storage.delete(us)
+                    raise KeyError("oops")
+            self.assertTrue(models.storage.in_transaction())
+            self.assertEqual(("Attic", "c1"),
+                             (self.pl.name, self.pl.city_id))
+            self.assertIs(us, models.storage.get(User, us.id))
+            self.assertEqual(0, models.storage.count(Amenity))
+            self.pl.number_rooms = 3
+            self.pl.save()
+        self.assertFalse(models.storage.in_transaction())
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(("Attic", "c1", 3), tuple(
+            saved[f"Place.{self.pl.id}"][attribute]
+            for attribute in ("name", "city_id", "number_rooms")))
+        self.assertIn(f"User.{us.id}", saved)
+
+    def test_nested_commit_then_rollback(self):
+        """Test that rolling back undoes the nested committed changes."""
+        models.storage.begin()
+        models.storage.begin()
+        self.pl.name = "Attic"
+        models.storage.commit()
+        models.storage.rollback()
+        self.assertFalse(models.storage.in_transaction())
+        self.assertEqual("Loft", self.pl.name)
+
+    def test_no_transaction(self):
+        """Test that commit and rollback need a transaction."""
+        with self.assertRaises(RuntimeError):
+            models.storage.commit()
+        with self.assertRaises(RuntimeError):
+            models.storage.rollback()
+
+
+class TestFileStorageCursor(StorageTestCase):
+    """Unittests for the paginated iteration of FileStorage."""
+
+    def setUp(self):
+        """Fill an empty storage with a few objects."""
+        super().setUp()
+        self.users = [User() for i in range(5)]
+        self.places = [Place() for i in range(3)]
+
+    def test_sorted_by_key(self):
+        """Test that iter() yields every object by key."""
+        pairs = list(models.storage.iter())
+        self.assertEqual(sorted(models.storage.all().items()), pairs)
+        self.assertEqual(sorted(models.storage.all(User)),
+                         [key for key, obj in models.storage.iter(User)])
+
+    def test_pages(self):
+        """Test that after and limit walk the objects page by page."""
+        expected = sorted(models.storage.all())
+        keys, after = [], None
+        while True:
+            page = [key for key, obj in
+                    models.storage.iter(after=after, limit=3)]
+            if not page:
+                break
+            self.assertLessEqual(len(page), 3)
+            keys.extend(page)
+            after = page[-1]
+        self.assertEqual(expected, keys)
+
+    def test_changes_between_pages(self):
+        """Test that a cursor survives objects added and deleted."""
+        keys = sorted(models.storage.all(User))
+        page = list(models.storage.iter(User, limit=2))
+        models.storage.delete(self.users[0])
+        us = User()
+        rest = [key for key, obj in models.storage.iter(
+            User, after=page[-1][0])]
+        expected = sorted(key for key in set(keys + [f"User.{us.id}"])
+                          if key > page[-1][0] and
+                          key != f"User.{self.users[0].id}")
+        self.assertEqual(expected, rest)
+
+    def test_lazy(self):
+        """Test that iter() is a generator."""
+        pairs = models.storage.iter()
+        models.storage.delete(self.places[0])
+        self.assertNotIn(f"Place.{self.places[0].id}", dict(pairs))
+
+
+class TestFileStorageCompact(StorageTestCase):
+    """Unittests for the compact model classes of FileStorage."""
+
+    def setUp(self):
+        """Point the storage at a temporary file, in compact mode."""
+        super().setUp()
+        self.pl = Place()
+        self.pl.city_id = "c1"
+        self.pl.name = "Loft"
+        self.pl.note = "quiet"
+        self.pl.save()
+        FileStorage._FileStorage__compact = True
+
+    def tearDown(self):
+        """Restore the storage settings."""
+        while models.storage.in_transaction():
+            models.storage.rollback()
+        super().tearDown()
+
+    def test_reload(self):
+        """Test that reload() makes compact objects with the same output."""
+        FileStorage._FileStorage__compact = False
+        models.storage.reload()
+        plain = models.storage.get(Place, self.pl.id)
+        FileStorage._FileStorage__compact = True
+        models.storage.reload()
+        pl = models.storage.get(Place, self.pl.id)
+        self.assertIsNot(Place, type(pl))
+        self.assertIsInstance(pl, Place)
+        self.assertEqual(plain.to_dict(), pl.to_dict())
+        self.assertEqual(str(plain), str(pl))
+        self.assertEqual({"note": "quiet"}, pl._extra)
+        self.assertEqual([f"Place.{pl.id}"],
+                         list(models.storage.lookup(Place, "city_id", "c1")))
+
+    def test_save(self):
+        """Test that changes to compact objects are saved and indexed."""
+        models.storage.reload()
+        pl = models.storage.get(Place, self.pl.id)
+        pl.city_id = "c2"
+        pl.number_rooms = 3
+        pl.save()
+        self.assertEqual({}, models.storage.lookup(Place, "city_id", "c1"))
+        FileStorage._FileStorage__compact = False
+        models.storage.reload()
+        pl = models.storage.get(Place, self.pl.id)
+        self.assertIs(Place, type(pl))
+        self.assertEqual(("c2", 3, "quiet"),
+                         (pl.city_id, pl.number_rooms, pl.note))
+
+    def test_rollback(self):
+        """Test that rollback restores the attributes of compact objects."""
+        models.storage.reload()
+        pl = models.storage.get(Place, self.pl.id)
+        before = pl.to_dict()
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                pl.name = "Attic"
+                pl.tag = "new"
+                pl.save()
+                raise KeyError("oops")
+        self.assertEqual(before, pl.to_dict())
+        self.assertFalse(hasattr(pl, "tag"))
+
+    def test_create(self):
+        """Test that new objects of compact classes are stored."""
+        cls = models.storage.classes()["User"]
+        us = cls()
+        self.assertIs(us, models.storage.get(User, us.id))
+        self.assertEqual("", us.email)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/geo.py.
+Unittest classes:
+    TestHaversine
+    TestGridIndex
+"""
+
+import unittest
+from models.engine.geo import GridIndex, haversine
+
+
+class TestHaversine(unittest.TestCase):
+    """Unittests for testing the haversine function."""
+
+    def test_distance(self):
+        """Test a known distance and the distance to the same point."""
+        self.assertAlmostEqual(343.5, haversine(48.8566, 2.3522,
+                                                51.5074, -0.1278), 0)
+        self.assertEqual(0, haversine(10, 20, 10, 20))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Unittests for testing the GridIndex class."""
+
+    def setUp(self):
+        """Set up an index with a few cities."""
+        self.index = GridIndex()
+        self.index.add("Place.paris", 48.8566, 2.3522)
+        self.index.add("Place.versailles", 48.8049, 2.1204)
+        self.index.add("Place.london", 51.5074, -0.1278)
+        self.index.add("Place.suva", -18.1416, 178.4419)
+        self.index.add("Place.apia", -13.8333, -171.7667)
+
+    def test_nearby(self):
+        """Test that nearby points come nearest first, within radius."""
+        found = self.index.nearby(48.86, 2.35, 50)
+        self.assertEqual(["Place.paris", "Place.versailles"],
+                         [key for distance, key in found])
+        self.assertLess(found[0][0], 1)
+        self.assertEqual(["Place.paris"],
+                         [key for distance, key in
+                          self.index.nearby(48.86, 2.35, 500, limit=1)])
+        self.assertEqual(3, len(self.index.nearby(48.86, 2.35, 500)))
+
+    def test_nearby_across_antimeridian(self):
+        """Test a radius crossing longitude 180."""
+        found = self.index.nearby(-16, 179.9, 1300)
+        self.assertEqual(["Place.suva", "Place.apia"],
+                         [key for distance, key in found])
+
+    def test_nearby_large_radius(self):
+        """Test a radius covering the whole earth."""
+        self.assertEqual(5, len(self.index.nearby(0, 0, 20038)))
+
+    def test_within(self):
+        """Test bounding boxes, one of them crossing longitude 180."""
+        self.assertEqual({"Place.paris", "Place.versailles"},
+                         self.index.within(48, 2, 49, 3))
+        self.assertEqual({"Place.suva", "Place.apia"},
+                         self.index.within(-20, 170, -10, -170))
+        self.assertEqual(set(), self.index.within(0, 0, 1, 1))
+
+    def test_add_moves_and_remove(self):
+        """Test moving and removing keys."""
+        self.index.add("Place.paris", 51.5, -0.12)
+        self.assertEqual({"Place.paris", "Place.london"},
+                         self.index.within(51, -1, 52, 0))
+        self.index.remove("Place.paris")
+        self.index.remove("Place.nowhere")
+        self.assertEqual({"Place.london"}, self.index.within(51, -1, 52, 0))
+
+    def test_invalid_coordinates(self):
+        """Test that non-numeric or out of range coordinates are left out."""
+        self.index.add("Place.paris", "48.8566", 2.3522)
+        self.index.add("Place.london", 95, 0)
+        self.assertNotIn("Place.paris", self.index.points)
+        self.assertNotIn("Place.london", self.index.points)
+
+
+if __name__ == "__main__":
+    unittest.main()
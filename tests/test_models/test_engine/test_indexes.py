@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/indexes.py.
+Unittest classes:
+    TestHashIndex
+    TestMultiIndex
+    TestSortedIndex
+"""
+
+import unittest
+from models.engine.indexes import HashIndex, MultiIndex, SortedIndex
+
+
+class TestHashIndex(unittest.TestCase):
+    """Unittests for testing the HashIndex class."""
+
+    def setUp(self):
+        """Set up an index with a few keys."""
+        self.index = HashIndex("place_id")
+        self.index.add("Review.1", "p1")
+        self.index.add("Review.2", "p1")
+        self.index.add("Review.3", "p2")
+
+    def test_lookup(self):
+        """Test looking keys up by value."""
+        self.assertEqual({"Review.1", "Review.2"}, self.index.lookup("p1"))
+        self.assertEqual({"Review.3"}, self.index.lookup("p2"))
+        self.assertEqual(set(), self.index.lookup("p3"))
+
+    def test_add_moves_key(self):
+        """Test that adding a key again moves it to its new value."""
+        self.index.add("Review.1", "p2")
+        self.assertEqual({"Review.2"}, self.index.lookup("p1"))
+        self.assertEqual({"Review.1", "Review.3"}, self.index.lookup("p2"))
+
+    def test_remove(self):
+        """Test removing keys."""
+        self.index.remove("Review.3")
+        self.index.remove("Review.4")
+        self.assertEqual(set(), self.index.lookup("p2"))
+
+    def test_unhashable_value(self):
+        """Test that unhashable values are not indexed."""
+        self.index.add("Review.1", ["p1"])
+        self.assertEqual({"Review.2"}, self.index.lookup("p1"))
+        self.assertEqual(set(), self.index.lookup(["p1"]))
+
+
+class TestMultiIndex(unittest.TestCase):
+    """Unittests for testing the MultiIndex class."""
+
+    def setUp(self):
+        """Set up an index with a few amenity lists."""
+        self.index = MultiIndex("amenity_ids")
+        self.index.add("Place.1", ["wifi", "tv", "pets"])
+        self.index.add("Place.2", ["wifi", "tv"])
+        self.index.add("Place.3", ["wifi"])
+
+    def test_lookup(self):
+        """Test looking keys up by one item."""
+        self.assertEqual({"Place.1", "Place.2", "Place.3"},
+                         self.index.lookup("wifi"))
+        self.assertEqual(set(), self.index.lookup("pool"))
+        self.assertEqual(set(), self.index.lookup(["wifi"]))
+
+    def test_lookup_all(self):
+        """Test looking keys up by several items at once."""
+        self.assertEqual({"Place.1", "Place.2"},
+                         self.index.lookup_all(["wifi", "tv"]))
+        self.assertEqual({"Place.1"},
+                         self.index.lookup_all(["pets", "wifi", "tv"]))
+        self.assertEqual(set(), self.index.lookup_all(["pool", "wifi"]))
+        self.assertEqual(set(), self.index.lookup_all([]))
+
+    def test_add_replaces_and_remove(self):
+        """Test that the entries of a key follow its list."""
+        self.index.add("Place.3", ["tv", ["unhashable"]])
+        self.assertEqual({"Place.1", "Place.2"}, self.index.lookup("wifi"))
+        self.assertEqual({"tv": 3, "wifi": 2, "pets": 1},
+                         self.index.counts())
+        self.index.remove("Place.1")
+        self.index.add("Place.2", "wifi")
+        self.assertEqual({"tv": 1}, self.index.counts())
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Unittests for testing the SortedIndex class."""
+
+    def setUp(self):
+        """Set up an index with a few prices."""
+        self.index = SortedIndex("price_by_night")
+        self.index.fill([("Place.1", 120), ("Place.2", 80),
+                         ("Place.3", 60.5), ("Place.4", 200)])
+        self.index.add("Place.5", 80)
+
+    def test_range(self):
+        """Test ranges with inclusive and exclusive bounds."""
+        self.assertEqual(["Place.3", "Place.2", "Place.5", "Place.1",
+                          "Place.4"], self.index.range())
+        self.assertEqual(["Place.2", "Place.5", "Place.1"],
+                         self.index.range(gte=80, lt=200))
+        self.assertEqual(["Place.1"], self.index.range(gt=80, lte=120))
+        self.assertEqual(["Place.2", "Place.5"],
+                         self.index.range(gte=80, lte=80))
+        self.assertEqual([], self.index.range(gt=120, lt=100))
+
+    def test_limit_and_descending(self):
+        """Test the first and last keys of a range."""
+        self.assertEqual(["Place.3", "Place.2"], self.index.range(limit=2))
+        self.assertEqual(["Place.4", "Place.1"],
+                         self.index.range(limit=2, descending=True))
+        self.assertEqual(["Place.5", "Place.2"],
+                         self.index.range(lt=100, gt=60.5, descending=True))
+
+    def test_add_moves_and_remove(self):
+        """Test moving and removing keys."""
+        self.index.add("Place.4", 10)
+        self.index.remove("Place.2")
+        self.index.remove("Place.9")
+        self.assertEqual(["Place.4", "Place.3", "Place.5", "Place.1"],
+                         self.index.range())
+        self.assertEqual(4, len(self.index))
+
+    def test_not_a_number(self):
+        """Test that values which are not numbers are not indexed."""
+        self.index.add("Place.1", "120")
+        self.index.add("Place.6", float("nan"))
+        self.index.add("Place.7", True)
+        self.index.fill([("Place.8", None)])
+        self.assertEqual(["Place.3", "Place.2", "Place.5", "Place.4"],
+                         self.index.range())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/locking.py.
+Unittest classes:
+    TestReadWriteLock
+"""
+
+import threading
+import time
+import unittest
+from models.engine.locking import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Unittests for testing the ReadWriteLock class."""
+
+    def setUp(self):
+        """Create a fresh lock."""
+        self.lock = ReadWriteLock()
+
+    def in_thread(self, target):
+        """Runs target in another thread and returns whether it finished."""
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(0.5)
+        return not thread.is_alive()
+
+    def test_readers_share(self):
+        """Test that readers don't wait for each other."""
+        with self.lock.reading():
+            self.assertTrue(self.in_thread(
+                lambda: self.lock.reading().__enter__()))
+
+    def test_writer_excludes_readers(self):
+        """Test that a reader waits while the lock is written."""
+        entered = []
+
+        def read():
+            with self.lock.reading():
+                entered.append(True)
+
+        with self.lock:
+            self.assertFalse(self.in_thread(read))
+            self.assertEqual([], entered)
+        time.sleep(0.1)
+        self.assertEqual([True], entered)
+
+    def test_reader_excludes_writer(self):
+        """Test that a writer waits for the readers to leave."""
+        with self.lock.reading():
+            self.assertFalse(self.in_thread(self.lock.acquire))
+
+    def test_writer_reentrant(self):
+        """Test that the writer can write and read again."""
+        with self.lock:
+            with self.lock:
+                with self.lock.reading():
+                    pass
+        self.assertTrue(self.in_thread(self.lock.acquire))
+
+    def test_writer_held_until_last_release(self):
+        """Test that a reentrant writer keeps the lock until it is done."""
+        entered = threading.Event()
+
+        def read():
+            self.lock.acquire_read()
+            entered.set()
+
+        self.lock.acquire()
+        self.lock.acquire()
+        self.lock.release()
+        self.assertFalse(self.in_thread(read))
+        self.lock.release()
+        self.assertTrue(entered.wait(1))
+
+    def test_no_upgrade(self):
+        """Test that a reader can't take the writer side."""
+        with self.lock.reading():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire()
+
+    def test_release_unacquired(self):
+        """Test that releasing an unheld lock raises RuntimeError."""
+        with self.assertRaises(RuntimeError):
+            self.lock.release()
+        with self.assertRaises(RuntimeError):
+            self.lock.release_read()
+
+    def test_reading_upgrades_when_not_ready(self):
+        """Test that reading() writes when ready() returns False."""
+        with self.lock.reading(lambda: False):
+            self.assertFalse(self.in_thread(
+                lambda: self.lock.reading().__enter__()))
+
+
+if __name__ == "__main__":
+    unittest.main()
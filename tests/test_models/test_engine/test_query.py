@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+Unittest classes:
+    TestQuery
+"""
+
+import models
+import unittest
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.engine.query import Query
+from models.place import Place
+from models.user import User
+from tests.test_models.test_engine.test_file_storage import StorageTestCase
+
+
+class TestQuery(StorageTestCase):
+    """Unittests for testing the Query class."""
+
+    def setUp(self):
+        """Create a few places in an empty storage."""
+        super().setUp()
+        self.places = []
+        for name, city, price in (("a", "c1", 120), ("b", "c1", 80),
+                                  ("c", "c2", 60), ("d", "c1", 200)):
+            place = Place()
+            place.name = name
+            place.city_id = city
+            place.price_by_night = price
+            self.places.append(place)
+        User()
+
+    def names(self, query):
+        """Returns the names of the places of query, in order."""
+        return [place.name for place in query]
+
+    def test_query(self):
+        """Test that storage.query() returns every object of the class."""
+        query = models.storage.query(Place)
+        self.assertIsInstance(query, Query)
+        self.assertEqual({"a", "b", "c", "d"}, set(self.names(query)))
+        self.assertEqual(1, models.storage.query("User").count())
+
+    def test_where(self):
+        """Test equality and comparison conditions."""
+        query = models.storage.query(Place).where(
+            city_id="c1", price_by_night__lt=150)
+        self.assertEqual({"a", "b"}, set(self.names(query)))
+        query = query.where(price_by_night__gte=100)
+        self.assertEqual(["a"], self.names(query))
+        query = models.storage.query(Place).where(name__in=["a", "c"])
+        self.assertEqual({"a", "c"}, set(self.names(query)))
+        query = models.storage.query(Place).where(name__startswith="b")
+        self.assertEqual(["b"], self.names(query))
+
+    def test_where_converts_strings(self):
+        """Test that string values get the declared type."""
+        query = models.storage.query(Place).where(price_by_night__gt="100")
+        self.assertEqual({"a", "d"}, set(self.names(query)))
+
+    def test_mistyped_value_skipped(self):
+        """Test that a value of another type doesn't match nor raise."""
+        self.places[0].price_by_night = "120"
+        query = models.storage.query(Place).where(price_by_night__gt=100)
+        self.assertEqual(["d"], self.names(query))
+
+    def test_order_by_and_limit(self):
+        """Test ordering, descending ordering and limits."""
+        query = models.storage.query(Place).order_by("price_by_night")
+        self.assertEqual(["c", "b", "a", "d"], self.names(query))
+        self.assertEqual(["c", "b"], self.names(query.limit(2)))
+        query = models.storage.query(Place).order_by("-price_by_night")
+        self.assertEqual(["d", "a"], self.names(query.limit(2)))
+        query = models.storage.query(Place).order_by("city_id", "-name")
+        self.assertEqual(["d", "b", "a", "c"], self.names(query))
+
+    def test_order_by_mixed_types(self):
+        """Test that values of another type sort after the numbers."""
+        self.places[0].price_by_night = "cheap"
+        self.places[1].price_by_night = None
+        query = models.storage.query(Place).order_by("price_by_night")
+        self.assertEqual(["c", "d", "a", "b"], self.names(query))
+        self.assertEqual(["c", "d"], self.names(query.limit(2)))
+        query = models.storage.query(Place).order_by("-price_by_night")
+        self.assertEqual(["d", "c", "a", "b"], self.names(query))
+        self.assertEqual(["d", "c", "a"], self.names(query.limit(3)))
+        query = models.storage.query(Place).order_by("city_id",
+                                                     "price_by_night")
+        self.assertEqual(["d", "a", "b", "c"], self.names(query))
+
+    def test_first(self):
+        """Test first()."""
+        query = models.storage.query(Place).order_by("name")
+        self.assertIs(self.places[0], query.first())
+        self.assertIsNone(query.where(name="z").first())
+
+    def test_uses_index(self):
+        """Test that indexed equalities don't scan the class."""
+        query = models.storage.query(Place).where(city_id="c2")
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scan")):
+            self.assertEqual(["c"], self.names(query))
+
+    def test_uses_sorted_index(self):
+        """Test that ranges and top-k on numbers don't scan the class."""
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scan")):
+            query = models.storage.query(Place).where(
+                price_by_night__gte=80, price_by_night__lt=150, name="b")
+            self.assertEqual(["b"], self.names(query))
+            query = models.storage.query(Place).where(city_id__ne="c2")
+            self.assertEqual(["d", "a"], self.names(
+                query.order_by("-price_by_night").limit(2)))
+            self.assertEqual(["b"], self.names(
+                query.order_by("price_by_night").limit(1)))
+
+    def test_contains(self):
+        """Test conditions on the items of a list, from its index."""
+        self.places[0].amenity_ids = ["wifi", "tv"]
+        self.places[2].amenity_ids = ["wifi"]
+        with patch.object(FileStorage, "all",
+                          side_effect=AssertionError("scan")):
+            query = models.storage.query(Place)
+            self.assertEqual({"a", "c"}, set(self.names(
+                query.where(amenity_ids__contains="wifi"))))
+            self.assertEqual(["a"], self.names(
+                query.where(amenity_ids__contains_all=["tv", "wifi"])))
+        self.assertEqual(["c"], self.names(
+            query.where(amenity_ids=["wifi"])))
+
+    def test_lazy(self):
+        """Test that the storage is only read once iterated."""
+        with patch.object(FileStorage, "all") as scan:
+            query = models.storage.query(Place).where(name="a")
+            scan.assert_not_called()
+            list(query)
+            scan.assert_called_once()
+
+    def test_unknown_attribute(self):
+        """Test that undeclared attributes and operators are rejected."""
+        query = models.storage.query(Place)
+        with self.assertRaises(ValueError):
+            query.where(colour="red")
+        with self.assertRaises(ValueError):
+            query.where(name__like="a")
+        with self.assertRaises(ValueError):
+            query.order_by("colour")
+        with self.assertRaises(ValueError):
+            models.storage.query("Nope").where(name="a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/text.py.
+Unittest classes:
+    TestTokenize
+    TestTextIndex
+"""
+
+import unittest
+from models.engine.text import TextIndex, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+    """Unittests for testing the tokenize function."""
+
+    def test_tokenize(self):
+        """Test splitting text in lowercase words."""
+        self.assertEqual(["cosy", "loft", "wi", "fi"],
+                         tokenize("Cosy loft, Wi-Fi!"))
+        self.assertEqual([], tokenize(None))
+
+
+class TestTextIndex(unittest.TestCase):
+    """Unittests for testing the TextIndex class."""
+
+    def setUp(self):
+        """Set up an index with a few reviews."""
+        self.index = TextIndex(["text"])
+        self.index.add("Review.1", ["Great view, great host"])
+        self.index.add("Review.2", ["Great location but noisy"])
+        self.index.add("Review.3", ["Quiet garden and a great view"])
+        self.index.add("Review.4", ["Terrible host"])
+
+    def keys(self, query, limit=None):
+        """Returns the keys found for query, best first."""
+        return [key for score, key in self.index.search(query, limit)]
+
+    def test_and(self):
+        """Test that every word must match by default."""
+        self.assertEqual(["Review.1", "Review.3"], self.keys("great view"))
+        self.assertEqual(["Review.1", "Review.3"],
+                         self.keys("great AND view"))
+        self.assertEqual([], self.keys("great terrible"))
+
+    def test_or(self):
+        """Test that any word matches with OR."""
+        self.assertEqual({"Review.2", "Review.4"},
+                         set(self.keys("noisy OR terrible")))
+
+    def test_ranking(self):
+        """Test that more occurrences and rarer words rank higher."""
+        self.assertEqual("Review.1", self.keys("great")[0])
+        self.assertEqual(["Review.4", "Review.1"],
+                         self.keys("terrible OR host"))
+        self.assertEqual(["Review.1"], self.keys("great", limit=1))
+
+    def test_prefix(self):
+        """Test that a word ending with * matches as a prefix."""
+        self.assertEqual(["Review.2", "Review.4"],
+                         sorted(self.keys("no* OR ter*")))
+        self.assertEqual(["Review.3"], self.keys("gard*"))
+        self.assertEqual([], self.keys("zz*"))
+
+    def test_add_replaces_and_remove(self):
+        """Test that the entry of a key follows its text."""
+        self.index.add("Review.4", ["Noisy street"])
+        self.assertEqual([], self.keys("terrible"))
+        self.assertEqual(["Review.2", "Review.4"], sorted(self.keys("noisy")))
+        self.index.remove("Review.4")
+        self.index.remove("Review.9")
+        self.assertEqual(["Review.2"], self.keys("noi*"))
+        self.assertNotIn("street", self.index.postings)
+
+    def test_empty_query(self):
+        """Test that a query without words finds nothing."""
+        self.assertEqual([], self.keys(" , "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -31,6 +31,10 @@ class TestPlaceInstantiation(unittest.TestCase):
             os.remove("file.json")
         except FileNotFoundError:
             pass
+        try:
+            os.remove("file.json.lock")
+        except FileNotFoundError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except FileNotFoundError:
@@ -30,6 +30,10 @@ class TestReviewInstantiation(unittest.TestCase):
             os.remove("file.json")
         except FileNotFoundError:
             pass
+        try:
+            os.remove("file.json.lock")
+        except FileNotFoundError:
+            pass
         try:
             os.rename("tmp", "file.json")
         except FileNotFoundError: